@@ -0,0 +1,180 @@
+"""
+Allocation and garbage collection report of steady-state gameplay, run under SDL's dummy video driver.
+Plays scripted frames of a game without menus, first timing every collection of the garbage collector and then
+tracing the memory the frames allocate, and prints what is left over per frame and where it comes from. Exits with
+an error if more memory than --max-bytes-per-frame is left over per frame.
+    python allocation_report.py --frames 3000
+    python allocation_report.py --no-freeze --top 10
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame as pg
+
+from benchmark import create_game
+import settings as sett
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from typing import Callable, Final
+
+FRAME_TIME: Final[float] = 1 / 60
+INPUT_HOLD: Final[int] = 30
+# The entities of a game come and go, so a little of the memory left over after a run is the state of its last frame.
+MAX_BYTES_PER_FRAME: Final[float] = 16.0
+
+
+def frame_loop(game: 'Game') -> Callable[[int], None]:
+    """
+    Create a function that plays one frame of a game like the gameplay loop does.
+    The players switch direction every INPUT_HOLD frames, and fallen players are put back into the middle of the
+    window, so the frames keep landing, scoring and drawing players.
+    Args:
+    game (Game): The game, with its gameplay data created.
+    Returns:
+    Callable[[int], None]: Plays the frame with the given number.
+    """
+    simulation = game.simulation
+    count = simulation.player_count
+    directions = ([[True, False]] * count, [[False, True]] * count)
+    flips = [False] * count
+    restart = [[sett.GAME_WINDOW_RESOLUTION[0] // 2, sett.GAME_WINDOW_RESOLUTION[1] // 2]]
+
+    def frame(number: int) -> None:
+        alpha = simulation.advance(FRAME_TIME, directions[number // INPUT_HOLD % 2], moved=True, flips=flips)
+        game.create_game_window(alpha)
+        fallen = simulation.batch.fallen()
+        if fallen.any():
+            simulation.batch.reset_rows(fallen.nonzero()[0], restart)
+
+    return frame
+
+
+def collection_report(frame: Callable[[int], None], frames: int) -> dict[str, float | list[int]]:
+    """
+    Time the garbage collections during a number of frames.
+    Args:
+    frame (Callable[[int], None]): Plays one frame.
+    frames (int): The number of frames.
+    Returns:
+    dict[str, float | list[int]]: The collections per generation, their pauses and the growth of the heap.
+    """
+    pauses: list[float] = []
+    started: list[float] = []
+
+    def time_collection(phase: str, info: dict[str, int]) -> None:
+        if phase == 'start':
+            started.append(time.perf_counter())
+        else:
+            pauses.append(time.perf_counter() - started.pop())
+
+    gc.collect()
+    collections = [stats['collections'] for stats in gc.get_stats()]
+    blocks = sys.getallocatedblocks()
+    gc.callbacks.append(time_collection)
+    start = time.perf_counter()
+    try:
+        for number in range(frames):
+            frame(number)
+    finally:
+        gc.callbacks.remove(time_collection)
+    elapsed = time.perf_counter() - start
+    counts = [stats['collections'] - before for stats, before in zip(gc.get_stats(), collections)]
+    gc.collect()
+    return {'collections': counts,
+            'pause_max_ms': 1000 * max(pauses, default=0.0),
+            'pause_total_ms': 1000 * sum(pauses),
+            'blocks_per_frame': (sys.getallocatedblocks() - blocks) / frames,
+            'tracked_objects': len(gc.get_objects()),
+            'frozen_objects': gc.get_freeze_count(),
+            'frame_ms': 1000 * elapsed / frames}
+
+
+def trace_report(frame: Callable[[int], None], frames: int, top: int) -> dict[str, float | list[str]]:
+    """
+    Trace the memory allocated during a number of frames.
+    Args:
+    frame (Callable[[int], None]): Plays one frame.
+    frames (int): The number of frames.
+    top (int): The number of places with the most growth to list.
+    Returns:
+    dict[str, float | list[str]]: The memory left over per frame, the largest memory in use at once within a
+    frame on top of what was there before it, and where the left over memory was allocated.
+    """
+    tracemalloc.start()
+    try:
+        # A full collection also empties the free lists of tuples and other objects, which otherwise count as
+        # memory left over by the frames that last filled them.
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        start_size = tracemalloc.get_traced_memory()[0]
+        transient = 0
+        for number in range(frames):
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            frame(number)
+            transient = max(transient, tracemalloc.get_traced_memory()[1] - size)
+        gc.collect()
+        end_size = tracemalloc.get_traced_memory()[0]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    growth = [stat for stat in after.compare_to(before, 'lineno') if stat.size_diff > 0
+              and stat.traceback[0].filename != tracemalloc.__file__][:top]
+    return {'bytes_per_frame': (end_size - start_size) / frames,
+            'transient_peak_bytes': transient,
+            'growth': [f"{stat.size_diff:>+9} B {stat.count_diff:>+6} blocks  {stat.traceback[0].filename}:{stat.traceback[0].lineno}" for stat in growth]}
+
+
+def main() -> None:
+    """ Play scripted frames and print the allocation and collection report. """
+    parser = argparse.ArgumentParser(description="Report the allocations and garbage collections of JumPy gameplay.")
+    parser.add_argument('--frames', type=int, default=3000, help="Measured frames per report.")
+    parser.add_argument('--warmup', type=int, default=600, help="Frames played before measuring.")
+    parser.add_argument('--difficulty', default='normal', choices=tuple(sett.DIFFICULTIES))
+    parser.add_argument('--single-player', action='store_true')
+    parser.add_argument('--full-redraw', action='store_true', help="Redraw the whole window every frame.")
+    parser.add_argument('--no-freeze', action='store_true', help="Skip the gc.freeze the game does at its start.")
+    parser.add_argument('--top', type=int, default=5, help="Places with the most memory growth to list.")
+    parser.add_argument('--max-bytes-per-frame', type=float, default=MAX_BYTES_PER_FRAME,
+                        help="Fail if more traced memory than this is left over per frame.")
+    args = parser.parse_args()
+
+    pg.init()
+    # Images are converted to the display format on load, so the display has to exist before anything is loaded.
+    pg.display.set_mode(sett.MAIN_WINDOW_RESOLUTION)
+    game = create_game(args.difficulty, dirty_rendering=not args.full_redraw, single_player=args.single_player)
+    # The recording keeps every input by design, it would be counted as left over memory.
+    game.simulation.recorder = game.recorder = None
+    if not args.no_freeze:
+        # The game freezes its heap once its gameplay data exists, create_game leaves that to the tools.
+        gc.collect()
+        gc.freeze()
+    frame = frame_loop(game)
+    for number in range(args.warmup):
+        frame(number)
+
+    collections = collection_report(frame, args.frames)
+    print(f"{args.frames} frames, {collections['frame_ms']:.3f} ms per frame")
+    print(f"collections per generation: {collections['collections']}, "
+          f"pauses: {collections['pause_max_ms']:.3f} ms max, {collections['pause_total_ms']:.3f} ms total")
+    print(f"tracked objects: {collections['tracked_objects']}, frozen: {collections['frozen_objects']}, "
+          f"heap blocks per frame: {collections['blocks_per_frame']:+.3f}")
+
+    traced = trace_report(frame, args.frames, args.top)
+    print(f"traced memory per frame: {traced['bytes_per_frame']:+.1f} B, "
+          f"largest transient allocation within a frame: {traced['transient_peak_bytes']} B")
+    for line in traced['growth']:
+        print("  " + line)
+    if traced['bytes_per_frame'] > args.max_bytes_per_frame:
+        print(f"traced memory grows by more than {args.max_bytes_per_frame:g} B per frame")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import pygame as pg
+
+import os
+import time
+from functools import partial
+from typing import Callable, Final
+
+IMAGE_DIRECTORY: Final[str] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
+
+
+class AssetManager:
+    """
+    Loads every image only once and memoizes its scaled and flipped variants.
+    The images can optionally be packed into one atlas surface, then every image is a subsurface of the atlas and
+    shares its pixels. Surfaces handed out are shared between all users and must not be drawn on.
+    """
+    ATLAS_WIDTH: Final[int] = 1024
+    ATLAS_PADDING: Final[int] = 1
+
+    def __init__(self, directory: str = IMAGE_DIRECTORY) -> None:
+        """
+        Initialize the asset manager.
+        Args:
+        directory (str): The directory holding the PNG images.
+        """
+        self.directory: str = directory
+        self.images: dict[str, pg.Surface] = {}
+        self.variants: dict[tuple[str, tuple[int], bool], pg.Surface] = {}
+        self.atlas: None | pg.Surface = None
+        self.atlas_rects: dict[str, pg.Rect] = {}
+        self.load_times: dict[str, float] = {}
+
+    def image(self, name: str) -> pg.Surface:
+        """
+        Get an image, loading it from disk on the first request.
+        Args:
+        name (str): The name of the image. (Without ".png")
+        Returns:
+        pg.Surface: The image.
+        """
+        if name not in self.images:
+            start = time.perf_counter()
+            img = pg.image.load(os.path.join(self.directory, name + '.png'))
+            # Converting needs a display mode, headless runs keep the image in its file format.
+            if pg.display.get_surface() is not None:
+                img = img.convert_alpha()
+            self.images[name] = img
+            self.load_times[name] = time.perf_counter() - start
+        return self.images[name]
+
+    def variant(self, name: str, size: None | tuple[int] = None, flip: bool = False) -> pg.Surface:
+        """
+        Get a scaled and/or horizontally flipped version of an image. Every variant is only created once.
+        Args:
+        name (str): The name of the image.
+        size (None | tuple[int]): The size to scale the image to. None keeps the original size.
+        flip (bool): Whether to flip the image horizontally.
+        Returns:
+        pg.Surface: The image variant.
+        """
+        img = self.image(name)
+        size = img.get_size() if size is None else tuple(size)
+        key = (name, size, flip)
+        if key not in self.variants:
+            start = time.perf_counter()
+            if size != img.get_size():
+                img = pg.transform.scale(img, size)
+            if flip:
+                img = pg.transform.flip(img, True, False)
+            self.variants[key] = img
+            self.load_times[self.variant_name(*key)] = time.perf_counter() - start
+        return self.variants[key]
+
+    @staticmethod
+    def variant_name(name: str, size: tuple[int], flip: bool) -> str:
+        """
+        Get the name of an image variant as shown in the report.
+        Args:
+        name (str): The name of the image.
+        size (tuple[int]): The size of the variant.
+        flip (bool): Whether the variant is flipped.
+        Returns:
+        str: The name of the variant.
+        """
+        return f"{name} {size[0]}x{size[1]}{' flipped' if flip else ''}"
+
+    def pack_atlas(self, names: list[str]) -> pg.Surface:
+        """
+        Pack images into one atlas surface, row by row from the tallest image down.
+        Already loaded images and variants are replaced by views into the atlas.
+        Args:
+        names (list[str]): The names of the images to pack.
+        Returns:
+        pg.Surface: The atlas.
+        """
+        sources = {name: self.image(name) for name in names}
+        rects: dict[str, pg.Rect] = {}
+        x = y = row_height = 0
+        for name in sorted(sources, key=lambda name: -sources[name].get_height()):
+            width, height = sources[name].get_size()
+            if x and x + width > self.ATLAS_WIDTH:
+                x, y, row_height = 0, y + row_height + self.ATLAS_PADDING, 0
+            rects[name] = pg.Rect(x, y, width, height)
+            x += width + self.ATLAS_PADDING
+            row_height = max(row_height, height)
+
+        bounds = rects[names[0]].unionall(list(rects.values()))
+        atlas = pg.Surface(bounds.size, pg.SRCALPHA)
+        if pg.display.get_surface() is not None:
+            atlas = atlas.convert_alpha()
+        atlas.fill((0, 0, 0, 0))
+        for name, rect in rects.items():
+            atlas.blit(sources[name], rect)
+            self.images[name] = atlas.subsurface(rect)
+        self.atlas = atlas
+        self.atlas_rects.update(rects)
+        self.variants = {key: value for key, value in self.variants.items() if key[0] not in rects}
+        return atlas
+
+    def region(self, name: str) -> pg.Rect:
+        """
+        Get the area of an image inside the atlas.
+        Args:
+        name (str): The name of the image.
+        Returns:
+        pg.Rect: The sub-rect of the atlas.
+        """
+        return self.atlas_rects[name]
+
+    def manifest(self) -> list[list]:
+        """
+        Describe the image variants created so far, to create them again in a later run.
+        Returns:
+        list[list]: The name, size and flip of every variant.
+        """
+        return [[name, list(size), flip] for name, size, flip in self.variants]
+
+    def restore(self, manifest: list[list]) -> list[Callable[[], pg.Surface]]:
+        """
+        List the work to load the images and create the variants of a manifest again.
+        Args:
+        manifest (list[list]): A manifest of an earlier run.
+        Returns:
+        list[Callable[[], pg.Surface]]: One function per variant, to be called when there is time. Images missing
+        from the directory are left out.
+        """
+        return [partial(self.variant, name, tuple(size), flip) for name, size, flip in manifest
+                if os.path.exists(os.path.join(self.directory, name + '.png'))]
+
+    def report(self) -> list[dict[str, float | int | str]]:
+        """
+        Get the load time and pixel memory of every loaded image and variant.
+        Returns:
+        list[dict[str, float | int | str]]: One entry per asset with its name, load time in ms and size in bytes.
+        Images packed into the atlas share its memory and are reported with 0 bytes, the atlas itself is listed.
+        """
+        entries = []
+        surfaces = dict(self.images)
+        surfaces.update({self.variant_name(*key): surf for key, surf in self.variants.items()})
+        for name, surf in surfaces.items():
+            shared = name in self.atlas_rects
+            entries.append({'name': name, 'load_ms': round(self.load_times.get(name, 0.0) * 1000, 3),
+                            'bytes': 0 if shared else surf.get_width() * surf.get_height() * surf.get_bytesize()})
+        if self.atlas is not None:
+            entries.append({'name': 'atlas', 'load_ms': 0.0, 'bytes': self.atlas.get_width() * self.atlas.get_height() * self.atlas.get_bytesize()})
+        return entries
+
+    def print_report(self) -> None:
+        """ Print the asset report as a table. """
+        entries = self.report()
+        for entry in entries:
+            print(f"{entry['name']:<32}{entry['load_ms']:>10.3f} ms{entry['bytes'] / 1024:>12.1f} KiB")
+        print(f"{'total':<32}{sum(entry['load_ms'] for entry in entries):>10.3f} ms{sum(entry['bytes'] for entry in entries) / 1024:>12.1f} KiB")
+
+
+assets: Final[AssetManager] = AssetManager()
+
+
+if __name__ == "__main__":
+    pg.init()
+    pg.display.set_mode((1, 1), pg.HIDDEN)
+    image_names = sorted(file[:-4] for file in os.listdir(IMAGE_DIRECTORY) if file.endswith('.png'))
+    for image_name in image_names:
+        assets.image(image_name)
+    assets.pack_atlas(image_names)
+    assets.print_report()
@@ -0,0 +1,250 @@
+"""
+Benchmarks of the per-frame hot paths, run under SDL's dummy video driver.
+Every benchmark uses fixed random seeds and is repeated with growing platform/cloud counts. Results are written as
+JSON; given a baseline file, the run fails when a tracked median got slower than the allowed threshold.
+    python benchmark.py --output results.json
+    python benchmark.py --baseline results.json --threshold 0.25
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame as pg
+
+import argparse
+import itertools
+import json
+import platform as host
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Final
+
+SEED: Final[int] = 1234
+PLATFORM_WINDOW_HEIGHTS: Final[tuple[int]] = (850, 3400, 13600)
+CLOUD_COUNTS: Final[tuple[int]] = (16, 64, 256)
+PLAYER_COUNTS: Final[tuple[int]] = (1, 16, 64)
+Result = dict[str, float | int | str]
+
+
+def measure(name: str, function: Callable[[], None], iterations: int, rounds: int, **params: int | str) -> Result:
+    """
+    Time a function.
+    Args:
+    name (str): The name of the benchmark.
+    function (Callable[[], None]): The function to time.
+    iterations (int): The number of calls per round.
+    rounds (int): The number of timed rounds.
+    params (int | str): Parameters of the benchmark, they become part of its key.
+    Returns:
+    Result: The key, parameters and the min/median/max time per call in microseconds.
+    """
+    function()
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            function()
+        per_call.append((time.perf_counter_ns() - start) / iterations / 1000)
+    key = name + ''.join(f"[{param}={value}]" for param, value in params.items())
+    return {'key': key, 'name': name, **params, 'iterations': iterations, 'rounds': rounds,
+            'min_us': round(min(per_call), 3), 'median_us': round(statistics.median(per_call), 3), 'max_us': round(max(per_call), 3)}
+
+
+def create_game(difficulty: str = 'hard', dirty_rendering: bool = False, single_player: bool = False) -> 'Game':
+    """
+    Create a game with its gameplay data, skipping the menus. It does not touch the boot cache of the player or
+    freeze the heap.
+    Args:
+    difficulty (str): The difficulty preset.
+    dirty_rendering (bool): Whether the game renders with dirty rectangles.
+    single_player (bool): Whether to create a single player game.
+    Returns:
+    Game: The game.
+    """
+    from jum import Game
+
+    random.seed(SEED)
+    game = Game(tooling=True)
+    game.seed = SEED
+    game.dirty_rendering = dirty_rendering
+    game.single_player = single_player
+    setattr(game, difficulty, True)
+    game.create_game_data()
+    game.moved = True
+    return game
+
+
+def bench_create_game_window(iterations: int, rounds: int) -> list[Result]:
+    """ Time drawing the gameplay screen, with full and with dirty rectangle redraws. """
+    results = []
+    for dirty_rendering in (False, True):
+        game = create_game(dirty_rendering=dirty_rendering)
+        results.append(measure('Game.create_game_window', game.create_game_window, iterations, rounds, dirty=int(dirty_rendering)))
+    return results
+
+
+def create_course(height: int) -> 'Platform':
+    """
+    Create a hard course filling a game window of the given height.
+    Args:
+    height (int): The height of the game window, taller windows keep more platforms alive.
+    Returns:
+    Platform: The course.
+    """
+    from entities import Platform
+    import settings as sett
+
+    preset = sett.DIFFICULTIES['hard']
+    course = Platform(None, None, (sett.GAME_WINDOW_RESOLUTION[0], height), (sett.GAME_WINDOW_RESOLUTION[0] // 2, height - 100),
+                      preset['platform_size'], preset['platform_distances'], preset['angle_limit'], seed=SEED)
+    course.platform_handler()
+    return course
+
+
+def bench_player_update(iterations: int, rounds: int) -> list[Result]:
+    """ Time one step of growing numbers of players sharing courses with growing platform counts. """
+    from player_batch import PlayerBatch
+
+    results = []
+    for height in PLATFORM_WINDOW_HEIGHTS:
+        course = create_course(height)
+        for count in PLAYER_COUNTS:
+            rng = random.Random(SEED)
+            batch = PlayerBatch([(rng.randint(16, 684), rng.randint(height // 4, height // 2)) for _ in range(count)])
+            movements = itertools.cycle([[(True, False)] * count] * 20 + [[(False, True)] * count] * 20)
+
+            def step() -> None:
+                batch.start_tick()
+                batch.update([course.platforms], next(movements))
+                # Keep the players inside the course instead of letting them fall out of the window.
+                below = batch.pos[:, 1] > height // 2 + 64
+                batch.pos[below, 1] = height // 4
+                batch.velocity[below, 1] = 0
+
+            results.append(measure('PlayerBatch.update', step, iterations, rounds, platforms=len(course.platforms), players=count))
+    return results
+
+
+def bench_platforms(iterations: int, rounds: int) -> list[Result]:
+    """ Time building chunks of platforms and the per-frame platform handling while the course scrolls. """
+    results = []
+    for height in PLATFORM_WINDOW_HEIGHTS:
+        course = create_course(height)
+        count = len(course.platforms)
+        results.append(measure('Platform.platform_builder', course.platform_builder, iterations, rounds, platforms=count))
+
+        course = create_course(height)
+
+        def handle() -> None:
+            course.scroll_platforms_down()
+            course.platform_handler()
+
+        results.append(measure('Platform.platform_handler', handle, iterations, rounds, platforms=count))
+    return results
+
+
+def bench_clouds(iterations: int, rounds: int) -> list[Result]:
+    """ Time moving and drawing growing numbers of clouds. """
+    from entities import Clouds
+    import settings as sett
+
+    results = []
+    surf = pg.Surface(sett.GAME_WINDOW_RESOLUTION)
+    for count in CLOUD_COUNTS:
+        random.seed(SEED)
+        clouds = Clouds()
+        results.append(measure('Clouds.update', lambda: clouds.update(count), iterations, rounds, clouds=count))
+        results.append(measure('Clouds.render', lambda: clouds.render(surf), iterations, rounds, clouds=count))
+    return results
+
+
+def bench_button_render(iterations: int, rounds: int) -> list[Result]:
+    """ Time drawing one menu button, switching between its idle, hover and pressed looks so every call draws. """
+    from entities import Button
+    import settings as sett
+
+    surf = pg.Surface(sett.MAIN_WINDOW_RESOLUTION)
+    button = Button(surf, "Normal", (sett.MAIN_WINDOW_RESOLUTION[0] // 2, sett.MAIN_WINDOW_RESOLUTION[1] // 2), 'yellow')
+    colors = sett.BUTTON_COLORS['yellow']
+    states = itertools.cycle(((colors['color'], Button.BUTTON_OFFSET), (colors['hover_color'], Button.BUTTON_OFFSET), (colors['hover_color'], 0)))
+
+    def render() -> None:
+        button.button_color, button.button_offset = next(states)
+        button.render()
+
+    return [measure('Button.render', render, iterations, rounds)]
+
+
+BENCHMARKS: Final[dict[str, Callable[[int, int], list[Result]]]] = {
+    'create_game_window': bench_create_game_window,
+    'player_update': bench_player_update,
+    'platforms': bench_platforms,
+    'clouds': bench_clouds,
+    'button_render': bench_button_render
+    }
+
+
+def compare(results: list[Result], baseline: list[Result], threshold: float, min_delta_us: float = 5.0) -> list[str]:
+    """
+    Find the benchmarks that got slower than the baseline.
+    Args:
+    results (list[Result]): The current results.
+    baseline (list[Result]): The results to compare with.
+    threshold (float): The allowed slowdown, 0.25 allows medians up to 25% slower.
+    min_delta_us (float): Slowdowns below this many microseconds are timer noise and never count.
+    Returns:
+    list[str]: One message per regressed benchmark.
+    """
+    baseline_by_key = {result['key']: result for result in baseline}
+    regressions = []
+    for result in results:
+        old = baseline_by_key.get(result['key'])
+        if old is None:
+            continue
+        change = result['median_us'] / old['median_us'] - 1
+        if change > threshold and result['median_us'] - old['median_us'] > min_delta_us:
+            regressions.append(f"{result['key']}: {old['median_us']:.1f} us -> {result['median_us']:.1f} us (+{change:.0%})")
+    return regressions
+
+
+def main() -> None:
+    """ Run the benchmarks, write the results and compare them with a baseline. """
+    parser = argparse.ArgumentParser(description="Benchmark the JumPy frame loop.")
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    parser.add_argument('--baseline', help="Fail if a benchmark is slower than in this results file.")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown against the baseline.")
+    parser.add_argument('--min-delta-us', type=float, default=5.0, help="Ignore slowdowns smaller than this.")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--only', nargs='*', choices=tuple(BENCHMARKS), help="Run only these benchmarks.")
+    args = parser.parse_args()
+
+    import settings as sett
+
+    pg.init()
+    # Images are converted to the display format on load, so the display has to exist before anything is loaded.
+    pg.display.set_mode(sett.MAIN_WINDOW_RESOLUTION)
+    results: list[Result] = []
+    for name in args.only or BENCHMARKS:
+        for result in BENCHMARKS[name](args.iterations, args.rounds):
+            print(f"{result['key']:<55}{result['median_us']:>12.1f} us")
+            results.append(result)
+
+    report = {'python': sys.version.split()[0], 'pygame': pg.version.ver, 'machine': host.machine(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file)['results'], args.threshold, args.min_delta_us)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Measured boot sequence of the game: a timer marking the steps from the first import to an interactive menu, a
+cache persisting what the last run had to look up and load, and a queue of preloading work spread over the frames
+of the menus. Imports nothing but the standard library, so importing it first starts the timer before the rest of
+the game is imported.
+    JUMPY_BOOT_REPORT=1 python jum.py
+    python boot.py --runs 5
+"""
+import collections
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Final
+
+DEFAULT_CACHE_PATH: Final[str] = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                                              'jumpy', 'boot_cache.json')
+
+
+class BootTimer:
+    """ Records the time from its creation to every named step of the boot, each step only the first time. """
+
+    def __init__(self, verbose: bool = False) -> None:
+        """
+        Initialize the timer and start it.
+        Args:
+        verbose (bool): Whether every step is printed when it is reached.
+        """
+        self.start: float = time.perf_counter()
+        self.verbose: bool = verbose
+        self.marks: dict[str, float] = {}
+
+    def mark(self, step: str) -> None:
+        """
+        Record that a step of the boot is reached, unless it was reached before.
+        Args:
+        step (str): The name of the step.
+        """
+        if step in self.marks:
+            return
+        previous = max(self.marks.values(), default=0.0)
+        self.marks[step] = time.perf_counter() - self.start
+        if self.verbose:
+            print(f"boot {step:<14}{1000 * self.marks[step]:>9.1f} ms (+{1000 * (self.marks[step] - previous):.1f} ms)", flush=True)
+
+
+class BootCache:
+    """
+    A JSON file keeping what the last run of the game resolved and loaded, so the next run can skip the lookups and
+    load the same assets ahead of time. Missing, unreadable or unwritable files never stop the game.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH) -> None:
+        """
+        Initialize the cache.
+        Args:
+        path (str): The path of the cache file. An empty path turns the cache off.
+        """
+        self.path: str = path
+        self.saved: dict[str, Any] = {}
+
+    def load(self) -> dict[str, Any]:
+        """
+        Read the cache file.
+        Returns:
+        dict[str, Any]: The content of the cache, empty if there is none.
+        """
+        if not self.path:
+            return {}
+        try:
+            with open(self.path) as file:
+                content = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        self.saved = content if isinstance(content, dict) else {}
+        return self.saved
+
+    def save(self, content: dict[str, Any]) -> None:
+        """
+        Write the cache file if its content changed.
+        Args:
+        content (dict[str, Any]): The JSON serializable content.
+        """
+        if not self.path or content == self.saved:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            # Written next to the file and moved over it, so a run killed while saving leaves the old cache intact.
+            with open(self.path + '.tmp', 'w') as file:
+                json.dump(content, file)
+            os.replace(self.path + '.tmp', self.path)
+        except OSError:
+            return
+        self.saved = content
+
+
+class Preloader:
+    """
+    Queue of loading work that runs in small portions between frames.
+    pygame surfaces must not be created off the main thread, so the work runs in the main loop while the menus
+    leave most of every frame idle.
+    """
+
+    def __init__(self) -> None:
+        self.tasks: collections.deque[Callable[[], Any]] = collections.deque()
+
+    @property
+    def done(self) -> bool:
+        """
+        Get whether all queued work ran.
+        Returns:
+        bool: True if the queue is empty.
+        """
+        return not self.tasks
+
+    def extend(self, tasks: list[Callable[[], Any]]) -> None:
+        """
+        Queue loading work.
+        Args:
+        tasks (list[Callable[[], Any]]): The functions to call, in order.
+        """
+        self.tasks.extend(tasks)
+
+    def run(self, budget: None | float = None) -> int:
+        """
+        Run queued work until the time budget is used up. At least one task runs per call.
+        Args:
+        budget (None | float): The time budget in seconds. None runs all queued work.
+        Returns:
+        int: The number of tasks that ran.
+        """
+        end = None if budget is None else time.perf_counter() + budget
+        count = 0
+        while self.tasks and (end is None or count == 0 or time.perf_counter() < end):
+            self.tasks.popleft()()
+            count += 1
+        return count
+
+
+boot_timer: Final[BootTimer] = BootTimer(verbose=bool(os.environ.get('JUMPY_BOOT_REPORT')))
+
+
+def measure_boots(runs: int) -> dict[str, list[float]]:
+    """
+    Start the game in fresh processes that quit once the boot is done, and collect the times of the boot steps.
+    Args:
+    runs (int): The number of starts. The first one may fill the boot cache for the others.
+    Returns:
+    dict[str, list[float]]: The time of every step in ms per run. 'process' is the whole run as seen from outside,
+    including the start of the interpreter and shutting down.
+    """
+    import subprocess
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jum.py')
+    environment = dict(os.environ, JUMPY_BOOT_REPORT='exit')
+    environment.setdefault('SDL_VIDEODRIVER', 'dummy')
+    environment.setdefault('SDL_AUDIODRIVER', 'dummy')
+    steps: dict[str, list[float]] = collections.defaultdict(list)
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, script], env=environment, capture_output=True, text=True, check=True).stdout
+        steps['process'].append(1000 * (time.perf_counter() - start))
+        for line in output.splitlines():
+            if line.startswith('boot '):
+                step, milliseconds = line.split()[1:3]
+                steps[step].append(float(milliseconds))
+    return steps
+
+
+def main() -> None:
+    """ Measure cold starts of the game and print the median time of every boot step. """
+    # Imported here instead of at the top, where they would count towards the boot of the game.
+    import argparse
+    import statistics
+
+    parser = argparse.ArgumentParser(description="Measure the boot of JumPy from the first import to an interactive menu.")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+    for step, times in measure_boots(args.runs).items():
+        print(f"{step:<14}{statistics.median(times):>9.1f} ms median, {min(times):.1f}-{max(times):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
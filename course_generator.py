@@ -0,0 +1,139 @@
+import numpy as np
+
+from array import array
+from collections import OrderedDict
+from typing import Final, Sequence
+
+CourseKey = tuple[int, tuple[int], tuple[int], tuple[int], int, tuple[int]]
+
+
+class CourseGenerator:
+    """
+    Builds the platforms of one course in chunks, deterministically from a seed.
+    The random draws of every chunk come from their own stream, seeded with (seed, chunk index), and the distance
+    and angle of all platforms of a chunk are drawn at once. Only the bounce off the window edges has to run
+    platform by platform, because it depends on where the previous platform ended up. Chunks are built on first
+    request and the newest MAX_CHUNKS are kept, so every course sharing the generator reuses them while a course
+    that plays for hours does not keep all of them alive. Where every chunk starts is kept, so an older chunk is
+    built again on its own.
+    """
+    CHUNK_SIZE: Final[int] = 32
+    MAX_CHUNKS: Final[int] = 64
+
+    def __init__(self, seed: int, platform_size: tuple[int], platform_distances: tuple[int], angle_limit: tuple[int], width: int, start: tuple[int]) -> None:
+        """
+        Initialize the generator.
+        Args:
+        seed (int): The seed of the course.
+        platform_size (tuple[int]): The (width, height) of every platform.
+        platform_distances (tuple[int]): The smallest and largest distance between two platforms.
+        angle_limit (tuple[int]): The smallest and largest angle in degrees from one platform to the next.
+        width (int): The width of the window the platforms have to stay in.
+        start (tuple[int]): The (x, y) world position of the first platform, which is not generated.
+        """
+        self.seed: int = seed
+        self.platform_width: int = platform_size[0]
+        self.distances: tuple[int] = platform_distances
+        self.angle_limit: tuple[int] = angle_limit
+        self.width: int = width
+        self.start: tuple[int] = tuple(start)
+        # Only whole degrees are drawn, so the sines and cosines of the whole range are looked up.
+        radians = np.radians(np.arange(angle_limit[0], angle_limit[1] + 1))
+        self.cos_table: np.ndarray = np.cos(radians)
+        self.sin_table: np.ndarray = np.sin(radians)
+        self.chunks: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        # The number of chunks built so far and, flattened, the (x, y) world position every chunk starts at, which is
+        # the top platform of the chunk before it. The last pair is where the next chunk starts.
+        self.built: int = 0
+        self.ends: array = array('i', self.start)
+
+    def chunk(self, index: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get a chunk of platforms, building it and all chunks before it if needed. A chunk that was dropped already is
+        built again from where it starts, without being kept.
+        Args:
+        index (int): The index of the chunk, 0 is the lowest.
+        Returns:
+        tuple[np.ndarray, np.ndarray]: The x and y world positions of the CHUNK_SIZE platforms, from bottom to top.
+        """
+        chunk = self.chunks.get(index)
+        if chunk is not None:
+            return chunk
+        if index < self.built:
+            return self.build_chunk(index, self.ends[2 * index:2 * index + 2])
+        while self.built <= index:
+            chunk = self.chunks[self.built] = self.build_chunk(self.built, self.ends[-2:])
+            self.ends.extend((int(chunk[0][-1]), int(chunk[1][-1])))
+            self.chunks.pop(self.built - self.MAX_CHUNKS, None)
+            self.built += 1
+        return chunk
+
+    def build_chunk(self, index: int, end: Sequence[int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Build a chunk of platforms on top of the previous chunk.
+        Args:
+        index (int): The index of the chunk.
+        end (Sequence[int]): The (x, y) world position of the top platform of the previous chunk, or the start.
+        Returns:
+        tuple[np.ndarray, np.ndarray]: The x and y world positions of the platforms, from bottom to top.
+        """
+        last_x, last_y = end
+        rng = np.random.default_rng((self.seed, index))
+        distances = rng.integers(self.distances[0], self.distances[1], size=self.CHUNK_SIZE, endpoint=True)
+        angles = rng.integers(0, len(self.cos_table), size=self.CHUNK_SIZE)
+        steps_x = (self.cos_table[angles] * distances).astype(np.int64)
+        # Every platform has to be above the last one, even for the flattest angle and shortest distance.
+        steps_y = np.maximum((self.sin_table[angles] * distances).astype(np.int64), 1)
+        ys = last_y - np.cumsum(steps_y)
+
+        xs = []
+        for step_x in steps_x.tolist():
+            if last_x + step_x < 0 or last_x + step_x + self.platform_width > self.width:
+                step_x = -step_x
+            last_x += step_x
+            xs.append(last_x)
+        return np.array(xs, dtype=np.int32), ys.astype(np.int32)
+
+
+class CourseCache:
+    """ Least recently used cache of course generators, so courses with the same key share their chunks. """
+    MAX_SIZE: Final[int] = 32
+
+    def __init__(self, max_size: int = MAX_SIZE) -> None:
+        """
+        Initialize the course cache.
+        Args:
+        max_size (int): The number of generators to keep.
+        """
+        self.max_size: int = max_size
+        self.generators: OrderedDict[CourseKey, CourseGenerator] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, seed: int, platform_size: tuple[int], platform_distances: tuple[int], angle_limit: tuple[int], width: int, start: tuple[int]) -> CourseGenerator:
+        """
+        Get the generator of a course, creating it only if it is not cached.
+        Args:
+        seed (int): The seed of the course.
+        platform_size (tuple[int]): The (width, height) of every platform.
+        platform_distances (tuple[int]): The smallest and largest distance between two platforms.
+        angle_limit (tuple[int]): The smallest and largest angle in degrees from one platform to the next.
+        width (int): The width of the window the platforms have to stay in.
+        start (tuple[int]): The (x, y) world position of the first platform.
+        Returns:
+        CourseGenerator: The generator. It is shared and its chunks must not be modified.
+        """
+        key = (seed, tuple(platform_size), tuple(platform_distances), tuple(angle_limit), width, tuple(start))
+        generator = self.generators.get(key)
+        if generator is not None:
+            self.generators.move_to_end(key)
+            self.hits += 1
+            return generator
+        self.misses += 1
+        generator = self.generators[key] = CourseGenerator(*key)
+        if len(self.generators) > self.max_size:
+            self.generators.popitem(last=False)
+        return generator
+
+
+courses: Final[CourseCache] = CourseCache()
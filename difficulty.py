@@ -0,0 +1,161 @@
+"""
+Monte Carlo analysis of the difficulty presets.
+Samples large numbers of courses per preset with the real course generator and checks every gap between two
+platforms against a precomputed jump reachability envelope instead of simulating the player. Reports the rate
+of impossible gaps, the expected score along the course of a player whose timing is off by a little and the
+throughput.
+    python difficulty.py --courses 100000 --workers 8
+    python difficulty.py --timing-noise 0.1
+"""
+import numpy as np
+
+from course_generator import CourseGenerator
+from player_batch import PlayerBatch
+import settings as sett
+
+import argparse
+import multiprocessing as mp
+import os
+import time
+from typing import Final
+
+CHECKPOINTS: Final[tuple[int]] = (10, 25, 50, 100, 200)
+# The standard deviation in seconds of when a player lets go of a key, which moves the landing point sideways.
+TIMING_NOISE: Final[float] = 0.05
+
+
+def reach_envelope() -> np.ndarray:
+    """
+    Compute how far the player can move sideways during a jump before landing on a platform at a given height.
+    PlayerBatch moves the player along the exact jump arc and lands it where its feet cross the top of a platform
+    on the way down, so the reach is the time of that crossing at full sideways speed, whatever the step rate.
+    Returns:
+    np.ndarray: The reach in pixels per whole pixel height above the launch platform, up to the top of the arc.
+    """
+    apex = sett.JUMP_SPEED ** 2 / (2 * sett.GRAVITY)
+    heights = np.arange(int(apex) + 1)
+    # The later root of JUMP_SPEED * t + GRAVITY / 2 * t ** 2 = -height. Above the launch platform the player falls
+    # slower than JUMP_SPEED, so MAX_FALL_SPEED is never reached.
+    return sett.MOVE_SPEED * (-sett.JUMP_SPEED + np.sqrt(sett.JUMP_SPEED ** 2 - 2 * sett.GRAVITY * heights)) / sett.GRAVITY
+
+
+def reach_chance(window: np.ndarray, timing_noise: float) -> np.ndarray:
+    """
+    Get the chance of landing on a platform for a player that aims at the middle of the sideways distances it can
+    land from, and lands off by a normal error of MOVE_SPEED times the timing noise.
+    Args:
+    window (np.ndarray): How wide the range of sideways distances is that the player can land from, in pixels.
+    timing_noise (float): The standard deviation of the player's timing in seconds, 0 for a perfect player.
+    Returns:
+    np.ndarray: The chance per gap, 0 for gaps out of reach.
+    """
+    if not timing_noise:
+        return (window >= 0).astype(float)
+    # 2 * Phi(z) - 1 for the error within half the window, with the logistic approximation of the normal CDF.
+    return np.tanh(0.851 * np.maximum(window, 0) / (2 * sett.MOVE_SPEED * timing_noise))
+
+
+def analyze_courses(difficulty: str, seeds: range, platforms: int, timing_noise: float = TIMING_NOISE) -> dict[str, np.ndarray | int]:
+    """
+    Check the gaps of a batch of courses.
+    Args:
+    difficulty (str): The name of the difficulty preset in settings.DIFFICULTIES.
+    seeds (range): The course seeds to sample.
+    platforms (int): The number of generated platforms per course.
+    timing_noise (float): The standard deviation of the player's timing in seconds.
+    Returns:
+    dict[str, np.ndarray | int]: The number of gaps, the number of impossible gaps, the number of courses without
+    any and the summed chance over all courses that the player reaches each platform.
+    """
+    preset = sett.DIFFICULTIES[difficulty]
+    width = preset['platform_size'][0]
+    envelope = reach_envelope()
+    start_x, start_y = sett.GAME_WINDOW_RESOLUTION[0] // 2, sett.GAME_WINDOW_RESOLUTION[1] - 100
+    start = (start_x - width // 2, start_y + 15)
+    chunks = -(-platforms // CourseGenerator.CHUNK_SIZE)
+    # The player's center can be anywhere from half a player left of a platform to half a player right of it and
+    # still land on it.
+    slack = width + PlayerBatch.WIDTH
+
+    impossible = 0
+    completable = 0
+    reached = np.zeros(platforms)
+    for seed in seeds:
+        generator = CourseGenerator(seed, preset['platform_size'], preset['platform_distances'], preset['angle_limit'], sett.GAME_WINDOW_RESOLUTION[0], start)
+        course = [generator.chunk(index) for index in range(chunks)]
+        xs = np.concatenate([(start[0],)] + [chunk[0] for chunk in course])[:platforms + 1]
+        ys = np.concatenate([(start[1],)] + [chunk[1] for chunk in course])[:platforms + 1]
+        heights = -np.diff(ys)
+        distances = np.abs(np.diff(xs))
+        # The player lands on the next platform from any sideways distance within the slack of the gap that it
+        # can reach at that height. Gaps higher than the arc have no such distance.
+        window = np.full(platforms, -1.0)
+        in_arc = heights < len(envelope)
+        window[in_arc] = np.minimum(distances[in_arc] + slack, envelope[heights[in_arc]]) - np.maximum(distances[in_arc] - slack, 0)
+        chances = reach_chance(window, timing_noise)
+        impossible += int((window < 0).sum())
+        completable += bool((window >= 0).all())
+        reached += np.cumprod(chances)
+    return {'gaps': len(seeds) * platforms, 'impossible': impossible, 'completable': completable, 'reached': reached}
+
+
+def analyze(difficulty: str, courses: int, platforms: int = 256, workers: int = 0, seed: int = 0, timing_noise: float = TIMING_NOISE) -> dict[str, float | list[float]]:
+    """
+    Sample courses of a preset, spread over worker processes.
+    Args:
+    difficulty (str): The name of the difficulty preset in settings.DIFFICULTIES.
+    courses (int): The number of courses to sample.
+    platforms (int): The number of generated platforms per course.
+    workers (int): The number of worker processes. 0 uses one per CPU core.
+    seed (int): The first course seed, the courses use consecutive seeds.
+    timing_noise (float): The standard deviation of the player's timing in seconds, 0 for a perfect player.
+    Returns:
+    dict[str, float | list[float]]: The impossible gap rate, the share of courses without impossible gaps, the
+    expected score at every checkpoint and the throughput.
+    """
+    workers = workers or os.cpu_count() or 1
+    batch = -(-courses // (workers * 4))
+    tasks = [(difficulty, range(first, min(first + batch, seed + courses)), platforms, timing_noise) for first in range(seed, seed + courses, batch)]
+    start = time.perf_counter()
+    if workers == 1:
+        results = [analyze_courses(*task) for task in tasks]
+    else:
+        with mp.get_context().Pool(workers) as pool:
+            results = pool.starmap(analyze_courses, tasks)
+    elapsed = time.perf_counter() - start
+
+    gaps = sum(result['gaps'] for result in results)
+    reached = sum(result['reached'] for result in results)
+    # The player scores on every platform it reaches.
+    expected_score = 100 * np.cumsum(reached / courses)
+    return {'impossible_rate': sum(result['impossible'] for result in results) / gaps,
+            'completable': sum(result['completable'] for result in results) / courses,
+            'expected_score': [float(expected_score[min(checkpoint, platforms) - 1]) for checkpoint in CHECKPOINTS],
+            'courses_per_s': courses / elapsed,
+            'gaps_per_s': gaps / elapsed}
+
+
+def main() -> None:
+    """ Analyze the difficulty presets and print a report. """
+    parser = argparse.ArgumentParser(description="Monte Carlo analysis of the JumPy difficulty presets.")
+    parser.add_argument('--courses', type=int, default=20000, help="Courses per preset.")
+    parser.add_argument('--platforms', type=int, default=256, help="Platforms per course.")
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes, 0 for one per CPU core.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--presets', nargs='*', default=list(sett.DIFFICULTIES), choices=tuple(sett.DIFFICULTIES))
+    parser.add_argument('--timing-noise', type=float, default=TIMING_NOISE,
+                        help="Standard deviation of the player's timing in seconds, 0 for a perfect player.")
+    args = parser.parse_args()
+
+    envelope = reach_envelope()
+    print(f"jump envelope: {len(envelope) - 1} px high, up to {envelope.max():.0f} px sideways")
+    print(f"{'preset':<8}{'impossible':>12}{'completable':>13}" + ''.join(f"{f'score@{checkpoint}':>12}" for checkpoint in CHECKPOINTS) + f"{'courses/s':>12}{'gaps/s':>12}")
+    for difficulty in args.presets:
+        report = analyze(difficulty, args.courses, args.platforms, args.workers, args.seed, args.timing_noise)
+        print(f"{difficulty:<8}{report['impossible_rate']:>12.4%}{report['completable']:>13.2%}"
+              + ''.join(f"{score:>12.0f}" for score in report['expected_score'])
+              + f"{report['courses_per_s']:>12.0f}{report['gaps_per_s']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
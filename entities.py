@@ -1,116 +1,157 @@
+import numpy as np
 import pygame as pg
 import math
-from random import randint, choice
-import utilities as ut
+import struct
+from random import Random, randint, choice
 import settings as sett
+from assets import assets
+from text_cache import fonts, texts
+from platform_store import PlatformStore
+from player_batch import PlayerBatch
+from course_generator import CourseGenerator, courses
 
 from typing import TypeVar, Final
 
 Game = TypeVar("Game")
-Platform_objects = TypeVar("Platform_objects")
-Platform_rects = TypeVar("Platform_rects")
 Cloud = TypeVar("Cloud")
 
 
 class Player:
-    def __init__(self, game: Game, color: str, pos: tuple[int]) -> None:
+    def __init__(self, game: Game, color: str, pos: None | tuple[int] = None, batch: None | PlayerBatch = None, index: int = 0) -> None:
         """
-        Initialize the player object.
+        Initialize the player object. The state of the player lives in one row of a PlayerBatch, this object
+        only reads it for rendering.
         Args:
         game (Game): The game object.
         color (str): The color of the player.
-        pos (tuple[int]): The initial position of the player.
+        pos (None | tuple[int]): The initial position of a player that gets its own batch. Ignored if batch is given.
+        batch (None | PlayerBatch): The batch holding the player's state.
+        index (int): The row of the player in the batch.
         """
-        self.pos: list[int] = list(pos)
         self.game: Game = game
         self.color: str = color
-        self.velocity: list[int] = [0, 0]
-
-        self.player_rect: pg.Rect = pg.Rect(self.pos[0] - 16, self.pos[1] - 64, 32, 64)
-        self.old_bottom_position: tuple[int] = self.player_rect.bottom
-        self.frame_counter: int = 0
-
-        self.score: int = 0
-        self.font: pg.font.Font = pg.font.SysFont('comicsans', 32)
+        self.batch: PlayerBatch = batch if batch is not None else PlayerBatch([pos])
+        self.index: int = index
 
         self.is_flipped: bool = False
+        self.player_img: None | pg.Surface = None
+
+    def load_assets(self) -> None:
+        """ Load the image of the player. Only needed for rendering, headless simulations never call this. """
+        self.image_name: str = 'player1' if self.color == 'red' else 'player2'
+        self.player_img = assets.variant(self.image_name, (PlayerBatch.WIDTH, PlayerBatch.HEIGHT))
+        self.is_flipped = False
+
+    @property
+    def pos(self) -> np.ndarray:
+        """ The [centerx, bottom] position of the player, a writable view into the batch. """
+        return self.batch.pos[self.index]
+
+    @property
+    def previous_pos(self) -> np.ndarray:
+        """ The position of the player before the last simulation step. """
+        return self.batch.previous_pos[self.index]
+
+    @property
+    def velocity(self) -> np.ndarray:
+        """ The velocity of the player in pixels per second, a writable view into the batch. """
+        return self.batch.velocity[self.index]
+
+    @property
+    def score(self) -> int:
+        """ The score of the player. """
+        return int(self.batch.scores[self.index])
+
+    @property
+    def player_rect(self) -> pg.Rect:
+        """ The whole pixel rect of the player after the last simulation step. """
+        return self.rect_at(self.pos)
+
+    @property
+    def has_fallen(self) -> bool:
+        """ Whether the player has dropped out of the bottom of the game window. """
+        return self.player_rect.top > sett.GAME_WINDOW_RESOLUTION[1]
+
+    @staticmethod
+    def rect_at(pos: tuple[float]) -> pg.Rect:
+        """
+        Get the rect of a player at a position.
+        Args:
+        pos (tuple[float]): The [centerx, bottom] position.
+        Returns:
+        pg.Rect: The rect.
+        """
+        return pg.Rect(int(pos[0]) - PlayerBatch.WIDTH // 2, int(pos[1]) - PlayerBatch.HEIGHT, PlayerBatch.WIDTH, PlayerBatch.HEIGHT)
 
-        if color == 'red':
-            self.player_img: pg.Surface = pg.transform.scale(ut.load_image('player1'), (32, 64))
-        else:
-            self.player_img: pg.Surface = pg.transform.scale(ut.load_image('player2'), (32, 64))
-
-    def update(self, platforms: list[Platform_objects], platform_rects: list[Platform_rects], movement: tuple[int] = (0, 0)) -> None:
+    def render_rect(self, alpha: float = 1.0) -> pg.Rect:
         """
-        Update the player position and velocity.
+        Get where to draw the player between the last two simulation steps.
         Args:
-        platforms (Platform_objects): The list of platform objects.
-        platform_rects (Platform_rects): The list of platform rectangles.
-        movement (tuple[int]): The movement of the player.
-        """
-        self.pos[0] += ((movement[1] - movement[0]) * 5)
-        self.velocity[1] = min(8, self.velocity[1] + 0.1)
-        i=0
-        for i, platform_rect in enumerate(platform_rects):
-            if self.player_rect.colliderect(platform_rect):
-                if self.velocity[1] > 0 and self.old_bottom_position < platform_rect.top:
-                    self.player_rect.bottom = platform_rect.top
-                    self.velocity[1] = -4.5
-                    if platforms[i][2] == 1:
-                        self.score += 100
-                        platforms[i][2] = 0
-
-        self.player_rect.y += self.velocity[1]
-        self.player_rect.centerx = self.pos[0]
-
-        if self.player_rect.right > sett.GAME_WINDOW_RESOLUTION[0]:
-            self.player_rect.right = sett.GAME_WINDOW_RESOLUTION[0]
-            self.pos[0] = self.player_rect.centerx
-        if self.player_rect.left < 0:
-            self.player_rect.left = 0
-            self.pos[0] = self.player_rect.centerx
-        if self.player_rect.top < 0:
-            self.player_rect.top = 0
-            self.pos[1] = self.player_rect.centery
-            self.velocity[1] = 0
-        
-        if self.frame_counter >= 20:
-            self.old_bottom_position = self.player_rect.bottom
-            self.frame_counter = 0
-        self.frame_counter += 1
-
-    def render(self, flip: bool, left: bool = True) -> None:
+        alpha (float): How far the display time is past the previous step, 0 draws the previous and 1 the current step.
+        Returns:
+        pg.Rect: The interpolated player rect.
+        """
+        previous, current = self.previous_pos.tolist(), self.pos.tolist()
+        return self.rect_at((previous[0] + (current[0] - previous[0]) * alpha, previous[1] + (current[1] - previous[1]) * alpha))
+
+    def render(self, flip: bool, left: bool = True, alpha: float = 1.0) -> None:
         """
         Render the player.
         Args:
         flip (bool): Whether to flip the player image.
         left (bool): Whether the player is on the left side of the screen.
+        alpha (float): The interpolation between the last two simulation steps.
+        """
+        if self.player_img is None:
+            self.load_assets()
+        self.render_score(left)
+        self.render_sprite(flip, alpha)
+
+    def render_score(self, left: bool = True) -> pg.Rect:
+        """
+        Render the score of the player above the game window.
+        Args:
+        left (bool): Whether the player is on the left side of the screen.
+        Returns:
+        pg.Rect: The area of the main window the score was drawn to.
         """
         x_pos = 175 if left else sett.MAIN_WINDOW_RESOLUTION[0] - 175
-        score_to_render = self.font.render(str(self.score), True, 'white')
-        self.game.MAIN_WINDOW.blit(score_to_render, (x_pos - score_to_render.get_width() // 2, 15))
-        if flip and not self.is_flipped:
-            self.player_img = pg.transform.flip(self.player_img, True, False)
-            self.is_flipped = True
-        elif not flip and self.is_flipped:
-            self.player_img = pg.transform.flip(self.player_img, True, False)
-            self.is_flipped = False
-        self.game.GAME_WINDOW_SURF.blit(self.player_img, self.player_rect)
+        digits = fonts.digits('comicsans', 32, 'white')
+        return digits.blit(self.game.MAIN_WINDOW, self.score, (x_pos - digits.width(self.score) // 2, 15))
+
+    def render_sprite(self, flip: bool, alpha: float = 1.0) -> None:
+        """
+        Render the player image on the game window.
+        Args:
+        flip (bool): Whether to flip the player image.
+        alpha (float): The interpolation between the last two simulation steps.
+        """
+        if self.player_img is None:
+            self.load_assets()
+        if flip != self.is_flipped:
+            self.player_img = assets.variant(self.image_name, (PlayerBatch.WIDTH, PlayerBatch.HEIGHT), flip)
+            self.is_flipped = flip
+        self.game.GAME_WINDOW_SURF.blit(self.player_img, self.render_rect(alpha))
         # pg.draw.rect(self.game.GAME_WINDOW_SURF, self.color, self.player_rect)
 
 
 class Platform:
-    def __init__(self, game: Game, surf: pg.Surface, game_window_res: tuple[int], start_position: tuple[int], platform_size: tuple[int] = (100, 10), platform_distances: tuple[int] = (50, 100), angle_limit: tuple[int] = (10, 170)) -> None:
+    STATE_HEADER: Final[struct.Struct] = struct.Struct('<ddI')
+    # The platforms scroll down by a pixel whenever the update timer reaches this.
+    SCROLL_TIME: Final[float] = 100.0
+
+    def __init__(self, game: Game, surf: None | pg.Surface, game_window_res: tuple[int], start_position: tuple[int], platform_size: tuple[int] = (100, 10), platform_distances: tuple[int] = (50, 100), angle_limit: tuple[int] = (10, 170), seed: None | int = None) -> None:
         """
         Initialize the platform.
         Args:
         game (Game): The game instance.
-        surf (pg.Surface): The surface to draw the platform on.
+        surf (None | pg.Surface): The surface to draw the platform on. None for headless simulations.
         game_window_res (tuple[int]): The resolution of the game window.
         start_position (tuple[int]): The starting position of the platform.
         platform_size (tuple[int]): The size of the platform.
         platform_distances (tuple[int]): The distance between platforms.
         angle_limit (tuple[int]): The angle limit of one platform to the next platform.
+        seed (None | int): The seed of the course. Courses with the same seed and settings are identical. None for a random course.
         """
         self.game: Game = game
         self.surface: pg.Surface = surf
@@ -119,64 +160,111 @@ class Platform:
         self.size: tuple[int] = platform_size
         self.distances: tuple[int] = platform_distances
         self.angle_limit: tuple[int] = angle_limit
+        self.seed: int = seed if seed is not None else Random().getrandbits(32)
 
         self.scroll_factor: int = 1
         self.update_timer: float = 0.0
         self.timer_unit: float = 2.0
 
-        self.platforms: list[Platform_objects] = []
-        self.platform_rects: list[Platform_rects] = []
-        self.platforms.append([self.start_position[0] - self.size[0] // 2, self.start_position[1] + 15, 0])
-        self.platform_rects.append(pg.Rect(self.start_position[0] - self.size[0] // 2, self.start_position[1] + 15, *self.size))
+        self.platforms: PlatformStore = PlatformStore(self.size)
+        self.platforms.append(self.start_position[0] - self.size[0] // 2, self.start_position[1] + 15, 0)
+        self.generator: CourseGenerator = courses.get(self.seed, self.size, self.distances, self.angle_limit, self.game_res[0], self.platforms.top)
+        self.chunk_index: int = 0
+
+        self.platform_img: None | pg.Surface = None
+
+    def get_state(self) -> bytes:
+        """
+        Serialize the scrolling and the platforms of the course.
+        Returns:
+        bytes: The state, to be restored with set_state.
+        """
+        return self.STATE_HEADER.pack(self.update_timer, self.timer_unit, self.chunk_index) + self.platforms.get_state()
 
-        self.platform_img: pg.Surface = pg.transform.scale(ut.load_image('platform'), (self.size[0], self.size[0] // 10))
+    def set_state(self, state: bytes) -> None:
+        """
+        Restore the scrolling and the platforms of a course with the same seed and settings from get_state.
+        Args:
+        state (bytes): The serialized state.
+        """
+        self.update_timer, self.timer_unit, self.chunk_index = self.STATE_HEADER.unpack_from(state)
+        self.platforms.set_state(state[self.STATE_HEADER.size:])
 
     def platform_builder(self) -> None:
-        """ Build the platforms. """
-        distance = randint(self.distances[0], self.distances[1])
-        angle = randint(self.angle_limit[0], self.angle_limit[1])
-        relativ_platform_pos = [int((math.cos(math.radians(angle)) * distance)), int((math.sin(math.radians(angle)) * distance))]
-        if self.platforms[-1][0] + relativ_platform_pos[0] < 0 or self.platforms[-1][0] + relativ_platform_pos[0] + self.size[0] > self.game_res[0]:
-            relativ_platform_pos[0] *= -1
-        new_platform = [self.platforms[-1][0] + relativ_platform_pos[0], self.platforms[-1][1] - relativ_platform_pos[1], 1]
-        self.platform_rects.append(pg.Rect(new_platform[0], new_platform[1], *self.size))
-        self.platforms.append(new_platform)
+        """ Build the next chunk of platforms on top of the course. """
+        xs, ys = self.generator.chunk(self.chunk_index)
+        self.platforms.extend(xs, ys)
+        self.chunk_index += 1
    
     def platform_handler(self) -> None:
         """ Handle the platforms. """
-        while self.platforms[-1][1] > -100:
+        while self.platforms.screen_y(self.platforms.start) > -100:
             self.platform_builder()
             
-        if self.platforms[1][1] > self.game_res[1] + 100:
-            self.platforms.pop(0)
-            self.platform_rects.pop(0)
+        # Every platform that scrolled out is dropped, even when several did since the last call.
+        while len(self.platforms) > 2 and self.platforms.screen_y(self.platforms.end - 2) > self.game_res[1] + 100:
+            self.platforms.pop_bottom()
 
     def scroll_platforms_down(self) -> None:
         """ Scroll the platforms down. """
-        for platform in self.platforms:
-            platform[1] += self.scroll_factor
-        for platform_rect in self.platform_rects:
-            platform_rect[1] += self.scroll_factor
+        self.platforms.scroll(self.scroll_factor)
 
     def render(self) -> None:
         """ Render the platforms. """
-        for platform in self.platforms:
-            self.surface.blit(self.platform_img, (platform[0], platform[1]))
+        if self.platform_img is None:
+            self.platform_img = assets.variant('platform', (self.size[0], self.size[0] // 10))
+        positions = self.platforms.screen_positions(0, self.surface.get_height())
+        self.surface.blits([(self.platform_img, position) for position in positions], doreturn=False)
             #pg.draw.rect(self.surface, 'black', (platform[0], platform[1], self.size[0], self.size[1]), border_radius=3)
 
-    def update(self, moved: bool = True) -> None:
+    def update(self, moved: bool = True, dt: float = 1 / sett.BASE_FRAME_RATE) -> None:
         """
         Update the platforms.
         Args:
         moved (bool): Whether the player has moved. Defaults to True.
+        dt (float): The length of the step in seconds. The platforms scroll by scroll_speed pixels per second, the rest
+        of the update timer carries over to the next step.
         """
         self.platform_handler()
         if moved:
-            self.update_timer += self.timer_unit
-            if self.update_timer > 100:
+            self.update_timer += self.timer_rate() * dt
+            # Steps end right at a scroll (see time_to_scroll), the tolerance absorbs the rounding of the timer.
+            while self.update_timer >= self.SCROLL_TIME - 1e-9:
                 self.scroll_platforms_down()
-                self.update_timer = 0
-                self.timer_unit += 0.2
+                self.update_timer = max(self.update_timer - self.SCROLL_TIME, 0.0)
+                # The timer unit stops growing once the scroll speed is capped.
+                if self.scroll_speed() < sett.MAX_SCROLL_SPEED:
+                    self.timer_unit += 0.2
+
+    def time_to_scroll(self, moved: bool = True) -> float:
+        """
+        Get how long it takes until the platforms scroll down next.
+        Args:
+        moved (bool): Whether the player has moved. The platforms only scroll after that.
+        Returns:
+        float: The time in seconds, infinite if the platforms do not scroll.
+        """
+        if not moved:
+            return math.inf
+        return (self.SCROLL_TIME - self.update_timer) / self.timer_rate()
+
+    def timer_rate(self) -> float:
+        """
+        Get how fast the update timer runs.
+        Returns:
+        float: The timer units per second, SCROLL_TIME per pixel the platforms scroll.
+        """
+        return self.SCROLL_TIME * self.scroll_speed()
+
+    def scroll_speed(self) -> float:
+        """
+        Get how fast the platforms scroll down. The original game added the timer unit to the update timer every frame
+        at BASE_FRAME_RATE and scrolled a pixel on the first frame the timer passed SCROLL_TIME, so this is that speed.
+        Returns:
+        float: The speed in pixels per second, at most settings.MAX_SCROLL_SPEED.
+        """
+        frames = math.floor(self.SCROLL_TIME / self.timer_unit) + 1
+        return min(sett.BASE_FRAME_RATE / frames, sett.MAX_SCROLL_SPEED)
 
 class Button:
     BUTTON_SIZE: Final[int] = 300
@@ -184,7 +272,7 @@ class Button:
 
     def __init__(self, surf: pg.Surface, text: str, pos: tuple[int], color_theme: str) -> None:
         """
-        Initialize an button object.
+        Initialize an button object. The normal, hover and pressed looks of the button are drawn once up front.
         Args:
         surf (pg.Surface): The surface to draw the button on.
         text (str): The text to display on the button.
@@ -195,21 +283,60 @@ class Button:
         self.text: str = text
         self.pos: list[int] = list(pos)
         self.color_theme: str = color_theme
-        self.font: pg.font.Font = pg.font.SysFont('comicsans', 32)
         self.button_top_rect: pg.Rect = pg.Rect(pos[0] - self.BUTTON_SIZE / 2, pos[1] - self.BUTTON_SIZE / 2, self.BUTTON_SIZE, self.BUTTON_SIZE)
         self.button_bottom_rect: pg.Rect = pg.Rect(pos[0] - self.BUTTON_SIZE / 2, pos[1] - self.BUTTON_SIZE / 2, self.BUTTON_SIZE, self.BUTTON_SIZE)
         self.button_offset: int = self.BUTTON_OFFSET
         self.button_color: tuple[int] = sett.BUTTON_COLORS[self.color_theme]['color']
         self.clicked: None | bool = None
-
-    def render(self) -> None:
-        """ Render the button. """
-        pg.draw.rect(self.surf, sett.BUTTON_COLORS[self.color_theme]['shadow_color'], self.button_bottom_rect, border_radius=50)
-        pg.draw.rect(self.surf, sett.BLACK, self.button_bottom_rect, border_radius=50, width=1)
-        pg.draw.rect(self.surf, self.button_color, (self.button_top_rect[0], self.button_top_rect[1] - self.button_offset, self.button_top_rect[2], self.button_top_rect[3]), border_radius=50)
-        pg.draw.rect(self.surf, sett.BUTTON_COLORS[self.color_theme]['frame_color'], (self.button_top_rect[0], self.button_top_rect[1] - self.button_offset, self.button_top_rect[2], self.button_top_rect[3]), border_radius=50, width=3)
-        text_surf = self.font.render(self.text, True, sett.BLACK)
-        self.surf.blit(text_surf, (self.pos[0] - text_surf.get_width() // 2, self.pos[1] - text_surf.get_height() // 2 - self.button_offset))
+        # The area of the raised button, which also covers the pressed one.
+        self.rect: pg.Rect = self.button_bottom_rect.inflate(0, self.BUTTON_OFFSET).move(0, -self.BUTTON_OFFSET // 2)
+        self.sprites: dict[tuple[tuple[int], int], pg.Surface] = {}
+        self.drawn_state: None | tuple[tuple[int], int] = None
+        colors = sett.BUTTON_COLORS[self.color_theme]
+        for state in ((colors['color'], self.BUTTON_OFFSET), (colors['hover_color'], self.BUTTON_OFFSET), (colors['hover_color'], 0)):
+            self.sprite(state)
+
+    @property
+    def state(self) -> tuple[tuple[int], int]:
+        """ The color and height of the button, everything that changes how it looks. """
+        return self.button_color, self.button_offset
+
+    def sprite(self, state: tuple[tuple[int], int]) -> pg.Surface:
+        """
+        Get the image of the button in a state, drawing it on first use.
+        Args:
+        state (tuple[tuple[int], int]): The color and height of the button.
+        Returns:
+        pg.Surface: The image of the button's rect, pure black where nothing is drawn.
+        """
+        sprite = self.sprites.get(state)
+        if sprite is None:
+            color, offset = state
+            sprite = self.sprites[state] = pg.Surface(self.rect.size).convert(self.surf)
+            # Pure black is the colorkey of the button surface, so the corners around the button stay see-through.
+            sprite.fill("black")
+            bottom_rect = self.button_bottom_rect.move(-self.rect.x, -self.rect.y)
+            top_rect = bottom_rect.move(0, -offset)
+            pg.draw.rect(sprite, sett.BUTTON_COLORS[self.color_theme]['shadow_color'], bottom_rect, border_radius=50)
+            pg.draw.rect(sprite, sett.BLACK, bottom_rect, border_radius=50, width=1)
+            pg.draw.rect(sprite, color, top_rect, border_radius=50)
+            pg.draw.rect(sprite, sett.BUTTON_COLORS[self.color_theme]['frame_color'], top_rect, border_radius=50, width=3)
+            text_surf = texts.render('comicsans', 32, self.text, sett.BLACK)
+            sprite.blit(text_surf, (self.pos[0] - text_surf.get_width() // 2 - self.rect.x, self.pos[1] - text_surf.get_height() // 2 - offset - self.rect.y))
+        return sprite
+
+    def render(self) -> None | pg.Rect:
+        """
+        Render the button if it looks different from the last time it was rendered.
+        Returns:
+        None | pg.Rect: The area that was drawn to, None if the button did not change.
+        """
+        state = self.state
+        if state == self.drawn_state:
+            return None
+        self.surf.blit(self.sprite(state), self.rect)
+        self.drawn_state = state
+        return pg.Rect(self.rect)
 
     def check_collision(self) -> None | bool:
         mouse_pos: tuple[int] = pg.mouse.get_pos()
@@ -228,22 +355,39 @@ class Button:
 
 
 class Cloud:
+    __slots__ = ('pos', 'image', 'depth', 'rect')
+
     def __init__(self, pos: tuple[int], image: pg.Surface, depth: int) -> None:
         """
         Initialize a cloud object.
         Args:
         pos (tuple[int]): The position of the cloud.
-        image (pg.Surface): The image of the cloud.
+        image (pg.Surface): The image of the cloud, already scaled and flipped for its depth.
         depth (int): The depth of the cloud.
         """
         self.pos: list[int] = list(pos)
-        self.image: pg.Surface = pg.transform.scale(image, (image.get_width() // depth, image.get_height() // depth))
-        self.image = pg.transform.flip(self.image, choice([True, False]), False)
+        self.image: pg.Surface = image
         self.depth: int = depth
+        # The area the cloud is drawn to, moved along with pos. Blits truncate float positions, so the rect does too.
+        self.rect: pg.Rect = pg.Rect(int(pos[0]), int(pos[1]), *image.get_size())
+
+    def reset(self, pos: tuple[int], image: pg.Surface, depth: int) -> None:
+        """
+        Reuse the cloud as a new one.
+        Args:
+        pos (tuple[int]): The position of the cloud.
+        image (pg.Surface): The image of the cloud, already scaled and flipped for its depth.
+        depth (int): The depth of the cloud.
+        """
+        self.pos[0], self.pos[1] = pos
+        self.image = image
+        self.depth = depth
+        self.rect.update(int(pos[0]), int(pos[1]), *image.get_size())
 
     def update(self) -> None:
         """ Update the cloud's position. """
-        self.pos[1] += 1 / (self.depth * 10)            
+        self.pos[1] += 1 / (self.depth * 10)
+        self.rect.y = int(self.pos[1])
 
     def render(self, surf: pg.Surface) -> None:
         """
@@ -254,45 +398,168 @@ class Cloud:
         surf.blit(self.image, self.pos)
 
 
+class CloudLayer:
+    def __init__(self, depth: int) -> None:
+        """
+        Initialize a layer holding all clouds of one depth.
+        All clouds of a layer move at the same speed. New clouds take over the sub-pixel phase of the layer, so the
+        whole layer moves by a pixel on the same frame instead of one cloud after the other.
+        Args:
+        depth (int): The depth of the clouds in this layer.
+        """
+        self.depth: int = depth
+        self.clouds: list[Cloud] = []
+        self.offset: float = 0.0
+
+    def add(self, cloud: Cloud) -> None:
+        """
+        Add a cloud to the layer.
+        Args:
+        cloud (Cloud): The cloud to add.
+        """
+        cloud.pos[1] = math.floor(cloud.pos[1]) + self.offset % 1
+        cloud.rect.y = int(cloud.pos[1])
+        self.clouds.append(cloud)
+
+    def update(self, bottom: int, pool: list[Cloud]) -> int:
+        """
+        Move the clouds of the layer and hand the ones below the given height back to the pool.
+        Args:
+        bottom (int): The height below which clouds are removed.
+        pool (list[Cloud]): The unused clouds.
+        Returns:
+        int: The number of removed clouds.
+        """
+        self.offset += 1 / (self.depth * 10)
+        removed = 0
+        for cloud in self.clouds:
+            cloud.update()
+            if cloud.pos[1] > bottom:
+                removed += 1
+        if removed:
+            pool.extend(cloud for cloud in self.clouds if cloud.pos[1] > bottom)
+            self.clouds[:] = [cloud for cloud in self.clouds if cloud.pos[1] <= bottom]
+        return removed
+
+    def render(self, surf: pg.Surface) -> None:
+        """
+        Render the clouds of the layer.
+        Args:
+        surf (pg.Surface): The surface to render the clouds on.
+        """
+        surf.blits([(cloud.image, cloud.pos) for cloud in self.clouds], doreturn=False)
+
+
 class Clouds:
-    def __init__(self) -> None:
+    DEPTHS: Final[tuple[int]] = (1, 2, 3)
+    CLOUD_IMAGES: Final[tuple[str]] = ('cloud1', 'cloud2', 'cloud3')
+
+    def __init__(self, background: None | tuple[int] = None) -> None:
         """
         Initializes an Cloud-Manager object.
+        Args:
+        background (None | tuple[int]): The sky color behind the clouds. If given, the sky and all cloud layers are
+        baked into one opaque surface that is only composed again when a cloud moves by a pixel, and render draws
+        the sky as well. Only use it where the clouds are the first thing drawn on the surface.
         """
-        self.cloud_images: list[pg.Surface] = []
-        self.clouds: list[Cloud] = []
+        self.layers: dict[int, CloudLayer] = {depth: CloudLayer(depth) for depth in self.DEPTHS}
+        # Clouds that left the screen are reused for new ones, so there are never more clouds than count.
+        self.pool: list[Cloud] = []
+        self.background: None | tuple[int] = background
+        self.sky: None | pg.Surface = None
+        self.sky_key: None | tuple = None
+        self.count: int = 0
         self.initial_start: bool = True
-        for i in range(1, 4):
-            self.cloud_images.append(ut.load_image('cloud' + str(i)))
+        # The list draw_rects returns, built again only when clouds were added or removed.
+        self.rects: list[tuple[Cloud, pg.Rect]] = []
+        self.rects_changed: bool = True
+
+    @property
+    def clouds(self) -> list[Cloud]:
+        """ All clouds in drawing order. """
+        return [cloud for layer in self.layers.values() for cloud in layer.clouds]
+
+    @classmethod
+    def variant(cls, img_number: int, depth: int, flip: bool) -> pg.Surface:
+        """
+        Get a cloud image scaled for its depth and possibly flipped.
+        Args:
+        img_number (int): The index of the cloud image.
+        depth (int): The depth of the cloud.
+        flip (bool): Whether the image is flipped horizontally.
+        Returns:
+        pg.Surface: The cloud image.
+        """
+        name = cls.CLOUD_IMAGES[img_number]
+        width, height = assets.image(name).get_size()
+        return assets.variant(name, (width // depth, height // depth), flip)
 
     def update(self, count=16) -> None:
         """
-        Creates and updates the clouds.
+        Creates and moves the clouds and deletes them if they are off the screen.
         Args:
         count (int): The number of clouds to create/have.
         """
-        while True:
-            if len(self.clouds) < count:
-                y_pos = sett.GAME_WINDOW_RESOLUTION[1] if self.initial_start else -sett.GAME_WINDOW_RESOLUTION[1] // 4
-                pos = (randint(0, sett.GAME_WINDOW_RESOLUTION[0]), (randint(0, y_pos) if y_pos > 0 else randint(y_pos, 0)))
-                img_number = randint(0, 2)
-                depth = randint(1, 3)
-                cloud = Cloud(pos, self.cloud_images[img_number], depth)
-                self.clouds.append(cloud)
+        if self.count < count:
+            self.rects_changed = True
+        while self.count < count:
+            y_pos = sett.GAME_WINDOW_RESOLUTION[1] if self.initial_start else -sett.GAME_WINDOW_RESOLUTION[1] // 4
+            pos = (randint(0, sett.GAME_WINDOW_RESOLUTION[0]), (randint(0, y_pos) if y_pos > 0 else randint(y_pos, 0)))
+            img_number = randint(0, 2)
+            depth = randint(1, 3)
+            image = self.variant(img_number, depth, choice([True, False]))
+            if self.pool:
+                cloud = self.pool.pop()
+                cloud.reset(pos, image, depth)
             else:
-                self.initial_start = False
-                break
+                cloud = Cloud(pos, image, depth)
+            self.layers[depth].add(cloud)
+            self.count += 1
+        self.initial_start = False
 
-        self.clouds.sort(key=lambda x: x.depth)
+        for layer in self.layers.values():
+            removed = layer.update(sett.GAME_WINDOW_RESOLUTION[1] + 10, self.pool)
+            if removed:
+                self.count -= removed
+                self.rects_changed = True
 
     def render(self, surf: pg.Surface) -> None:
         """
-        Renders all clouds on the given surface and deletes them if they are off the screen.
+        Renders all clouds on the given surface.
         Args:
         surf (pg.Surface): The surface to render the clouds on.
         """
-        for cloud in self.clouds:
-            cloud.update()
-            cloud.render(surf)
-            if cloud.pos[1] > sett.GAME_WINDOW_RESOLUTION[1] + 10:
-                self.clouds.remove(cloud)
\ No newline at end of file
+        if self.background is None:
+            for layer in self.layers.values():
+                layer.render(surf)
+            return
+
+        key = (surf.get_size(), self.layout())
+        if key != self.sky_key:
+            if self.sky is None or self.sky.get_size() != surf.get_size():
+                self.sky = pg.Surface(surf.get_size()).convert(surf)
+            self.sky.fill(self.background)
+            for layer in self.layers.values():
+                layer.render(self.sky)
+            self.sky_key = key
+        surf.blit(self.sky, (0, 0))
+
+    def layout(self) -> tuple[tuple[int]]:
+        """
+        Get the whole pixel positions of all clouds, which only change when a cloud visibly moved.
+        Returns:
+        tuple[tuple[int]]: A key identifying each cloud and its top left corner.
+        """
+        return tuple((id(cloud), *cloud.rect.topleft) for cloud in self.clouds)
+
+    def draw_rects(self) -> list[tuple[Cloud, pg.Rect]]:
+        """
+        Get the areas the clouds are drawn to, for dirty rectangle tracking.
+        Returns:
+        list[tuple[Cloud, pg.Rect]]: Each cloud and the rect it covers. The list and the rects are reused and updated
+        in place on later frames.
+        """
+        if self.rects_changed:
+            self.rects[:] = [(cloud, cloud.rect) for cloud in self.clouds]
+            self.rects_changed = False
+        return self.rects
@@ -0,0 +1,393 @@
+"""
+Gym-style environments for training and evaluating bots without a display.
+    env = VectorEnv(256, 'normal', seed=0)
+    observations = env.reset()
+    observations, rewards, dones, info = env.step(actions)
+Every environment is a single-player game. An action is 0 (no input), 1 (left) or 2 (right), the reward is the
+score gained in the step (100 for the first landing on a platform) and an episode ends when the player falls out
+of the game window. Like in the game, a course only starts scrolling once its player gave any input.
+ProcessVectorEnv spreads the environments over worker processes.
+    python environment.py --envs 256 --workers 4
+"""
+import numpy as np
+
+from entities import Platform
+from player_batch import PlayerBatch
+from platform_store import PlatformStore
+import settings as sett
+
+import argparse
+import multiprocessing as mp
+import time
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from random import Random
+from typing import Final, Sequence
+
+StepResult = tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, np.ndarray]]
+
+ACTION_MOVEMENTS: Final[np.ndarray] = np.array(((False, False), (True, False), (False, True)))
+OBSERVED_PLATFORMS: Final[int] = 4
+OBSERVATION_SIZE: Final[int] = 4 + 2 * OBSERVED_PLATFORMS
+
+
+class VectorEnv:
+    """
+    Many independent single-player environments, stepped together in one process.
+    Every environment is a lane with its own course, and all players are advanced by one PlayerBatch. Finished
+    environments start a new episode on a new course right away, the step that ended an episode already returns
+    the first observation of the next one.
+    Observations are float32 rows of: player x, player bottom, vertical velocity, score, then the horizontal
+    and vertical offset from the player's feet to the platform at or below the feet and the next
+    OBSERVED_PLATFORMS - 1 platforms above it. Missing platforms read as straight below, a window height away.
+    """
+    LANE_SPACING: Final[int] = 1 << 32
+
+    def __init__(self, count: int, difficulty: str = 'normal', seed: None | int = None, step_rate: int = sett.SIMULATION_RATE, max_steps: None | int = None, auto_reset: bool = True) -> None:
+        """
+        Initialize the environments. reset has to be called before the first step.
+        Args:
+        count (int): The number of environments.
+        difficulty (str): The name of the difficulty preset in settings.DIFFICULTIES.
+        seed (None | int): The seed the course seeds are drawn from. None for random courses.
+        step_rate (int): The environment steps per simulated second, every step is one physics step.
+        max_steps (None | int): The number of steps after which an episode is cut off. None for no limit.
+        auto_reset (bool): Whether finished environments start a new episode on their own.
+        """
+        self.count: int = count
+        self.difficulty: str = difficulty
+        preset = sett.DIFFICULTIES[difficulty]
+        self.platform_size: tuple[int] = preset['platform_size']
+        self.platform_distances: tuple[int] = preset['platform_distances']
+        self.angle_limit: tuple[int] = preset['angle_limit']
+        self.dt: float = 1 / step_rate
+        self.max_steps: None | int = max_steps
+        self.auto_reset: bool = auto_reset
+        self.rng: Random = Random(seed)
+
+        self.start: tuple[int] = (sett.GAME_WINDOW_RESOLUTION[0] // 2, sett.GAME_WINDOW_RESOLUTION[1] - 100)
+        self.batch: PlayerBatch = PlayerBatch([self.start] * count, range(count))
+        self.platforms: list[None | Platform] = [None] * count
+        self.courses: list[None | PlatformStore] = [None] * count
+        self.episode_steps: np.ndarray = np.zeros(count, dtype=np.int64)
+        self.scores: np.ndarray = np.zeros(count, dtype=np.int64)
+        # Whether the player of every environment gave any input in its episode, which starts the scrolling.
+        self.moved: np.ndarray = np.zeros(count, dtype=bool)
+
+    def reset(self, seed: None | int = None) -> np.ndarray:
+        """
+        Start a new episode in every environment.
+        Args:
+        seed (None | int): Reseed the course seeds. None continues with the current seed stream.
+        Returns:
+        np.ndarray: The (count, OBSERVATION_SIZE) observations.
+        """
+        if seed is not None:
+            self.rng.seed(seed)
+        self.reset_lanes(range(self.count))
+        return self.observe()
+
+    def reset_lanes(self, lanes: Sequence[int]) -> None:
+        """
+        Start a new episode on a new course in some environments.
+        Args:
+        lanes (Sequence[int]): The indices of the environments.
+        """
+        for lane in lanes:
+            platforms = Platform(None, None, sett.GAME_WINDOW_RESOLUTION, self.start, self.platform_size, self.platform_distances, self.angle_limit, seed=self.rng.getrandbits(32))
+            platforms.platform_handler()
+            self.platforms[lane] = platforms
+            self.courses[lane] = platforms.platforms
+        lanes = list(lanes)
+        self.batch.reset_rows(lanes, [self.start] * len(lanes))
+        self.episode_steps[lanes] = 0
+        self.scores[lanes] = 0
+        self.moved[lanes] = False
+
+    def step(self, actions: Sequence[int]) -> StepResult:
+        """
+        Advance every environment by one step.
+        Args:
+        actions (Sequence[int]): One action per environment.
+        Returns:
+        StepResult: The observations, the rewards, whether each episode ended, and an info dict holding the
+        'truncated' flags and the 'final_scores' of the episodes that ended (0 for the others).
+        """
+        movements = ACTION_MOVEMENTS[np.asarray(actions)]
+        self.moved |= movements.any(axis=1)
+        moved = self.moved.tolist()
+        # Like Simulation.step, a step is split where a course scrolls, but every lane is split at its own scrolls.
+        # All players move at once by the time their lane has left until its next scroll or the end of the step.
+        self.batch.start_tick()
+        step_times = np.full(self.count, self.dt)
+        while (step_times > sett.STEP_EPSILON).any():
+            step_times[step_times <= sett.STEP_EPSILON] = 0.0
+            parts = np.minimum(step_times, [platforms.time_to_scroll(lane_moved) for platforms, lane_moved in zip(self.platforms, moved)])
+            self.batch.update(self.courses, movements, parts)
+            for platforms, lane_moved, part in zip(self.platforms, moved, parts.tolist()):
+                if part:
+                    platforms.update(lane_moved, part)
+            step_times -= parts
+        self.episode_steps += 1
+
+        scores = self.batch.scores
+        rewards = (scores - self.scores).astype(np.float32)
+        self.scores[:] = scores
+        truncated = self.episode_steps >= self.max_steps if self.max_steps is not None else np.zeros(self.count, dtype=bool)
+        dones = self.batch.fallen() | truncated
+        final_scores = np.where(dones, scores, 0)
+        if self.auto_reset and dones.any():
+            self.reset_lanes(np.flatnonzero(dones).tolist())
+        return self.observe(), rewards, dones, {'truncated': truncated, 'final_scores': final_scores}
+
+    def observe(self) -> np.ndarray:
+        """
+        Get the observations of all environments.
+        Returns:
+        np.ndarray: The (count, OBSERVATION_SIZE) observations.
+        """
+        # The live blocks of all courses are joined into one array. Shifting every lane by LANE_SPACING keeps it
+        # sorted, so a single search finds the platform at or below the feet of every player.
+        courses = self.courses
+        lengths = np.array([course.end - course.start for course in courses])
+        cameras = np.array([course.camera_y for course in courses])
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+        lane_offsets = np.arange(self.count, dtype=np.int64) * self.LANE_SPACING
+        ys = np.concatenate([course.ys[course.start:course.end] for course in courses])
+        xs = np.concatenate([course.xs[course.start:course.end] for course in courses])
+        keys = ys + np.repeat(lane_offsets, lengths)
+
+        pos = self.batch.pos
+        bottoms = self.batch.bottoms()
+        below = keys.searchsorted(bottoms - cameras + lane_offsets)
+        # From the platform at or below the feet upwards, which is towards the start of every lane's block.
+        indices = below[:, None] - np.arange(OBSERVED_PLATFORMS)
+        found = (indices >= starts[:, None]) & (indices < ends[:, None])
+        indices = np.clip(indices, 0, len(keys) - 1)
+
+        observations = np.empty((self.count, OBSERVATION_SIZE), dtype=np.float32)
+        observations[:, 0] = pos[:, 0]
+        observations[:, 1] = bottoms
+        observations[:, 2] = self.batch.velocity[:, 1]
+        observations[:, 3] = self.batch.scores
+        observations[:, 4::2] = np.where(found, xs[indices] + self.platform_size[0] / 2 - pos[:, 0, None], 0.0)
+        observations[:, 5::2] = np.where(found, ys[indices] + (cameras - bottoms)[:, None], sett.GAME_WINDOW_RESOLUTION[1])
+        return observations
+
+
+class JumpyEnv:
+    """ A single environment with the classic reset()/step(action) interface. """
+
+    def __init__(self, difficulty: str = 'normal', seed: None | int = None, step_rate: int = sett.SIMULATION_RATE, max_steps: None | int = None) -> None:
+        """
+        Initialize the environment. reset has to be called before the first step.
+        Args:
+        difficulty (str): The name of the difficulty preset in settings.DIFFICULTIES.
+        seed (None | int): The seed the course seeds are drawn from. None for random courses.
+        step_rate (int): The environment steps per simulated second.
+        max_steps (None | int): The number of steps after which an episode is cut off. None for no limit.
+        """
+        self.env: VectorEnv = VectorEnv(1, difficulty, seed, step_rate, max_steps, auto_reset=False)
+
+    def reset(self, seed: None | int = None) -> np.ndarray:
+        """
+        Start a new episode.
+        Args:
+        seed (None | int): Reseed the course seeds. None continues with the current seed stream.
+        Returns:
+        np.ndarray: The observation.
+        """
+        return self.env.reset(seed)[0]
+
+    def step(self, action: int) -> tuple[np.ndarray, float, bool, dict[str, bool | int]]:
+        """
+        Advance the environment by one step.
+        Args:
+        action (int): 0 for no input, 1 for left and 2 for right.
+        Returns:
+        tuple[np.ndarray, float, bool, dict[str, bool | int]]: The observation, the reward, whether the episode
+        ended and an info dict with the 'truncated' flag and the 'score'.
+        """
+        observations, rewards, dones, info = self.env.step((action,))
+        return observations[0], float(rewards[0]), bool(dones[0]), {'truncated': bool(info['truncated'][0]), 'score': int(self.env.scores[0])}
+
+
+def worker(connection: Connection, buffer_names: dict[str, str], count: int, offset: int, total: int, env_args: tuple) -> None:
+    """
+    Run a VectorEnv in a worker process of a ProcessVectorEnv.
+    The actions and results are exchanged through shared memory, the pipe only carries the commands.
+    Args:
+    connection (Connection): The worker's end of the command pipe.
+    buffer_names (dict[str, str]): The names of the shared memory blocks of the ProcessVectorEnv.
+    count (int): The number of environments of this worker.
+    offset (int): The index of the first environment of this worker.
+    total (int): The number of environments of all workers.
+    env_args (tuple): The difficulty, seed, step rate and max steps of the VectorEnv.
+    """
+    blocks, buffers = ProcessVectorEnv.attach(buffer_names, total)
+    own = {name: buffer[offset:offset + count] for name, buffer in buffers.items()}
+    env = VectorEnv(count, *env_args)
+    try:
+        while True:
+            command = connection.recv()
+            if command == 'step':
+                observations, rewards, dones, info = env.step(own['actions'])
+                own['rewards'][:] = rewards
+                own['dones'][:] = dones
+                own['truncated'][:] = info['truncated']
+                own['final_scores'][:] = info['final_scores']
+            elif command == 'reset':
+                observations = env.reset()
+            else:
+                break
+            own['observations'][:] = observations
+            connection.send(None)
+    finally:
+        del own, buffers
+        for block in blocks:
+            block.close()
+
+
+class ProcessVectorEnv:
+    """
+    Environments spread over worker processes, each running one VectorEnv.
+    step sends the actions to all workers at once and waits for the slowest one, so the environments of the
+    workers advance in parallel. Call close to stop the workers and free the shared memory.
+    """
+    BUFFERS: Final[dict[str, tuple[tuple[int], type]]] = {
+        'actions': ((), np.int8),
+        'observations': ((OBSERVATION_SIZE,), np.float32),
+        'rewards': ((), np.float32),
+        'dones': ((), np.bool_),
+        'truncated': ((), np.bool_),
+        'final_scores': ((), np.int64)
+        }
+
+    def __init__(self, workers: int, envs_per_worker: int, difficulty: str = 'normal', seed: None | int = None, step_rate: int = sett.SIMULATION_RATE, max_steps: None | int = None) -> None:
+        """
+        Start the workers.
+        Args:
+        workers (int): The number of worker processes.
+        envs_per_worker (int): The number of environments of every worker.
+        difficulty (str): The name of the difficulty preset in settings.DIFFICULTIES.
+        seed (None | int): The seed the seeds of the workers are drawn from. None for random courses.
+        step_rate (int): The environment steps per simulated second.
+        max_steps (None | int): The number of steps after which an episode is cut off. None for no limit.
+        """
+        self.count: int = workers * envs_per_worker
+        self.blocks: list[SharedMemory] = []
+        self.buffers: dict[str, np.ndarray] = {}
+        for name, (shape, dtype) in self.BUFFERS.items():
+            block = SharedMemory(create=True, size=max(self.count * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize, 1))
+            self.blocks.append(block)
+            self.buffers[name] = np.ndarray((self.count, *shape), dtype=dtype, buffer=block.buf)
+        buffer_names = {name: block.name for name, block in zip(self.BUFFERS, self.blocks)}
+
+        rng = Random(seed)
+        context = mp.get_context()
+        self.connections: list[Connection] = []
+        self.processes: list[mp.Process] = []
+        for index in range(workers):
+            parent, child = context.Pipe()
+            env_args = (difficulty, rng.getrandbits(32), step_rate, max_steps)
+            process = context.Process(target=worker, args=(child, buffer_names, envs_per_worker, index * envs_per_worker, self.count, env_args), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    @classmethod
+    def attach(cls, buffer_names: dict[str, str], count: int) -> tuple[list[SharedMemory], dict[str, np.ndarray]]:
+        """
+        Open the shared memory blocks of a ProcessVectorEnv from another process.
+        Args:
+        buffer_names (dict[str, str]): The names of the shared memory blocks.
+        count (int): The number of environments of all workers.
+        Returns:
+        tuple[list[SharedMemory], dict[str, np.ndarray]]: The blocks and the arrays backed by them.
+        """
+        blocks, buffers = [], {}
+        for name, (shape, dtype) in cls.BUFFERS.items():
+            block = SharedMemory(name=buffer_names[name])
+            blocks.append(block)
+            buffers[name] = np.ndarray((count, *shape), dtype=dtype, buffer=block.buf)
+        return blocks, buffers
+
+    def command(self, command: str) -> None:
+        """
+        Send a command to all workers and wait until every one of them is done.
+        Args:
+        command (str): 'step' or 'reset'.
+        """
+        for connection in self.connections:
+            connection.send(command)
+        for connection in self.connections:
+            connection.recv()
+
+    def reset(self) -> np.ndarray:
+        """
+        Start a new episode in every environment.
+        Returns:
+        np.ndarray: The (count, OBSERVATION_SIZE) observations.
+        """
+        self.command('reset')
+        return self.buffers['observations'].copy()
+
+    def step(self, actions: Sequence[int]) -> StepResult:
+        """
+        Advance every environment by one step.
+        Args:
+        actions (Sequence[int]): One action per environment.
+        Returns:
+        StepResult: The same as VectorEnv.step.
+        """
+        self.buffers['actions'][:] = actions
+        self.command('step')
+        buffers = {name: buffer.copy() for name, buffer in self.buffers.items()}
+        return buffers['observations'], buffers['rewards'], buffers['dones'], {'truncated': buffers['truncated'], 'final_scores': buffers['final_scores']}
+
+    def close(self) -> None:
+        """ Stop the workers and free the shared memory. """
+        for connection in self.connections:
+            connection.send('close')
+        for process in self.processes:
+            process.join()
+        self.buffers.clear()
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+
+def main() -> None:
+    """ Step environments with random actions and print their throughput. """
+    parser = argparse.ArgumentParser(description="Measure the JumPy environment throughput.")
+    parser.add_argument('--envs', type=int, default=256, help="Environments per worker.")
+    parser.add_argument('--workers', type=int, default=0, help="Worker processes, 0 steps the environments in this process.")
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--difficulty', default='normal', choices=tuple(sett.DIFFICULTIES))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.workers:
+        env = ProcessVectorEnv(args.workers, args.envs, args.difficulty, seed=args.seed)
+    else:
+        env = VectorEnv(args.envs, args.difficulty, seed=args.seed)
+    rng = np.random.default_rng(args.seed)
+    env.reset()
+    episodes, total_score = 0, 0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        _, _, dones, info = env.step(rng.integers(0, len(ACTION_MOVEMENTS), env.count))
+        episodes += int(dones.sum())
+        total_score += int(info['final_scores'].sum())
+    elapsed = time.perf_counter() - start
+    if args.workers:
+        env.close()
+    print(f"{env.count * args.steps} steps in {elapsed:.2f}s ({env.count * args.steps / elapsed:.0f} steps/s), "
+          f"{episodes} episodes, mean score {total_score / max(episodes, 1):.1f}")
+
+
+if __name__ == "__main__":
+    main()
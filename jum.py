@@ -1,37 +1,92 @@
-
-from entities import Player, Platform, Button, Clouds
+# Imported first, so the boot timer includes the time spent importing everything else.
+from boot import DEFAULT_CACHE_PATH, BootCache, Preloader, boot_timer
+from entities import Platform, Button, Clouds
+from simulation import Simulation
+from player_batch import PlayerBatch
+from rendering import DirtyRectTracker, MenuCompositor, ScreenTransition
+from profiler import FrameProfiler
+from replay import Recorder
+from assets import assets
+from text_cache import fonts, texts
 import settings as sett
 
 import pygame as pg
+import gc
+import os
 import sys
-from typing import Final, TypeVar
+import time
+from functools import partial
+from typing import Callable, Final, TypeVar
 
 Stairs = TypeVar("Stairs")
 
+boot_timer.mark('imports')
+
 class Game:
-    MAIN_WINDOW: Final[pg.display] = pg.display.set_mode(sett.MAIN_WINDOW_RESOLUTION)
-    GAME_WINDOW_SURF: Final[pg.Surface] = pg.Surface(sett.GAME_WINDOW_RESOLUTION)
     CLOCK: Final[pg.time.Clock] = pg.time.Clock()
     FPS: Final[int] = 60
+    # The [left, right] keys of every local player.
+    PLAYER_KEYS: Final[tuple[tuple[int]]] = ((pg.K_LEFT, pg.K_RIGHT), (pg.K_a, pg.K_d))
+    # The time per menu frame spent on loading the assets of the gameplay ahead of time.
+    PRELOAD_BUDGET: Final[float] = 0.004
+    # How long a network game shows that the other player left before it ends, in milliseconds.
+    DISCONNECT_TIME: Final[int] = 2000
 
-    def __init__(self) -> None:    
-        """ Initializes the game class. """
-        pg.init()
-        
-        self.start_screen: pg.Surface = pg.Surface(sett.MAIN_WINDOW_RESOLUTION)
+    def __init__(self, tooling: bool = False) -> None:
+        """
+        Initializes the game class.
+        Args:
+        tooling (bool): Whether a benchmark or test tool runs the game. It then neither reads nor writes the boot cache
+        of the player and leaves freezing the heap to the tool.
+        """
+        # The game neither plays sound nor reads joysticks, so only the modules it uses are started.
+        pg.display.init()
+        pg.font.init()
+        self.MAIN_WINDOW: pg.Surface = pg.display.set_mode(sett.MAIN_WINDOW_RESOLUTION)
+        # Created after the window, so it gets the pixel format of the display.
+        self.GAME_WINDOW_SURF: pg.Surface = pg.Surface(sett.GAME_WINDOW_RESOLUTION)
+        boot_timer.mark('window')
+
+        # The full window sized surfaces of the menus are created with their screens, network games skip them.
+        self.start_screen: None | pg.Surface = None
         self.show_start_screen: bool = True
-        self.difficulty_screen: pg.Surface = pg.Surface(sett.MAIN_WINDOW_RESOLUTION)
+        self.difficulty_screen: None | pg.Surface = None
         self.show_difficulty_screen: bool = True
-        self.button_surface: pg.Surface = pg.Surface(sett.MAIN_WINDOW_RESOLUTION)
+        self.button_surface: None | pg.Surface = None
+        self.menu: None | MenuCompositor = None
+        self.transition: None | ScreenTransition = None
  
         self.running: bool = True
 
         self.single_player: None | bool = None
-        self.movement_player1: list[bool] = [False, False]  # [left, right]
-        self.player1_flip: bool = False
-        self.movement_player2: list[bool] = [False, False]  # [left, right]
-        self.player2_flip: bool = False
+        self.movements: list[list[bool]] = [[False, False] for _ in self.PLAYER_KEYS]  # [left, right] per player
+        self.flips: list[bool] = [False for _ in self.PLAYER_KEYS]
+        # The player every set of PLAYER_KEYS controls. In network games the first set controls the own player.
+        self.local_players: tuple[int] = tuple(range(len(self.PLAYER_KEYS)))
+        self.network: 'None | NetworkThread' = None
+        self.peer: 'None | NetPeer' = None
+        # When a network game whose other player left ends, in pg.time.get_ticks milliseconds. None while it runs.
+        self.disconnect_deadline: None | int = None
         self.moved: bool = False
+        self.seed: None | int = None
+        self.simulation: None | Simulation = None
+        self.recorder: None | Recorder = None
+        # Every game is recorded into this directory when the window is closed. An empty value turns recording off.
+        self.recording_directory: str = os.environ.get('JUMPY_RECORDINGS', 'recordings')
+        self.dirty_rendering: bool = True
+        self.display_rects: None | list[pg.Rect] = None
+        self.game_window_tracker: None | DirtyRectTracker = None
+        self.frame_drawn: bool = False
+        self.platform_revisions: tuple[int] = ()
+        self.score_rects: dict[int, pg.Rect] = {}
+        self.drawn_scores: dict[int, int] = {}
+        self.profiler: FrameProfiler = FrameProfiler(enabled=bool(os.environ.get('JUMPY_PROFILE')))
+        self.profiler.show_overlay = self.profiler.enabled
+        self.profiler_rect: None | pg.Rect = None
+        # 0 leaves the frame rate uncapped, the simulation runs at settings.SIMULATION_RATE either way.
+        self.fps: int = int(os.environ.get('JUMPY_FPS', self.FPS))
+        self.start_stairs: None | Stairs = None
+        self.difficulty_stairs: None | Stairs = None
         self.platform_size: tuple[int] = (500, 50)
         self.platform_distances: tuple[int] = (250, 500)
 
@@ -44,190 +99,444 @@ class Game:
         self.easy: bool = False
         self.normal: bool = False
         self.hard: bool = False
+
+        # The fonts and images the last run used are looked up from the boot cache and loaded during the menus.
+        # 'exit' as report setting quits the game once the boot is done, to measure it from outside.
+        self.tooling: bool = tooling
+        self.boot_cache: BootCache = BootCache('' if tooling else os.environ.get('JUMPY_BOOT_CACHE', DEFAULT_CACHE_PATH))
+        self.exit_after_boot: bool = os.environ.get('JUMPY_BOOT_REPORT') == 'exit'
+        self.booted: bool = False
+        cached = self.boot_cache.load()
+        self.preloader: Preloader = Preloader()
+        if cached:
+            self.preloader.extend(fonts.restore(cached.get('fonts', {})))
+            self.preloader.extend(assets.restore(cached.get('variants', [])))
+        else:
+            self.preloader.extend(self.first_run_preloads())
         
-    def create_game_window(self) -> None:
-        """ Creates the game window. """
+    def first_run_preloads(self) -> list[Callable[[], object]]:
+        """
+        Lists the loading work for a run without a boot cache: the font, the button labels and the images of the
+        menus first, then the images of the gameplay of every difficulty.
+        Returns:
+        list[Callable[[], object]]: One function per asset, to be called when there is time.
+        """
+        tasks: list[Callable[[], object]] = [partial(fonts.font, 'comicsans', 32), partial(fonts.digits, 'comicsans', 32, 'white')]
+        # Buttons draw their sprites around these labels, rendered here they come from the text cache.
+        tasks.extend(partial(texts.render, 'comicsans', 32, label, sett.BLACK) for label in ("One Player", "Two Players", "Easy", "Normal", "Hard"))
+        tasks.append(partial(assets.variant, 'platform', (self.platform_size[0], self.platform_size[0] // 10)))
+        tasks.extend(partial(Clouds.variant, number, depth, flip)
+                     for number in range(len(Clouds.CLOUD_IMAGES)) for depth in Clouds.DEPTHS for flip in (False, True))
+        tasks.extend(partial(assets.variant, 'platform', (preset['platform_size'][0], preset['platform_size'][0] // 10))
+                     for preset in sett.DIFFICULTIES.values())
+        tasks.extend(partial(assets.variant, name, (PlayerBatch.WIDTH, PlayerBatch.HEIGHT), flip)
+                     for name in ('player1', 'player2') for flip in (False, True))
+        return tasks
+
+    def create_game_window(self, alpha: float = 1.0) -> None:
+        """
+        Creates the game window.
+        Args:
+        alpha (float): How far the frame is between the last two simulation steps, used to interpolate the players.
+        """
         self.difficulty_stairs: None | Stairs = None
+        self.clouds.update()
+        if self.dirty_rendering:
+            self.display_rects = self.render_dirty_game_window(alpha)
+            return
+
         self.MAIN_WINDOW.fill("black")
         pg.draw.rect(self.MAIN_WINDOW, "white", (sett.WINDOW_FRAME_POSITION, sett.WINDOW_FRAME_SIZE), border_radius=3)
-        self.GAME_WINDOW_SURF.fill((23, 123, 223))
-        self.clouds.update()
+        self.draw_game_window_content(alpha)
+        self.render_scores()
+        self.MAIN_WINDOW.blit(self.GAME_WINDOW_SURF, sett.GAME_WINDOW_POSITION)
+        self.display_rects = None
+
+    def draw_game_window_content(self, alpha: float = 1.0) -> None:
+        """
+        Draws the background, clouds, platforms and players on the game window surface.
+        Args:
+        alpha (float): The interpolation of the players between the last two simulation steps.
+        """
+        self.GAME_WINDOW_SURF.fill(sett.GAME_BACKGROUND_COLOR)
         self.clouds.render(self.GAME_WINDOW_SURF)
-        self.platforms1.render()
-        self.player1.render(flip=self.player1_flip)
-        if not self.single_player:
-            self.platforms2.render()
-            self.player2.render(left=False, flip=self.player2_flip)
+        for platforms in self.simulation.platforms:
+            platforms.render()
+        for player, flip in zip(self.simulation.players, self.flips):
+            player.render_sprite(flip, alpha)
 
-        self.MAIN_WINDOW.blit(self.GAME_WINDOW_SURF, (350, 25))
+    def render_scores(self, changed_only: bool = False) -> list[pg.Rect]:
+        """
+        Draws the scores of the players above the game window.
+        Args:
+        changed_only (bool): Whether to skip scores that did not change since they were last drawn.
+        Returns:
+        list[pg.Rect]: The areas of the main window that were drawn to.
+        """
+        rects: list[pg.Rect] = []
+        for i, player in enumerate(self.simulation.players):
+            if changed_only and self.drawn_scores.get(i) == player.score:
+                continue
+            old_rect = self.score_rects.get(i)
+            if changed_only and old_rect is not None:
+                self.MAIN_WINDOW.fill("black", old_rect)
+                rects.append(old_rect)
+            self.score_rects[i] = player.render_score(left=i == 0)
+            self.drawn_scores[i] = player.score
+            rects.append(self.score_rects[i])
+        return rects
+
+    def render_dirty_game_window(self, alpha: float = 1.0) -> list[pg.Rect]:
+        """
+        Redraws only the parts of the game window that changed since the last frame.
+        Falls back to redrawing the whole game window when the platforms scrolled or changed.
+        Args:
+        alpha (float): The interpolation of the players between the last two simulation steps.
+        Returns:
+        list[pg.Rect]: The areas of the main window that have to be pushed to the display.
+        """
+        display_rects: list[pg.Rect] = []
+        if not self.frame_drawn:
+            self.MAIN_WINDOW.fill("black")
+            pg.draw.rect(self.MAIN_WINDOW, "white", (sett.WINDOW_FRAME_POSITION, sett.WINDOW_FRAME_SIZE), border_radius=3)
+            self.score_rects.clear()
+            self.drawn_scores.clear()
+            self.game_window_tracker.invalidate()
+            display_rects.append(self.MAIN_WINDOW.get_rect())
+            self.frame_drawn = True
+
+        tracker = self.game_window_tracker
+        platform_revisions = tuple(platforms.platforms.revision for platforms in self.simulation.platforms)
+        if platform_revisions != self.platform_revisions:
+            tracker.invalidate()
+            self.platform_revisions = platform_revisions
+        for key, rect in self.clouds.draw_rects():
+            tracker.track(key, rect)
+        for i, (player, flip) in enumerate(zip(self.simulation.players, self.flips)):
+            tracker.track(('player', i), player.render_rect(alpha), flip)
+
+        for rect in tracker.collect():
+            self.GAME_WINDOW_SURF.set_clip(rect)
+            self.draw_game_window_content(alpha)
+            display_rect = rect.move(sett.GAME_WINDOW_POSITION)
+            self.MAIN_WINDOW.blit(self.GAME_WINDOW_SURF, display_rect, rect)
+            display_rects.append(display_rect)
+        self.GAME_WINDOW_SURF.set_clip(None)
+        display_rects.extend(self.render_scores(changed_only=True))
+        return display_rects
 
     def create_game_data(self) -> None:
         """ Creates the game data. """
         if self.easy:
-            self.platform_size = (150, 15)
-            self.platform_distances = (40, 80)
-            self.angle_limit = (10, 170)
-        elif self.normal:
-            self.platform_size = (100, 10)
-            self.platform_distances = (50, 100)
-            self.angle_limit = (30, 150)
+            difficulty = 'easy'
         elif self.hard:
-            self.platform_size = (50, 5)
-            self.platform_distances = (90, 100)
-            self.angle_limit = (50, 130)
-
-        if self.single_player:
-            self.player_1_start_pos = [sett.GAME_WINDOW_RESOLUTION[0] // 2, sett.GAME_WINDOW_RESOLUTION[1] - 100]
-            self.first_platform1 = [sett.GAME_WINDOW_RESOLUTION[0] // 2 - self.platform_size[0] // 2, sett.GAME_WINDOW_RESOLUTION[1] - 50]
+            difficulty = 'hard'
         else:
-            self.player_1_start_pos = [sett.GAME_WINDOW_RESOLUTION[0] // 4, sett.GAME_WINDOW_RESOLUTION[1] - 100]
-            self.first_platform1 = [sett.GAME_WINDOW_RESOLUTION[0] // 4 - self.platform_size[0] // 2, sett.GAME_WINDOW_RESOLUTION[1] - 50]
-            self.player_2_start_pos = [sett.GAME_WINDOW_RESOLUTION[0] // 4 * 3, sett.GAME_WINDOW_RESOLUTION[1] - 100]
-            self.first_platform2 = [sett.GAME_WINDOW_RESOLUTION[0] // 4 - self.platform_size[0] // 2, sett.GAME_WINDOW_RESOLUTION[1] - 50]
+            difficulty = 'normal'
+        self.platform_size = sett.DIFFICULTIES[difficulty]['platform_size']
+        self.platform_distances = sett.DIFFICULTIES[difficulty]['platform_distances']
+        self.angle_limit = sett.DIFFICULTIES[difficulty]['angle_limit']
 
+        # Whatever was not preloaded yet is loaded now, behind the transition, instead of during play.
+        self.preloader.run()
         self.clouds = Clouds()
-        self.player1 = Player(self, "red", self.player_1_start_pos)
-        self.platforms1 = Platform(self, self.GAME_WINDOW_SURF, sett.GAME_WINDOW_RESOLUTION, self.player_1_start_pos, self.platform_size, self.platform_distances, self.angle_limit)
-        if not self.single_player:
-            self.player2 = Player(self, "green", self.player_2_start_pos)
-            self.platforms2 = Platform(self, self.GAME_WINDOW_SURF, sett.GAME_WINDOW_RESOLUTION, self.player_2_start_pos, self.platform_size, self.platform_distances, self.angle_limit)
+        self.menu = None
+        self.simulation = Simulation(1 if self.single_player else 2, difficulty, seed=self.seed, game=self)
+        self.recorder = Recorder(self.simulation)
+        self.game_window_tracker = DirtyRectTracker(self.GAME_WINDOW_SURF.get_rect())
+        self.frame_drawn = False
+        self.moved = False
+        # Nearly everything alive now stays alive for the whole game. Collecting once and moving it out of the
+        # collector's view keeps the occasional full collection during play from walking all of it. Tools that
+        # create many games would freeze all of them.
+        if not self.tooling:
+            gc.collect()
+            gc.freeze()
+        self.save_boot_cache()
+
+    def save_recording(self) -> None:
+        """ Saves the recording of the current game, if there is one. """
+        if self.recorder is None or not self.recorder.ticks or not self.recording_directory:
+            return
+        os.makedirs(self.recording_directory, exist_ok=True)
+        file_name = f"jumpy_{time.strftime('%Y%m%d_%H%M%S')}_{self.simulation.seed}.jrec"
+        self.recorder.recording().save(os.path.join(self.recording_directory, file_name))
+
+    def save_boot_cache(self) -> None:
+        """ Saves the fonts and images used so far, for the next run to load them ahead of time. """
+        if not self.preloader.done:
+            # The cache still lists work that did not run yet, it would be forgotten.
+            return
+        self.boot_cache.save({'fonts': fonts.manifest(), 'variants': assets.manifest()})
+
+    def update_boot(self) -> None:
+        """ Marks the steps of the boot reached with the frame just shown, and ends the boot when nothing is left to preload. """
+        boot_timer.mark('first_frame')
+        if not self.preloader.done:
+            return
+        boot_timer.mark('preloaded')
+        self.booted = True
+        if self.exit_after_boot:
+            self.save_boot_cache()
+            self.running = False
 
     def update_difficulty_screen(self) -> None:
         """ Updates the difficulty screen. """
         self.easy = self.easy_button.check_collision()
         self.normal = self.normal_button.check_collision()
         self.hard = self.hard_button.check_collision()
-        self.MAIN_WINDOW.fill((23, 123, 223))
-        self.difficulty_screen.fill((23, 123, 223))
-        self.clouds.update()
-        self.clouds.render(self.difficulty_screen)
-        self.difficulty_stairs.update()
-        self.difficulty_stairs.render()
-        self.difficulty_screen.set_alpha(125)
-        self.MAIN_WINDOW.blit(self.difficulty_screen, (0, 0))
-        self.button_surface.set_colorkey("black")
-        self.MAIN_WINDOW.blit(self.button_surface, (0, 0))
-        self.easy_button.render()
-        self.normal_button.render()
-        self.hard_button.render()
+        self.compose_menu(self.difficulty_screen, self.difficulty_stairs, (self.easy_button, self.normal_button, self.hard_button))
         if self.easy or self.normal or self.hard:
             print("Difficulty selected!")
             self.show_difficulty_screen = False
 
     def create_difficulty_screen(self) -> None:
+        """ Creates the difficulty screen. """
         self.start_stairs: None | Stairs = None
-        self.clouds: Clouds = Clouds()
+        self.difficulty_screen = pg.Surface(sett.MAIN_WINDOW_RESOLUTION)
+        self.create_button_surface()
+        self.clouds: Clouds = Clouds(sett.GAME_BACKGROUND_COLOR)
+        self.menu = MenuCompositor(self.MAIN_WINDOW, sett.GAME_BACKGROUND_COLOR, self.button_surface)
         self.easy_button: Button = Button(self.button_surface, "Easy", self.easy_button_center_pos, "green")
         self.normal_button: Button = Button(self.button_surface, "Normal", self.normal_button_center_pos, "yellow")
         self.hard_button: Button = Button(self.button_surface, "Hard", self.hard_button_center_pos, "red")
+        self.difficulty_stairs = Platform(self, self.difficulty_screen, sett.MAIN_WINDOW_RESOLUTION, (sett.MAIN_WINDOW_RESOLUTION[0] // 2, sett.MAIN_WINDOW_RESOLUTION[1]), self.platform_size, self.platform_distances)
 
     def update_start_screen(self) -> None:
         """ Updates the start screen. """
         self.single_player = self.single_player_button.check_collision()
         two_player = self.two_player_button.check_collision()
         self.single_player = False if two_player else True
-        self.MAIN_WINDOW.fill((23, 123, 223))
-        self.start_screen.fill((23, 123, 223))
-        self.clouds.update()
-        self.clouds.render(self.start_screen)
-        self.start_stairs.update()
-        self.start_stairs.render()
-        self.start_screen.set_alpha(125)
-        self.MAIN_WINDOW.blit(self.start_screen, (0, 0))
-        
-        self.button_surface.set_colorkey("black")
-        self.MAIN_WINDOW.blit(self.button_surface, (0, 0))
-        self.single_player_button.render()
-        self.two_player_button.render()
+        self.compose_menu(self.start_screen, self.start_stairs, (self.single_player_button, self.two_player_button))
         if self.single_player or two_player:
             print("player selected")
             self.show_difficulty_screen = True
             self.show_start_screen = False
 
+    def create_button_surface(self) -> None:
+        """ Creates the surface the buttons of the menus are drawn on, or clears it for the buttons of another menu. """
+        if self.button_surface is None:
+            self.button_surface = pg.Surface(sett.MAIN_WINDOW_RESOLUTION)
+            self.button_surface.set_colorkey("black")
+        self.button_surface.fill("black")
+
     def create_start_screen(self) -> None:
         """ Creates the start screen. """
-        self.clouds: Clouds = Clouds()
+        self.start_screen = pg.Surface(sett.MAIN_WINDOW_RESOLUTION)
+        self.create_button_surface()
+        self.clouds: Clouds = Clouds(sett.GAME_BACKGROUND_COLOR)
+        self.menu = MenuCompositor(self.MAIN_WINDOW, sett.GAME_BACKGROUND_COLOR, self.button_surface)
         self.start_stairs: None | Stairs = Platform(self, self.start_screen, sett.MAIN_WINDOW_RESOLUTION, (sett.MAIN_WINDOW_RESOLUTION[0] // 2, sett.MAIN_WINDOW_RESOLUTION[1]), self.platform_size, self.platform_distances)
         self.single_player_button: Button = Button(self.button_surface, "One Player", self.single_player_button_center_pos, "green")
         self.two_player_button: Button = Button(self.button_surface, "Two Players", self.two_player_button_center_pos, "green")
 
-    def slide_screen_down(self, screen):
-        """ Slides the screen down. """
-        for i in range((sett.MAIN_WINDOW_RESOLUTION[1] // 10)):
-            self.MAIN_WINDOW.blit(screen, (0, i * 10))
-            self.MAIN_WINDOW.blit(self.button_surface, (0, i))
-            pg.display.update()
+    def compose_menu(self, screen: pg.Surface, stairs: Stairs, buttons: tuple[Button]) -> None:
+        """
+        Draws a frame of a menu. The screen behind the buttons is only drawn and blended again when a cloud or the
+        stairs moved by a pixel, and buttons are only drawn again when they changed.
+        Args:
+        screen (pg.Surface): The surface of the menu's clouds and stairs.
+        stairs (Stairs): The stairs of the menu.
+        buttons (tuple[Button]): The buttons of the menu.
+        """
+        self.clouds.update()
+        stairs.update()
+        screen_key = (self.clouds.layout(), stairs.platforms.revision)
+        if self.menu.needs_screen(screen_key):
+            self.clouds.render(screen)
+            stairs.render()
+        changed = [rect for rect in (button.render() for button in buttons) if rect is not None]
+        if self.profiler_rect is not None:
+            changed.append(self.profiler_rect)
+        self.display_rects = self.menu.compose(screen, screen_key, [button.rect for button in buttons], changed)
+
+    def update_transition(self, frame_time: float) -> None:
+        """
+        Advances the running screen transition and ends it once it is done.
+        Args:
+        frame_time (float): The time since the last frame in seconds.
+        """
+        self.transition.update(frame_time)
+        # Everything moves during a transition, so the whole window is pushed.
+        self.display_rects = None
+        if self.transition.done:
+            self.transition = None
 
     def event_handler(self) -> None:
         """ Handles all the events in the game. """
         for event in pg.event.get():
                 if event.type == pg.QUIT:
                     self.running = False
+                    self.save_recording()
+                    self.save_boot_cache()
                     pg.quit()
                     sys.exit()
 
+                if event.type == pg.KEYDOWN and event.key in (pg.K_F3, pg.K_F4):
+                    if event.key == pg.K_F3:
+                        self.profiler.toggle()
+                        self.frame_drawn = False
+                    else:
+                        self.profiler.export_csv('jumpy_profile.csv')
+                        self.profiler.export_chrome_trace('jumpy_trace.json')
+                    continue
+
                 if event.type == pg.KEYDOWN:
                     if not self.moved:
                         self.moved = True
-                    if event.key == pg.K_LEFT:
-                        self.movement_player1[0] = True
-                        self.player1_flip = False
-                    if event.key == pg.K_RIGHT:
-                        self.movement_player1[1] = True
-                        self.player1_flip = True
-                    
-                    if event.key == pg.K_a:
-                        self.movement_player2[0] = True
-                        self.player2_flip = False
-                    if event.key == pg.K_d:
-                        self.movement_player2[1] = True
-                        self.player2_flip = True
+                    for i, keys in zip(self.local_players, self.PLAYER_KEYS):
+                        for direction, key in enumerate(keys):
+                            if event.key == key:
+                                self.movements[i][direction] = True
+                                # Players look to the left by default and are flipped while moving right.
+                                self.flips[i] = direction == 1
 
                 if event.type == pg.KEYUP:
-                    if event.key == pg.K_LEFT:
-                        self.movement_player1[0] = False
-                    if event.key == pg.K_RIGHT:
-                        self.movement_player1[1] = False
-
-                    if event.key == pg.K_a:
-                        self.movement_player2[0] = False
-                    if event.key == pg.K_d:
-                        self.movement_player2[1] = False
+                    for i, keys in zip(self.local_players, self.PLAYER_KEYS):
+                        for direction, key in enumerate(keys):
+                            if event.key == key:
+                                self.movements[i][direction] = False
 
-    def run(self) -> None:
-        """ Runs the game. """
-        self.create_start_screen()
-        while self.show_start_screen:
-            self.update_start_screen()
-            self.CLOCK.tick(self.FPS)
-            self.event_handler()
+    def end_profiled_frame(self) -> None:
+        """ Draws the profiler overlay, pushes the frame to the display and closes the profiled frame. """
+        if self.display_rects is not None and self.profiler_rect is not None and self.menu is None:
+            # Nothing else repaints the black border left of the game window, so clear the last overlay first.
+            # Menus restore the area below the overlay themselves.
+            old_rect = self.profiler_rect.clip((0, 0, sett.WINDOW_FRAME_POSITION[0], sett.MAIN_WINDOW_RESOLUTION[1]))
+            self.MAIN_WINDOW.fill("black", old_rect)
+            self.display_rects.append(old_rect)
+        overlay_rect = self.profiler.render_overlay(self.MAIN_WINDOW, (5, sett.MAIN_WINDOW_RESOLUTION[1] - 5))
+        if self.display_rects is None:
             pg.display.update()
+        else:
+            if overlay_rect is not None:
+                self.display_rects.append(overlay_rect)
+            pg.display.update(self.display_rects)
+        self.profiler_rect = overlay_rect
+        self.profiler.lap('display_update')
 
-        self.slide_screen_down(self.start_screen)
-        self.create_difficulty_screen()
-        self.button_surface.fill("black")
-        self.difficulty_stairs = Platform(self, self.difficulty_screen, sett.MAIN_WINDOW_RESOLUTION, (sett.MAIN_WINDOW_RESOLUTION[0] // 2, sett.MAIN_WINDOW_RESOLUTION[1]), self.platform_size, self.platform_distances)
-        while self.show_difficulty_screen:
-            self.update_difficulty_screen()
-            self.CLOCK.tick(self.FPS)
-            self.event_handler()
-            pg.display.update()
+        if self.profiler.recording:
+            if self.simulation is not None and not (self.show_start_screen or self.show_difficulty_screen):
+                courses = self.simulation.platforms
+                players = self.simulation.player_count
+            else:
+                courses = [stairs for stairs in (self.start_stairs, self.difficulty_stairs) if stairs is not None]
+                players = 0
+            self.profiler.end_frame(players, sum(len(course.platforms) for course in courses), self.clouds.count)
 
-        self.slide_screen_down(self.difficulty_screen)
+    def start_network_game(self, network: 'NetworkThread') -> None:
+        """
+        Skips the menus and prepares a game with a player on another machine.
+        Args:
+        network (NetworkThread): The connected network thread, which decided the seed and difficulty.
+        """
+        # Only network games need the networking and its event loop, so they are not imported at startup.
+        from netplay import NetPeer
+
+        self.network = network
+        self.seed = network.seed
+        self.single_player = False
+        setattr(self, network.difficulty, True)
+        self.show_start_screen = False
+        self.show_difficulty_screen = False
         self.create_game_data()
-        
-        self.moved = False
+        # Rewinding would record the same ticks again, and the other side can not replay its own inputs anyway.
+        self.simulation.recorder = self.recorder = None
+        self.peer = NetPeer(self.simulation, network.player)
+        self.local_players = (network.player,)
+
+    def advance_network_game(self, frame_time: float) -> float:
+        """
+        Steps the network game with the own input and exchanges messages with the other side.
+        Args:
+        frame_time (float): The time since the last frame in seconds.
+        Returns:
+        float: The interpolation of the players between the last two simulation steps.
+        """
+        from netplay import input_bits
+
+        if self.disconnect_deadline is not None:
+            if pg.time.get_ticks() >= self.disconnect_deadline:
+                self.running = False
+            return 1.0
+        player = self.peer.player
+        # A client that stopped sending input for NetPeer.LAG_LIMIT is treated like one that disconnected.
+        if not self.network.exchange(self.peer) or self.peer.lost:
+            self.end_network_game()
+            return 1.0
+        alpha = self.peer.advance(frame_time, input_bits(self.movements[player], self.flips[player]))
+        self.network.exchange(self.peer)
+        self.flips[self.peer.remote] = self.peer.remote_flip
+        return alpha
+
+    def end_network_game(self) -> None:
+        """
+        Stops the network game because the other player disconnected. The frame loop keeps running and showing that
+        for DISCONNECT_TIME, then the game ends.
+        """
+        print("the other player disconnected")
+        self.disconnect_deadline = pg.time.get_ticks() + self.DISCONNECT_TIME
+
+    def render_disconnect_message(self) -> None:
+        """ Draws that the other player disconnected over the frame. """
+        text = texts.render('comicsans', 32, "The other player disconnected", 'white')
+        rect = self.MAIN_WINDOW.blit(text, text.get_rect(center=(sett.MAIN_WINDOW_RESOLUTION[0] // 2, 40)))
+        if self.display_rects is not None:
+            self.display_rects.append(rect)
+
+    def run(self) -> None:
+        """ Runs the game. The menus, the transitions between them and the game itself share one frame loop. """
+        # Network and soak test games set up their game before and skip the menus.
+        if self.show_start_screen:
+            self.create_start_screen()
+            boot_timer.mark('start_screen')
         while self.running:
-            self.CLOCK.tick(self.FPS)
+            if self.transition is not None:
+                phase = 'transition'
+            elif self.show_start_screen:
+                phase = 'start_screen'
+            elif self.show_difficulty_screen:
+                phase = 'difficulty_screen'
+            else:
+                phase = 'gameplay'
+            self.profiler.start_frame(phase)
+            frame_time = self.CLOCK.tick(self.fps) / 1000
+            self.profiler.lap('clock_tick')
             self.event_handler()
-            self.create_game_window()
-            self.player1.update(platforms=self.platforms1.platforms, platform_rects=self.platforms1.platform_rects, movement=self.movement_player1)
-            self.platforms1.update(self.moved)
-            if not self.single_player:
-                self.platforms2.update(self.moved)
-                self.player2.update(platforms=self.platforms2.platforms, platform_rects=self.platforms2.platform_rects, movement=self.movement_player2)
-            pg.display.update()
-                        
+            self.profiler.lap('event_handler')
+
+            if phase == 'transition':
+                self.update_transition(frame_time)
+                self.profiler.lap('update_transition')
+            elif phase == 'start_screen':
+                self.update_start_screen()
+                self.profiler.lap('update_start_screen')
+                self.preloader.run(self.PRELOAD_BUDGET)
+                self.profiler.lap('preload')
+                if not self.show_start_screen:
+                    self.transition = ScreenTransition(self.MAIN_WINDOW, self.create_difficulty_screen, sett.GAME_BACKGROUND_COLOR)
+            elif phase == 'difficulty_screen':
+                self.update_difficulty_screen()
+                self.profiler.lap('update_difficulty_screen')
+                self.preloader.run(self.PRELOAD_BUDGET)
+                self.profiler.lap('preload')
+                if not self.show_difficulty_screen:
+                    self.transition = ScreenTransition(self.MAIN_WINDOW, self.create_game_data, sett.GAME_BACKGROUND_COLOR)
+            else:
+                # The simulation catches up in fixed steps, the frame is drawn interpolated between the last two.
+                if self.peer is not None:
+                    alpha = self.advance_network_game(frame_time)
+                else:
+                    alpha = self.simulation.advance(frame_time, self.movements[:self.simulation.player_count], moved=self.moved, flips=self.flips)
+                self.profiler.lap('update')
+                self.create_game_window(alpha)
+                if self.disconnect_deadline is not None:
+                    self.render_disconnect_message()
+                self.profiler.lap('create_game_window')
+            self.end_profiled_frame()
+            if not self.booted:
+                self.update_boot()
+
 
 if __name__ == "__main__":
-    Game().run()    
\ No newline at end of file
+    Game().run()    
@@ -0,0 +1,621 @@
+"""
+Networked two-player games over asyncio.
+The host and the client both run the whole simulation from the same seed. Every machine applies the input of
+its own player on the tick it is read and predicts that the other player keeps holding its last known input.
+When the real input arrives, the simulation is rewound to the tick it changed on and stepped forward again. The
+players only send input bytes, on change and as a heartbeat. The host's simulation is authoritative: it streams
+tick-stamped snapshots of the state both inputs are confirmed for, each compressed against the previous one,
+and the client resyncs to every snapshot that disagrees with its own history. Snapshots also carry the host's
+tick, so a client that fell behind after a stall steps forward to it, and the host ends a game whose client
+stopped sending input altogether.
+    python netplay.py host --port 7777
+    python netplay.py join 192.168.0.2 --port 7777
+    python netplay.py bench --seconds 20 --latency 50
+"""
+import numpy as np
+
+from replay import INPUT_FLIP, INPUT_LEFT, INPUT_RIGHT
+from player_batch import PlayerBatch
+from simulation import Simulation
+import settings as sett
+
+import argparse
+import asyncio
+import collections
+import queue
+import random
+import socket
+import struct
+import sys
+import threading
+import zlib
+from typing import Callable, Final, Sequence
+
+Movement = Sequence[bool]
+
+HOST_PLAYER: Final[int] = 0
+CLIENT_PLAYER: Final[int] = 1
+DEFAULT_PORT: Final[int] = 7777
+
+MESSAGE_WELCOME: Final[int] = 1
+MESSAGE_INPUT: Final[int] = 2
+MESSAGE_SNAPSHOT: Final[int] = 3
+MESSAGE_HEADER: Final[struct.Struct] = struct.Struct('<HB')
+WELCOME: Final[struct.Struct] = struct.Struct('<Q8sH')
+INPUT: Final[struct.Struct] = struct.Struct('<IB')
+# The tick of the state and the tick the host is at.
+SNAPSHOT: Final[struct.Struct] = struct.Struct('<II')
+
+
+def message(kind: int, payload: bytes) -> bytes:
+    """
+    Frame a message for the stream.
+    Args:
+    kind (int): The MESSAGE_* type of the message.
+    payload (bytes): The content of the message.
+    Returns:
+    bytes: The framed message.
+    """
+    return MESSAGE_HEADER.pack(len(payload), kind) + payload
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    """
+    Read the next framed message from a stream.
+    Args:
+    reader (asyncio.StreamReader): The stream.
+    Returns:
+    tuple[int, bytes]: The MESSAGE_* type and the content of the message.
+    """
+    length, kind = MESSAGE_HEADER.unpack(await reader.readexactly(MESSAGE_HEADER.size))
+    return kind, await reader.readexactly(length)
+
+
+def read_welcome(kind: int, payload: bytes) -> tuple[int, str, int]:
+    """
+    Check and unpack the message the host opens a connection with. Raises ValueError if it is not a welcome or
+    names a game this side can not play.
+    Args:
+    kind (int): The MESSAGE_* type of the message.
+    payload (bytes): The content of the message.
+    Returns:
+    tuple[int, str, int]: The seed, the difficulty and the step rate of the game.
+    """
+    if kind != MESSAGE_WELCOME or len(payload) != WELCOME.size:
+        raise ValueError("the host did not send a welcome")
+    seed, difficulty, step_rate = WELCOME.unpack(payload)
+    difficulty = difficulty.rstrip(b'\0').decode(errors='replace')
+    if difficulty not in sett.DIFFICULTIES:
+        raise ValueError(f"the host chose an unknown difficulty {difficulty!r}")
+    if step_rate <= 0:
+        raise ValueError(f"the host chose an invalid step rate {step_rate}")
+    return seed, difficulty, step_rate
+
+
+def input_bits(movement: Movement, flip: bool = False) -> int:
+    """
+    Pack the input of a player into one byte, the same way recordings do.
+    Args:
+    movement (Movement): The [left, right] keys.
+    flip (bool): Whether the player is drawn flipped.
+    Returns:
+    int: The input byte.
+    """
+    return INPUT_LEFT * bool(movement[0]) | INPUT_RIGHT * bool(movement[1]) | INPUT_FLIP * bool(flip)
+
+
+class NetPeer:
+    """
+    One side of a networked game: the simulation, the input history of both players and the rollback.
+    The peer does no networking itself. Messages from the other side go into receive, and the messages to send
+    pile up in an outbox that flush empties, so any transport can carry them.
+    """
+    HEARTBEAT_INTERVAL: Final[float] = 0.1
+    SNAPSHOT_INTERVAL: Final[float] = 0.25
+    ROLLBACK_LIMIT: Final[float] = 2.0
+    # A client this many seconds behind the host's tick steps forward to it.
+    RESYNC_LIMIT: Final[float] = 0.5
+    # The host ends the game when the client's input is this many seconds old.
+    LAG_LIMIT: Final[float] = 10.0
+
+    def __init__(self, simulation: Simulation, player: int) -> None:
+        """
+        Initialize the peer.
+        Args:
+        simulation (Simulation): A fresh two-player simulation, created from the same seed on both sides.
+        player (int): The player of this side, HOST_PLAYER or CLIENT_PLAYER.
+        """
+        self.simulation: Simulation = simulation
+        self.player: int = player
+        self.remote: int = 1 - player
+        self.host: bool = player == HOST_PLAYER
+        rate = simulation.step_rate
+        self.heartbeat_ticks: int = max(1, round(self.HEARTBEAT_INTERVAL * rate))
+        self.snapshot_ticks: int = max(1, round(self.SNAPSHOT_INTERVAL * rate))
+        self.rollback_ticks: int = round(self.ROLLBACK_LIMIT * rate)
+        self.resync_ticks: int = round(self.RESYNC_LIMIT * rate)
+        self.lag_ticks: int = round(self.LAG_LIMIT * rate)
+        self.accumulator: float = 0.0
+        # The input byte of both players on every tick, predicted ones included.
+        self.inputs: np.ndarray = np.zeros((4096, 2), dtype=np.uint8)
+        # The state at the start of every tick in the rollback window.
+        self.states: dict[int, bytes] = {}
+        self.remote_bits: int = 0
+        self.remote_known: int = -1
+        self.pending: collections.deque[tuple[int, int]] = collections.deque()
+        self.sent_bits: None | int = None
+        self.sent_tick: int = 0
+        self.snapshot_tick: int = -1
+        self.snapshot_base: bytes = b''
+        self.outbox: list[bytes] = []
+        # Set on the host once the client fell so far behind that the game can not go on.
+        self.lost: bool = False
+        self.stats: collections.Counter[str] = collections.Counter()
+
+    @property
+    def remote_flip(self) -> bool:
+        """ Whether the other player is drawn flipped, as far as known. """
+        return bool(self.remote_bits & INPUT_FLIP)
+
+    def movements(self, tick: int) -> np.ndarray:
+        """
+        Decode the inputs of a tick.
+        Args:
+        tick (int): The tick.
+        Returns:
+        np.ndarray: One [left, right] pair per player.
+        """
+        row = self.inputs[tick]
+        return np.stack(((row & INPUT_LEFT) != 0, (row & INPUT_RIGHT) != 0), axis=-1)
+
+    def advance(self, frame_time: float, bits: int) -> float:
+        """
+        Run as many ticks as fit into the time since the last frame, like Simulation.advance.
+        Args:
+        frame_time (float): The seconds since the last frame.
+        bits (int): The input byte of the local player, held for all ticks.
+        Returns:
+        float: How far the display time is between the previous and the current tick, for interpolation.
+        """
+        dt = self.simulation.dt
+        self.accumulator += min(frame_time, sett.MAX_FRAME_TIME)
+        while self.accumulator >= dt:
+            self.step(bits)
+            self.accumulator -= dt
+        return self.accumulator / dt
+
+    def step(self, bits: int) -> None:
+        """
+        Step the simulation by one tick with the local input and the predicted remote input.
+        Args:
+        bits (int): The input byte of the local player.
+        """
+        simulation = self.simulation
+        tick = simulation.tick
+        self.reserve(tick + 1)
+        while self.pending and self.pending[0][0] <= tick:
+            self.remote_bits = self.pending.popleft()[1]
+        self.inputs[tick, self.player] = bits
+        self.inputs[tick, self.remote] = self.remote_bits
+        if bits != self.sent_bits or (not self.host and tick - self.sent_tick >= self.heartbeat_ticks):
+            self.outbox.append(message(MESSAGE_INPUT, INPUT.pack(tick, bits)))
+            self.sent_bits, self.sent_tick = bits, tick
+
+        self.states[tick] = simulation.get_state()
+        self.states.pop(tick - self.rollback_ticks, None)
+        simulation.step(self.movements(tick))
+        if self.host:
+            if simulation.tick - self.remote_known > self.lag_ticks:
+                self.lost = True
+            if simulation.tick % self.snapshot_ticks == 0:
+                self.send_snapshot()
+
+    def reserve(self, ticks: int) -> None:
+        """
+        Make room in the input history for a number of ticks.
+        Args:
+        ticks (int): The number of ticks.
+        """
+        while len(self.inputs) < ticks:
+            self.inputs = np.concatenate((self.inputs, np.zeros_like(self.inputs)))
+
+    def send_snapshot(self) -> None:
+        """
+        Send the state at the first tick the client's input is not confirmed for, if there is a new one. A client
+        further behind than the rollback window gets the oldest state still kept.
+        """
+        current = self.simulation.tick
+        tick = min(self.remote_known + 1, current)
+        if tick < current and tick not in self.states:
+            tick = min(self.states, default=current)
+        if tick <= self.snapshot_tick:
+            return
+        state = self.states[tick] if tick < current else self.simulation.get_state()
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=self.snapshot_base) if self.snapshot_base else zlib.compressobj(9, zlib.DEFLATED, -15)
+        payload = compressor.compress(state) + compressor.flush()
+        self.outbox.append(message(MESSAGE_SNAPSHOT, SNAPSHOT.pack(tick, current) + payload))
+        self.snapshot_tick, self.snapshot_base = tick, state
+        self.stats['snapshots'] += 1
+        self.stats['snapshot_bytes'] += len(payload)
+
+    def flush(self) -> bytes:
+        """
+        Take the messages to send.
+        Returns:
+        bytes: The framed messages, empty if there are none.
+        """
+        data = b''.join(self.outbox)
+        self.outbox.clear()
+        self.stats['bytes_sent'] += len(data)
+        return data
+
+    def receive(self, kind: int, payload: bytes) -> None:
+        """
+        Handle a message from the other side.
+        Args:
+        kind (int): The MESSAGE_* type of the message.
+        payload (bytes): The content of the message.
+        """
+        self.stats['bytes_received'] += MESSAGE_HEADER.size + len(payload)
+        if kind == MESSAGE_INPUT:
+            self.receive_input(*INPUT.unpack(payload))
+        elif kind == MESSAGE_SNAPSHOT and not self.host:
+            tick, host_tick = SNAPSHOT.unpack_from(payload)
+            decompressor = zlib.decompressobj(-15, zdict=self.snapshot_base) if self.snapshot_base else zlib.decompressobj(-15)
+            state = decompressor.decompress(payload[SNAPSHOT.size:]) + decompressor.flush()
+            self.snapshot_base = state
+            self.receive_snapshot(tick, state, host_tick)
+
+    def receive_input(self, tick: int, bits: int) -> None:
+        """
+        Take in the input of the other player, which holds from the given tick on, and rewind if it was mispredicted.
+        Args:
+        tick (int): The tick the input was read on.
+        bits (int): The input byte.
+        """
+        self.remote_known = max(self.remote_known, tick)
+        current = self.simulation.tick
+        if tick >= current:
+            self.pending.append((tick, bits))
+            return
+        self.remote_bits = bits
+        self.stats['remote_inputs'] += 1
+        self.stats['remote_delay_ticks'] += current - tick
+        wrong = np.flatnonzero(self.inputs[tick:current, self.remote] != bits)
+        self.inputs[tick:current, self.remote] = bits
+        if len(wrong):
+            self.rewind(tick + int(wrong[0]))
+
+    def receive_snapshot(self, tick: int, state: bytes, host_tick: None | int = None) -> None:
+        """
+        Compare the host's state of a tick with the own one and resync if they differ. A client that is behind the
+        state takes it over, and one that is more than RESYNC_LIMIT behind the host steps forward to the host's tick.
+        Args:
+        tick (int): The tick of the state.
+        state (bytes): The host's state at the start of the tick.
+        host_tick (None | int): The tick the host was at when it sent the state. None if unknown.
+        """
+        current = self.simulation.tick
+        if tick > current:
+            self.stats['resyncs'] += 1
+            self.reserve(tick)
+            self.simulation.set_state(state)
+        else:
+            own = self.states.get(tick) if tick < current else self.simulation.get_state()
+            if own is not None and own != state:
+                self.stats['corrections'] += 1
+                self.simulation.set_state(state)
+                self.replay_to(current)
+        if host_tick is not None and host_tick - self.simulation.tick > self.resync_ticks:
+            self.stats['catch_up_ticks'] += host_tick - self.simulation.tick
+            bits = self.sent_bits or 0
+            while self.simulation.tick < host_tick:
+                self.step(bits)
+
+    def rewind(self, tick: int) -> None:
+        """
+        Go back to the start of a tick and step forward again to the current tick with the corrected inputs.
+        Args:
+        tick (int): The first tick whose inputs changed.
+        """
+        current = self.simulation.tick
+        if tick not in self.states:
+            # The input is older than the rollback window. The host's snapshots bring the client back in line.
+            self.stats['rollbacks_missed'] += 1
+            tick = min(self.states)
+        self.stats['rollbacks'] += 1
+        self.stats['rollback_ticks'] += current - tick
+        self.simulation.set_state(self.states[tick])
+        self.replay_to(current)
+
+    def replay_to(self, tick: int) -> None:
+        """
+        Step the simulation up to a tick with the known and predicted inputs, refreshing the saved states.
+        Args:
+        tick (int): The tick to stop at.
+        """
+        simulation = self.simulation
+        while simulation.tick < tick:
+            self.states[simulation.tick] = simulation.get_state()
+            simulation.step(self.movements(simulation.tick))
+
+
+class NetworkThread(threading.Thread):
+    """
+    Runs the connection of a game on an asyncio loop in the background, so the game loop never waits for the
+    network. Received messages are queued until the game loop polls them.
+    """
+
+    def __init__(self, address: None | str, port: int, difficulty: str = 'normal', seed: None | int = None) -> None:
+        """
+        Initialize the thread.
+        Args:
+        address (None | str): The address of the host to join. None to host a game.
+        port (int): The port the host listens on.
+        difficulty (str): The difficulty of a hosted game. Clients get it from the host.
+        seed (None | int): The seed of a hosted game. None picks a random seed.
+        """
+        super().__init__(daemon=True)
+        self.address: None | str = address
+        self.port: int = port
+        self.difficulty: str = difficulty
+        self.seed: int = seed if seed is not None else random.getrandbits(32)
+        self.step_rate: int = sett.SIMULATION_RATE
+        self.incoming: queue.SimpleQueue[tuple[int, bytes]] = queue.SimpleQueue()
+        self.ready: threading.Event = threading.Event()
+        self.connected: bool = False
+        # Why the connection could not be opened, set together with ready.
+        self.error: None | Exception = None
+        self.loop: None | asyncio.AbstractEventLoop = None
+        self.writer: None | asyncio.StreamWriter = None
+
+    @property
+    def player(self) -> int:
+        """ The player of this side. """
+        return HOST_PLAYER if self.address is None else CLIENT_PLAYER
+
+    def run(self) -> None:
+        asyncio.run(self.connect())
+
+    async def connect(self) -> None:
+        """
+        Open the connection, agree on the game and queue messages until the connection closes. A connection that can
+        not be opened, or a host that sent a game this side can not play, is stored in error.
+        """
+        self.loop = asyncio.get_running_loop()
+        try:
+            if self.address is None:
+                reader, writer = await accept_client(self.port)
+                writer.write(message(MESSAGE_WELCOME, WELCOME.pack(self.seed, self.difficulty.encode(), self.step_rate)))
+            else:
+                reader, writer = await asyncio.open_connection(self.address, self.port)
+                try:
+                    self.seed, self.difficulty, self.step_rate = read_welcome(*await read_message(reader))
+                except ValueError:
+                    writer.close()
+                    raise
+        except (asyncio.IncompleteReadError, OSError, ValueError) as error:
+            self.error = error
+            self.ready.set()
+            return
+        set_no_delay(writer)
+        self.writer, self.connected = writer, True
+        self.ready.set()
+        try:
+            while True:
+                self.incoming.put(await read_message(reader))
+        except (asyncio.IncompleteReadError, OSError):
+            self.connected = False
+
+    def exchange(self, peer: NetPeer) -> bool:
+        """
+        Hand the received messages to a peer and send its outbox.
+        Args:
+        peer (NetPeer): The peer of this side.
+        Returns:
+        bool: Whether the other side is still connected.
+        """
+        while not self.incoming.empty():
+            peer.receive(*self.incoming.get())
+        data = peer.flush()
+        if data and self.connected:
+            self.loop.call_soon_threadsafe(self.writer.write, data)
+        return self.connected
+
+
+async def accept_client(port: int, host: str = '0.0.0.0', on_listen: None | Callable[[int], None] = None) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """
+    Wait for one client to connect.
+    Args:
+    port (int): The port to listen on, 0 for any free port.
+    host (str): The address to listen on.
+    on_listen (None | Callable[[int], None]): Called with the port once the server listens.
+    Returns:
+    tuple[asyncio.StreamReader, asyncio.StreamWriter]: The stream of the client.
+    """
+    connection: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def accept(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if connection.done():
+            writer.close()
+        else:
+            connection.set_result((reader, writer))
+
+    server = await asyncio.start_server(accept, host, port)
+    if on_listen is not None:
+        on_listen(server.sockets[0].getsockname()[1])
+    try:
+        return await connection
+    finally:
+        server.close()
+
+
+def set_no_delay(writer: asyncio.StreamWriter) -> None:
+    """
+    Send small messages right away instead of batching them, which would add up to 200 ms of input latency.
+    Args:
+    writer (asyncio.StreamWriter): The stream.
+    """
+    sock = writer.get_extra_info('socket')
+    if sock is not None:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def scripted_bits(peer: NetPeer, rng: random.Random) -> int:
+    """
+    Get the input of a scripted player that steers for the next platform above it, with the odd random swerve.
+    Args:
+    peer (NetPeer): The peer of the player.
+    rng (random.Random): The randomness of the player.
+    Returns:
+    int: The input byte.
+    """
+    simulation = peer.simulation
+    x, bottom = simulation.batch.pos[peer.player].tolist()
+    course = simulation.courses[peer.player]
+    above = course.query(bottom - 4 * PlayerBatch.HEIGHT, bottom - 1)
+    if not above or rng.random() < 0.02:
+        return rng.choice((INPUT_LEFT, INPUT_RIGHT | INPUT_FLIP, 0))
+    target = int(course.xs[above[0]]) + course.size[0] // 2
+    if abs(target - x) < course.size[0] // 4:
+        return 0
+    return INPUT_LEFT if target < x else INPUT_RIGHT | INPUT_FLIP
+
+
+async def run_loopback_peer(peer: NetPeer, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, ticks: int, seed: int, latency: float, settle: float) -> None:
+    """
+    Play a peer of the loopback benchmark in real time.
+    Args:
+    peer (NetPeer): The peer.
+    reader (asyncio.StreamReader): The stream from the other peer.
+    writer (asyncio.StreamWriter): The stream to the other peer.
+    ticks (int): The number of ticks to play.
+    seed (int): The seed of the scripted player.
+    latency (float): The extra one-way delay of sent messages in seconds.
+    settle (float): The seconds to keep receiving after the last tick.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def receive() -> None:
+        try:
+            while True:
+                peer.receive(*await read_message(reader))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def send() -> None:
+        data = peer.flush()
+        if data:
+            if latency:
+                loop.call_later(latency, writer.write, data)
+            else:
+                writer.write(data)
+
+    receiver = asyncio.create_task(receive())
+    rng = random.Random(seed)
+    start = loop.time()
+    for tick in range(ticks):
+        await asyncio.sleep(max(0.0, start + (tick + 1) * peer.simulation.dt - loop.time()))
+        peer.step(scripted_bits(peer, rng))
+        send()
+    # A last heartbeat confirms the final input, then both sides wait for everything in flight.
+    peer.outbox.append(message(MESSAGE_INPUT, INPUT.pack(peer.simulation.tick - 1, peer.sent_bits)))
+    send()
+    await asyncio.sleep(settle)
+    receiver.cancel()
+
+
+async def loopback(seconds: float, latency: float, difficulty: str, seed: int) -> dict[str, float | int | bool]:
+    """
+    Play a scripted networked game between a host and a client over localhost.
+    Args:
+    seconds (float): The length of the game.
+    latency (float): The extra one-way delay in seconds.
+    difficulty (str): The difficulty preset.
+    seed (int): The seed of the game and the scripts.
+    Returns:
+    dict[str, float | int | bool]: The traffic, rollbacks and corrections of both sides and whether they ended in
+    the same state.
+    """
+    step_rate = sett.SIMULATION_RATE
+    ticks = int(seconds * step_rate)
+    listening: asyncio.Future = asyncio.get_running_loop().create_future()
+    accepting = asyncio.create_task(accept_client(0, '127.0.0.1', listening.set_result))
+    client_reader, client_writer = await asyncio.open_connection('127.0.0.1', await listening)
+    host_reader, host_writer = await accepting
+    for writer in (client_writer, host_writer):
+        set_no_delay(writer)
+    host_writer.write(message(MESSAGE_WELCOME, WELCOME.pack(seed, difficulty.encode(), step_rate)))
+    game_seed, game_difficulty, game_rate = read_welcome(*await read_message(client_reader))
+
+    host = NetPeer(Simulation(2, difficulty, seed=seed, step_rate=step_rate), HOST_PLAYER)
+    client = NetPeer(Simulation(2, game_difficulty, seed=game_seed, step_rate=game_rate), CLIENT_PLAYER)
+    settle = 2 * latency + 0.5
+    await asyncio.gather(run_loopback_peer(host, host_reader, host_writer, ticks, seed, latency, settle),
+                         run_loopback_peer(client, client_reader, client_writer, ticks, seed + 1, latency, settle))
+    for writer in (client_writer, host_writer):
+        writer.close()
+
+    report: dict[str, float | int | bool] = {'ticks': ticks, 'in_sync': host.simulation.get_state() == client.simulation.get_state(),
+                                             'scores': host.simulation.scores}
+    for name, peer in (('host', host), ('client', client)):
+        stats = peer.stats
+        report[f'{name}_bytes_per_s'] = stats['bytes_sent'] / seconds
+        report[f'{name}_rollbacks'] = stats['rollbacks']
+        report[f'{name}_mean_rollback_ticks'] = stats['rollback_ticks'] / max(1, stats['rollbacks'])
+        report[f'{name}_remote_delay_ms'] = 1000 * stats['remote_delay_ticks'] / max(1, stats['remote_inputs']) / step_rate
+    report['snapshots'] = host.stats['snapshots']
+    report['mean_snapshot_bytes'] = host.stats['snapshot_bytes'] / max(1, host.stats['snapshots'])
+    report['corrections'] = client.stats['corrections']
+    return report
+
+
+def play(address: None | str, port: int, difficulty: str, seed: None | int) -> None:
+    """
+    Host or join a networked game in the game window.
+    Args:
+    address (None | str): The address of the host to join. None to host a game.
+    port (int): The port of the host.
+    difficulty (str): The difficulty of a hosted game.
+    seed (None | int): The seed of a hosted game.
+    """
+    from jum import Game
+
+    network = NetworkThread(address, port, difficulty, seed)
+    network.start()
+    print(f"waiting for a player on port {port}" if address is None else f"joining {address}:{port}")
+    network.ready.wait()
+    if network.error is not None:
+        print(f"could not connect: {network.error}")
+        sys.exit(1)
+    game = Game()
+    game.start_network_game(network)
+    game.run()
+
+
+def main() -> None:
+    """ Host or join a networked game, or run the loopback benchmark. """
+    parser = argparse.ArgumentParser(description="Play JumPy over the network.")
+    parser.add_argument('mode', choices=('host', 'join', 'bench'))
+    parser.add_argument('address', nargs='?', default='127.0.0.1', help="The host to join.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--difficulty', default='normal', choices=tuple(sett.DIFFICULTIES))
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--seconds', type=float, default=20.0, help="Length of the benchmark game.")
+    parser.add_argument('--latency', type=float, default=0.0, help="Extra one-way delay of the benchmark in ms.")
+    args = parser.parse_args()
+
+    if args.mode != 'bench':
+        play(None if args.mode == 'host' else args.address, args.port, args.difficulty, args.seed)
+        return
+    report = asyncio.run(loopback(args.seconds, args.latency / 1000, args.difficulty, args.seed or 0))
+    print(f"{report['ticks']} ticks, in sync: {report['in_sync']}, scores {report['scores']}, client corrections: {report['corrections']}")
+    for name in ('host', 'client'):
+        print(f"{name:<7}sent {report[f'{name}_bytes_per_s']:7.1f} B/s, {report[f'{name}_rollbacks']} rollbacks of "
+              f"{report[f'{name}_mean_rollback_ticks']:.1f} ticks, remote input arrives {report[f'{name}_remote_delay_ms']:.1f} ms late")
+    print(f"{report['snapshots']} snapshots of {report['mean_snapshot_bytes']:.1f} B on average. Local input is applied on the tick it is read. "
+          f"Byte counts include message framing, not TCP/IP headers.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import numpy as np
+
+import math
+import struct
+from typing import Final
+
+
+class PlatformStore:
+    """
+    Array-backed platforms of one course in world space, seen through a single camera offset.
+    New platforms are always built above the last one, so the live platforms fill one contiguous block of the
+    arrays that is sorted by y: the top platform sits at self.start and the bottom one at self.end - 1. New
+    platforms are written just before the block and old ones are dropped from its end, so the platforms near a
+    given height are found with np.searchsorted and scrolling only moves the camera. The revision counts every
+    change that moves, adds or removes a platform, so renderers can tell when the course looks different.
+    """
+    INITIAL_CAPACITY: Final[int] = 64
+    STATE_HEADER: Final[struct.Struct] = struct.Struct('<qI')
+
+    def __init__(self, size: tuple[int], capacity: int = INITIAL_CAPACITY) -> None:
+        """
+        Initialize an empty platform store.
+        Args:
+        size (tuple[int]): The (width, height) of every platform.
+        capacity (int): The initial number of slots. The arrays double when they run full.
+        """
+        self.size: tuple[int] = size
+        self.xs: np.ndarray = np.zeros(capacity, dtype=np.int32)
+        self.ys: np.ndarray = np.zeros(capacity, dtype=np.int32)
+        self.scored: np.ndarray = np.zeros(capacity, dtype=np.int8)
+        self.start: int = capacity
+        self.end: int = capacity
+        self.camera_y: int = 0
+        self.revision: int = 0
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    @property
+    def capacity(self) -> int:
+        """ The number of slots in the arrays. """
+        return len(self.xs)
+
+    @property
+    def top(self) -> tuple[int]:
+        """ The (x, y) world position of the highest platform. """
+        return int(self.xs[self.start]), int(self.ys[self.start])
+
+    def screen_y(self, slot: int) -> int:
+        """
+        Get the on-screen y position of a platform.
+        Args:
+        slot (int): The slot of the platform.
+        Returns:
+        int: The y position on the screen.
+        """
+        return int(self.ys[slot]) + self.camera_y
+
+    def get_state(self) -> bytes:
+        """
+        Serialize the camera and the live platforms.
+        Returns:
+        bytes: The state, to be restored with set_state.
+        """
+        live = slice(self.start, self.end)
+        return (self.STATE_HEADER.pack(self.camera_y, len(self)) + self.xs[live].tobytes()
+                + self.ys[live].tobytes() + self.scored[live].tobytes())
+
+    def set_state(self, state: bytes) -> None:
+        """
+        Restore the camera and the live platforms from get_state. Counts as a change of the course.
+        Args:
+        state (bytes): The serialized state.
+        """
+        camera_y, count = self.STATE_HEADER.unpack_from(state)
+        capacity = self.capacity
+        while count > capacity // 2 + 1:
+            capacity *= 2
+        if capacity != self.capacity:
+            self.xs = np.zeros(capacity, dtype=np.int32)
+            self.ys = np.zeros(capacity, dtype=np.int32)
+            self.scored = np.zeros(capacity, dtype=np.int8)
+        self.start, self.end = capacity - count, capacity
+        offset = self.STATE_HEADER.size
+        for array in (self.xs, self.ys, self.scored):
+            array[self.start:] = np.frombuffer(state, dtype=array.dtype, count=count, offset=offset)
+            offset += count * array.itemsize
+        self.camera_y = camera_y
+        self.revision += 1
+
+    def _make_room(self, needed: int = 1) -> None:
+        """
+        Move the live block to the end of the arrays, doubling them first while they would be more than half full.
+        Args:
+        needed (int): The number of platforms that have to fit in front of the live block.
+        """
+        count = len(self)
+        capacity = self.capacity
+        while count + needed > capacity // 2 + 1:
+            capacity *= 2
+        grow = capacity != self.capacity
+        for name in ('xs', 'ys', 'scored'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype) if grow else old
+            new[capacity - count:] = old[self.start:self.end]
+            setattr(self, name, new)
+        self.start = capacity - count
+        self.end = capacity
+
+    def append(self, x: int, y: int, scored: int = 1) -> None:
+        """
+        Add a platform on top of the course.
+        Args:
+        x (int): The left edge of the platform in world space.
+        y (int): The top edge of the platform in world space. Must be above the current top platform.
+        scored (int): 1 if landing on the platform still gives points, else 0.
+        """
+        if len(self) and y >= self.ys[self.start]:
+            raise ValueError("platforms must be appended above the current top platform")
+        if self.start == 0:
+            self._make_room()
+        self.start -= 1
+        self.xs[self.start] = x
+        self.ys[self.start] = y
+        self.scored[self.start] = scored
+        self.revision += 1
+
+    def extend(self, xs: np.ndarray, ys: np.ndarray, scored: int = 1) -> None:
+        """
+        Add several platforms on top of the course at once.
+        Args:
+        xs (np.ndarray): The left edges of the platforms in world space, from bottom to top.
+        ys (np.ndarray): The top edges of the platforms in world space, from bottom to top. Every platform must be
+        above the one before it and the first above the current top platform.
+        scored (int): 1 if landing on the platforms still gives points, else 0.
+        """
+        count = len(xs)
+        if not count:
+            return
+        if (len(self) and ys[0] >= self.ys[self.start]) or (np.diff(ys) >= 0).any():
+            raise ValueError("platforms must be appended above the current top platform")
+        if self.start < count:
+            self._make_room(count)
+        self.start -= count
+        # The live block is sorted from top to bottom, the reverse of the given order.
+        self.xs[self.start:self.start + count] = xs[::-1]
+        self.ys[self.start:self.start + count] = ys[::-1]
+        self.scored[self.start:self.start + count] = scored
+        self.revision += 1
+
+    def pop_bottom(self) -> None:
+        """ Remove the lowest platform. """
+        if not len(self):
+            raise IndexError("pop from an empty platform store")
+        self.end -= 1
+        self.revision += 1
+
+    def scroll(self, distance: int) -> None:
+        """
+        Move the course down on the screen. Only the camera moves, the platforms keep their world positions.
+        Args:
+        distance (int): The number of pixels to move.
+        """
+        self.camera_y += distance
+        self.revision += 1
+
+    def query(self, top: float, bottom: float) -> range:
+        """
+        Get the platforms overlapping a horizontal band of the screen.
+        Args:
+        top (float): The upper edge of the band on the screen.
+        bottom (float): The lower edge of the band on the screen.
+        Returns:
+        range: The slots of the platforms that overlap the band, from bottom to top.
+        """
+        # The positions are integers, so "y > top - height" and "y < bottom" become two left-sided searches
+        # that numpy answers in a single call.
+        bounds = (math.floor(top - self.camera_y - self.size[1]) + 1, math.ceil(bottom - self.camera_y))
+        low, high = self.ys[self.start:self.end].searchsorted(bounds).tolist()
+        return range(self.start + high - 1, self.start + low - 1, -1)
+
+    def tops_between(self, top: float, bottom: float) -> range:
+        """
+        Get the platforms whose top edge lies in a band of the screen, for sweeps of the players' feet.
+        Args:
+        top (float): The upper edge of the band on the screen, excluded.
+        bottom (float): The lower edge of the band on the screen, included.
+        Returns:
+        range: The slots of the platforms, from top to bottom.
+        """
+        # Feet resting on the top edge do not cross it. For integer positions "y > top" and "y <= bottom" become two
+        # left-sided searches at the rounded down bounds plus one.
+        bounds = (math.floor(top - self.camera_y) + 1, math.floor(bottom - self.camera_y) + 1)
+        low, high = self.ys[self.start:self.end].searchsorted(bounds).tolist()
+        return range(self.start + low, self.start + high)
+
+    def screen_positions(self, top: float, bottom: float) -> list[tuple[int]]:
+        """
+        Translate the platforms overlapping a band of the screen into screen coordinates.
+        Args:
+        top (float): The upper edge of the band on the screen.
+        bottom (float): The lower edge of the band on the screen.
+        Returns:
+        list[tuple[int]]: The (x, y) screen positions of the platforms, from top to bottom.
+        """
+        slots = self.query(top, bottom)
+        if not slots:
+            return []
+        low, high = slots.stop + 1, slots.start + 1
+        return list(zip(self.xs[low:high].tolist(), (self.ys[low:high] + self.camera_y).tolist()))
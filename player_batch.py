@@ -0,0 +1,363 @@
+import numpy as np
+
+import settings as sett
+from platform_store import PlatformStore
+
+import math
+from typing import Final, Sequence
+
+Movement = Sequence[bool]
+
+
+class PlayerBatch:
+    """
+    Array-backed state of any number of players, advanced together in one vectorized step.
+    Row i of every array belongs to player i. The position is the center of the bottom edge of the player on the
+    screen and, like the velocity, a float in pixels (per second). Every player runs on the course given by its
+    lane. Players sharing a course share its points: the first player to land on a platform scores it.
+    Batches of up to SCALAR_LIMIT players are stepped row by row instead, because the fixed cost of the array
+    operations outweighs the work for a handful of players. Both paths compute exactly the same results.
+    Every step moves the players along their exact path under gravity and sweeps their feet from the top of that
+    path down to where the step ends. A falling player lands on the first platform top the feet cross while the
+    player overlaps it, at the time they cross it, so steps of any length land on the same platforms.
+    """
+    WIDTH: Final[int] = 32
+    HEIGHT: Final[int] = 64
+    LANDING_POINTS: Final[int] = 100
+    SCALAR_LIMIT: Final[int] = 4
+
+    def __init__(self, start_positions: Sequence[Sequence[float]], lanes: None | Sequence[int] = None) -> None:
+        """
+        Initialize the players.
+        Args:
+        start_positions (Sequence[Sequence[float]]): One (x, y) start position per player.
+        lanes (None | Sequence[int]): The index of the course of every player. None puts all players on course 0.
+        """
+        count = len(start_positions)
+        self.pos: np.ndarray = np.array(start_positions, dtype=np.float64).reshape(count, 2)
+        self.previous_pos: np.ndarray = self.pos.copy()
+        self.velocity: np.ndarray = np.zeros((count, 2))
+        self.scores: np.ndarray = np.zeros(count, dtype=np.int64)
+        self.lanes: np.ndarray = np.zeros(count, dtype=np.intp) if lanes is None else np.array(lanes, dtype=np.intp)
+        # The players of every lane, found once because the lanes never change. Lanes with a single player are
+        # checked for landings without array operations.
+        self.lane_members: list[np.ndarray] = [np.flatnonzero(self.lanes == lane) for lane in range(int(self.lanes.max(initial=-1)) + 1)]
+        self.lane_rows: list[None | int] = [int(members[0]) if len(members) == 1 else None for members in self.lane_members]
+
+    def __len__(self) -> int:
+        return len(self.pos)
+
+    def lefts(self) -> np.ndarray:
+        """
+        Get the left edges of the player rects.
+        Returns:
+        np.ndarray: The whole pixel left edge of every player.
+        """
+        return self.pos[:, 0].astype(np.int64) - self.WIDTH // 2
+
+    def bottoms(self) -> np.ndarray:
+        """
+        Get the bottom edges of the player rects.
+        Returns:
+        np.ndarray: The whole pixel bottom edge of every player.
+        """
+        return self.pos[:, 1].astype(np.int64)
+
+    def fallen(self) -> np.ndarray:
+        """
+        Get which players dropped out of the bottom of the game window.
+        Returns:
+        np.ndarray: One bool per player.
+        """
+        return self.bottoms() - self.HEIGHT > sett.GAME_WINDOW_RESOLUTION[1]
+
+    def reset_rows(self, rows: Sequence[int], positions: Sequence[Sequence[float]]) -> None:
+        """
+        Put players back to the start: standing still at a position, without points.
+        Args:
+        rows (Sequence[int]): The indices of the players.
+        positions (Sequence[Sequence[float]]): One (x, y) position per player.
+        """
+        self.pos[rows] = positions
+        self.previous_pos[rows] = positions
+        self.velocity[rows] = 0.0
+        self.scores[rows] = 0
+
+    def get_state(self) -> bytes:
+        """
+        Serialize the state of all players.
+        Returns:
+        bytes: The state, to be restored with set_state.
+        """
+        return b''.join(array.tobytes() for array in (self.pos, self.previous_pos, self.velocity, self.scores))
+
+    def set_state(self, state: bytes) -> None:
+        """
+        Restore the state of all players from get_state of a batch of the same size. The arrays are written in
+        place, so views onto them stay valid.
+        Args:
+        state (bytes): The serialized state.
+        """
+        offset = 0
+        for array in (self.pos, self.previous_pos, self.velocity, self.scores):
+            array[...] = np.frombuffer(state, dtype=array.dtype, count=array.size, offset=offset).reshape(array.shape)
+            offset += array.nbytes
+
+    def start_tick(self) -> None:
+        """
+        Keep the positions at the start of a simulation tick, which the frames are interpolated from. A tick split
+        at scrolls is moved through in several update calls, so this is called once before them.
+        """
+        self.previous_pos[:] = self.pos
+
+    def update(self, courses: Sequence[PlatformStore], movements: Sequence[Movement], dt: float | np.ndarray = 1 / sett.BASE_FRAME_RATE) -> None:
+        """
+        Advance the position and velocity of all players by one simulation step or part of one.
+        Args:
+        courses (Sequence[PlatformStore]): The platforms of every lane.
+        movements (Sequence[Movement]): One [left, right] pair per player.
+        dt (float | np.ndarray): The length of the step in seconds, for all players or one per player.
+        """
+        if len(self) <= self.SCALAR_LIMIT:
+            self.update_rows(courses, movements, dt)
+        else:
+            self.update_arrays(courses, movements, dt)
+
+    @staticmethod
+    def fall(y: float, velocity_y: float, dt: float) -> tuple[float, float, float]:
+        """
+        Move a player along its path under gravity. update_arrays does the same for all players at once.
+        Args:
+        y (float): The bottom of the player at the start.
+        velocity_y (float): The vertical velocity at the start.
+        dt (float): The time to move in seconds.
+        Returns:
+        tuple[float, float, float]: The bottom and the vertical velocity at the end, and the time at which the fall
+        speed reaches MAX_FALL_SPEED (dt if it does not).
+        """
+        cap_time = min((sett.MAX_FALL_SPEED - velocity_y) / sett.GRAVITY, dt)
+        new_y = y + (velocity_y + 0.5 * sett.GRAVITY * cap_time) * cap_time + sett.MAX_FALL_SPEED * (dt - cap_time)
+        return new_y, min(sett.MAX_FALL_SPEED, velocity_y + sett.GRAVITY * dt), cap_time
+
+    def hit_ceiling(self, x: float, y: float, velocity_y: float, speed_x: float, dt: float) -> tuple[float, float, float, float]:
+        """
+        Stop a rising player at the top of the game window if it gets there in time. update_arrays does the same
+        for all players at once.
+        Args:
+        x (float): The center of the player at the start.
+        y (float): The bottom of the player at the start.
+        velocity_y (float): The vertical velocity at the start.
+        speed_x (float): The horizontal velocity.
+        dt (float): The time to move in seconds.
+        Returns:
+        tuple[float, float, float, float]: The position and vertical velocity to go on from and the time left to
+        move. Players that do not reach the top are returned unchanged.
+        """
+        if velocity_y < 0:
+            discriminant = velocity_y * velocity_y + 2 * sett.GRAVITY * (self.HEIGHT - y)
+            if discriminant >= 0:
+                # Players that landed on a platform reaching above the top are stopped right away.
+                time = max((-velocity_y - math.sqrt(discriminant)) / sett.GRAVITY, 0.0)
+                if time < dt:
+                    return min(max(x + speed_x * time, self.WIDTH / 2), sett.GAME_WINDOW_RESOLUTION[0] - self.WIDTH / 2), float(self.HEIGHT), 0.0, dt - time
+        return x, y, velocity_y, dt
+
+    def move_row(self, course: PlatformStore, row: int, x: float, y: float, velocity_y: float, speed_x: float, dt: float) -> tuple[float, float, float]:
+        """
+        Move a single player through the time of a step, stopping at the top of the game window and jumping off
+        every platform landed on.
+        Args:
+        course (PlatformStore): The platforms of the player's course.
+        row (int): The index of the player.
+        x (float): The center of the player at the start.
+        y (float): The bottom of the player at the start.
+        velocity_y (float): The vertical velocity at the start.
+        speed_x (float): The horizontal velocity.
+        dt (float): The time to move in seconds.
+        Returns:
+        tuple[float, float, float]: The center, bottom and vertical velocity of the player at the end.
+        """
+        while True:
+            x, y, velocity_y, dt = self.hit_ceiling(x, y, velocity_y, speed_x, dt)
+            new_y, new_velocity_y, cap_time = self.fall(y, velocity_y, dt)
+            landing = self.land_row(course, row, x, y, velocity_y, speed_x, cap_time, new_y, dt) if new_velocity_y > 0 else None
+            if landing is None:
+                return min(max(x + speed_x * dt, self.WIDTH / 2), sett.GAME_WINDOW_RESOLUTION[0] - self.WIDTH / 2), new_y, new_velocity_y
+            # The player jumps off the platform, and the rest of the time is moved from there.
+            x, y, time = landing
+            velocity_y = sett.JUMP_SPEED
+            dt -= time
+
+    def update_rows(self, courses: Sequence[PlatformStore], movements: Sequence[Movement], dt: float | np.ndarray) -> None:
+        """
+        Step the players one after another with Python floats.
+        Args:
+        courses (Sequence[PlatformStore]): The platforms of every lane.
+        movements (Sequence[Movement]): One [left, right] pair per player.
+        dt (float | np.ndarray): The length of the step in seconds, for all players or one per player.
+        """
+        positions = self.pos.tolist()
+        velocities = self.velocity[:, 1].tolist()
+        step_times = np.broadcast_to(dt, len(self)).tolist()
+        for i, ((x, y), velocity_y, (left, right)) in enumerate(zip(positions, velocities, movements)):
+            speed_x = (int(right) - int(left)) * sett.MOVE_SPEED
+            x, y, velocities[i] = self.move_row(courses[self.lanes[i]], i, x, y, velocity_y, speed_x, step_times[i])
+            positions[i] = [x, y]
+        self.pos[:] = positions
+        self.velocity[:, 1] = velocities
+
+    def update_arrays(self, courses: Sequence[PlatformStore], movements: Sequence[Movement], dt: float | np.ndarray) -> None:
+        """
+        Step all players at once with array operations. The few players that land during the step move on from
+        the platform with move_row, so both paths compute the same.
+        Args:
+        courses (Sequence[PlatformStore]): The platforms of every lane.
+        movements (Sequence[Movement]): One [left, right] pair per player.
+        dt (float | np.ndarray): The length of the step in seconds, for all players or one per player.
+        """
+        movements = np.asarray(movements, dtype=np.float64).reshape(len(self), 2)
+        xs, ys = self.pos[:, 0], self.pos[:, 1]
+        velocity_y = self.velocity[:, 1]
+        speeds_x = (movements[:, 1] - movements[:, 0]) * sett.MOVE_SPEED
+        max_x = sett.GAME_WINDOW_RESOLUTION[0] - self.WIDTH / 2
+        # The same operations as hit_ceiling and fall, in the same order, so both paths round the same.
+        step_times = np.array(np.broadcast_to(dt, len(self)), dtype=np.float64)
+        discriminants = velocity_y * velocity_y + 2 * sett.GRAVITY * (self.HEIGHT - ys)
+        ceiling_times = np.maximum((-velocity_y - np.sqrt(np.maximum(discriminants, 0.0))) / sett.GRAVITY, 0.0)
+        ceiling = (velocity_y < 0) & (discriminants >= 0) & (ceiling_times < step_times)
+        if ceiling.any():
+            xs[ceiling] = np.minimum(np.maximum(xs[ceiling] + speeds_x[ceiling] * ceiling_times[ceiling], self.WIDTH / 2), max_x)
+            ys[ceiling] = self.HEIGHT
+            velocity_y[ceiling] = 0.0
+            step_times[ceiling] -= ceiling_times[ceiling]
+        cap_times = np.minimum((sett.MAX_FALL_SPEED - velocity_y) / sett.GRAVITY, step_times)
+        new_xs = np.minimum(np.maximum(xs + speeds_x * step_times, self.WIDTH / 2), max_x)
+        new_ys = ys + (velocity_y + 0.5 * sett.GRAVITY * cap_times) * cap_times + sett.MAX_FALL_SPEED * (step_times - cap_times)
+        new_velocity_y = np.minimum(velocity_y + sett.GRAVITY * step_times, sett.MAX_FALL_SPEED)
+
+        falling = new_velocity_y > 0
+        if falling.any():
+            falling_rows = falling.tolist()
+            # The players alone in their lane already moved like move_row would, only the landings are left to find.
+            rows = list(zip(xs.tolist(), ys.tolist(), velocity_y.tolist(), speeds_x.tolist(), cap_times.tolist(), new_ys.tolist(), step_times.tolist()))
+            for course, members, row in zip(courses, self.lane_members, self.lane_rows):
+                if row is None:
+                    members = members[falling[members]]
+                    if len(members):
+                        for row, (x, y, time) in zip(*self.land(course, members, speeds_x, cap_times, new_ys, step_times)):
+                            speed_x, step_time = rows[row][3], rows[row][6]
+                            new_xs[row], new_ys[row], new_velocity_y[row] = self.move_row(course, row, x, y, sett.JUMP_SPEED, speed_x, step_time - time)
+                elif falling_rows[row]:
+                    landing = self.land_row(course, row, *rows[row])
+                    if landing is not None:
+                        x, y, time = landing
+                        speed_x, step_time = rows[row][3], rows[row][6]
+                        new_xs[row], new_ys[row], new_velocity_y[row] = self.move_row(course, row, x, y, sett.JUMP_SPEED, speed_x, step_time - time)
+        xs[:] = new_xs
+        ys[:] = new_ys
+        velocity_y[:] = new_velocity_y
+
+    @staticmethod
+    def crossing_time(distance: float, velocity_y: float, cap_time: float) -> float:
+        """
+        Get when the feet of a falling player pass a height. land does the same for arrays.
+        Args:
+        distance (float): How far the height is below the bottom of the player at the start.
+        velocity_y (float): The vertical velocity at the start.
+        cap_time (float): The time the fall speed reaches MAX_FALL_SPEED, from fall.
+        Returns:
+        float: The time in seconds, on the falling part of the player's path.
+        """
+        cap_distance = (velocity_y + 0.5 * sett.GRAVITY * cap_time) * cap_time
+        if distance <= cap_distance:
+            return (math.sqrt(max(velocity_y * velocity_y + 2 * sett.GRAVITY * distance, 0.0)) - velocity_y) / sett.GRAVITY
+        return cap_time + (distance - cap_distance) / sett.MAX_FALL_SPEED
+
+    def land_row(self, course: PlatformStore, row: int, x: float, y: float, velocity_y: float, speed_x: float, cap_time: float,
+                 new_y: float, dt: float) -> None | tuple[float, int, float]:
+        """
+        Find the platform a single falling player lands on and hand out its points.
+        Args:
+        course (PlatformStore): The platforms of the player's course.
+        row (int): The index of the player.
+        x (float): The center of the player at the start.
+        y (float): The bottom of the player at the start.
+        velocity_y (float): The vertical velocity at the start.
+        speed_x (float): The horizontal velocity.
+        cap_time (float): The time the fall speed reaches MAX_FALL_SPEED, from fall.
+        new_y (float): The bottom of the player at the end of the time, from fall.
+        dt (float): The time the player moves in seconds.
+        Returns:
+        None | tuple[float, int, float]: The center of the player and the screen y of the platform when the feet
+        reached it, and the time that took. None if the player does not land.
+        """
+        # The feet fall from the top of the path, or from the start if the player falls already.
+        top_time = min(max(-velocity_y / sett.GRAVITY, 0.0), dt)
+        fall_y = y + (velocity_y + 0.5 * sett.GRAVITY * top_time) * top_time
+        width = course.size[0]
+        max_x = sett.GAME_WINDOW_RESOLUTION[0] - self.WIDTH / 2
+        # The platforms are crossed from the top down, the first one the player overlaps is the one landed on.
+        for slot in course.tops_between(fall_y, new_y):
+            platform_x, platform_y = int(course.xs[slot]), course.screen_y(slot)
+            time = self.crossing_time(platform_y - y, velocity_y, cap_time)
+            crossing_x = min(max(x + speed_x * time, self.WIDTH / 2), max_x)
+            if crossing_x - self.WIDTH / 2 < platform_x + width and crossing_x + self.WIDTH / 2 > platform_x:
+                if course.scored[slot] == 1:
+                    self.scores[row] += self.LANDING_POINTS
+                    course.scored[slot] = 0
+                return crossing_x, platform_y, time
+        return None
+
+    def land(self, course: PlatformStore, members: np.ndarray, speeds_x: np.ndarray, cap_times: np.ndarray, new_ys: np.ndarray,
+             step_times: np.ndarray) -> tuple[list[int], list[tuple[float, int, float]]]:
+        """
+        Find the platforms falling players of one course land on and hand out the points.
+        Args:
+        course (PlatformStore): The platforms of the course.
+        members (np.ndarray): The indices of the falling players on the course, in ascending order.
+        speeds_x (np.ndarray): The horizontal velocity of every player.
+        cap_times (np.ndarray): The time the fall speed of every player reaches MAX_FALL_SPEED.
+        new_ys (np.ndarray): The bottom of every player at the end of the step without landing.
+        step_times (np.ndarray): The time every player moves in seconds, shorter after hitting the top.
+        Returns:
+        tuple[list[int], list[tuple[float, int, float]]]: The players that land, and for every one of them the
+        center of the player and the screen y of the platform when the feet reached it, and the time that took.
+        """
+        x, y, velocity_y = self.pos[members, 0, None], self.pos[members, 1, None], self.velocity[members, 1, None]
+        speed_x, cap_time, new_y = speeds_x[members, None], cap_times[members, None], new_ys[members, None]
+        top_time = np.minimum(np.maximum(-velocity_y / sett.GRAVITY, 0.0), step_times[members, None])
+        fall_y = y + (velocity_y + 0.5 * sett.GRAVITY * top_time) * top_time
+        slots = course.tops_between(float(fall_y.min()), float(new_y.max()))
+        if not slots:
+            return [], []
+        width = course.size[0]
+        platform_xs = course.xs[slots.start:slots.stop]
+        platform_ys = course.ys[slots.start:slots.stop] + course.camera_y
+
+        # One row per player and one column per platform, with the same operations as crossing_time and land_row.
+        distance = platform_ys - y
+        cap_distance = (velocity_y + 0.5 * sett.GRAVITY * cap_time) * cap_time
+        times = np.where(distance <= cap_distance,
+                         (np.sqrt(np.maximum(velocity_y * velocity_y + 2 * sett.GRAVITY * distance, 0.0)) - velocity_y) / sett.GRAVITY,
+                         cap_time + (distance - cap_distance) / sett.MAX_FALL_SPEED)
+        crossing_x = np.minimum(np.maximum(x + speed_x * times, self.WIDTH / 2), sett.GAME_WINDOW_RESOLUTION[0] - self.WIDTH / 2)
+        hits = ((platform_ys > fall_y) & (platform_ys <= new_y)
+                & (crossing_x - self.WIDTH / 2 < platform_xs + width) & (crossing_x + self.WIDTH / 2 > platform_xs))
+        landed = hits.any(axis=1)
+        if not landed.any():
+            return [], []
+        players = members[landed]
+        # The platforms are sorted from top to bottom, the first one touched is the highest.
+        chosen = hits[landed].argmax(axis=1)
+        landings = list(zip(crossing_x[landed, chosen].tolist(), platform_ys[chosen].tolist(), times[landed, chosen].tolist()))
+        landed_rows = players.tolist()
+
+        landed_slots = slots.start + chosen
+        if len(players) > 1:
+            # The players are in ascending order, so every platform goes to the first player that landed on it.
+            landed_slots, first = np.unique(landed_slots, return_index=True)
+            players = players[first]
+        scoring = course.scored[landed_slots] == 1
+        self.scores[players[scoring]] += self.LANDING_POINTS
+        course.scored[landed_slots[scoring]] = 0
+        return landed_rows, landings
@@ -0,0 +1,219 @@
+import numpy as np
+import pygame as pg
+
+import csv
+import json
+import time
+from typing import Final
+
+from text_cache import fonts
+
+
+class FrameProfiler:
+    """
+    Times the phases of every frame into a fixed-size ring buffer.
+    A frame is opened with start_frame, every finished phase is recorded with lap and the frame is closed with
+    end_frame. While disabled all three return right away, so the calls can stay in the game loops. Toggling drops the
+    frame in progress, so only frames started while enabled are recorded.
+    """
+    CAPACITY: Final[int] = 1024
+    MAX_PHASES: Final[int] = 16
+    COUNT_NAMES: Final[tuple[str]] = ('players', 'platforms', 'clouds')
+    OVERLAY_REFRESH: Final[float] = 0.25
+    OVERLAY_COLOR: Final[tuple[int]] = (20, 20, 20)
+
+    def __init__(self, enabled: bool = False, capacity: int = CAPACITY) -> None:
+        """
+        Initialize the profiler.
+        Args:
+        enabled (bool): Whether frames are recorded.
+        capacity (int): The number of frames kept in the ring buffer.
+        """
+        self.enabled: bool = enabled
+        self.show_overlay: bool = False
+        self.capacity: int = capacity
+        self.phases: dict[str, int] = {}
+        self.screens: dict[str, int] = {}
+        # Seconds from the start of the frame to the end of every phase, NaN for phases that did not run.
+        self.phase_ends: np.ndarray = np.full((capacity, self.MAX_PHASES), np.nan)
+        self.frame_starts: np.ndarray = np.zeros(capacity)
+        self.frame_times: np.ndarray = np.zeros(capacity)
+        self.frame_screens: np.ndarray = np.zeros(capacity, dtype=np.int16)
+        self.counts: np.ndarray = np.zeros((capacity, len(self.COUNT_NAMES)), dtype=np.int32)
+        self.frames: int = 0
+        self.row: int = 0
+        self.frame_start: float = 0.0
+        # Whether start_frame opened the frame in progress.
+        self.recording: bool = False
+        self.overlay: None | pg.Surface = None
+        self.overlay_time: float = 0.0
+
+    def toggle(self) -> None:
+        """ Switch recording and the overlay on or off together. """
+        self.enabled = not self.enabled
+        self.show_overlay = self.enabled
+        self.recording = False
+
+    def start_frame(self, screen: str) -> None:
+        """
+        Start recording a frame.
+        Args:
+        screen (str): The name of the screen the frame belongs to.
+        """
+        self.recording = self.enabled
+        if not self.enabled:
+            return
+        self.row = self.frames % self.capacity
+        self.frame_start = time.perf_counter()
+        self.frame_starts[self.row] = self.frame_start
+        self.phase_ends[self.row] = np.nan
+        self.frame_screens[self.row] = self.screens.setdefault(screen, len(self.screens))
+
+    def lap(self, phase: str) -> None:
+        """
+        Record the end of a phase. The phase lasted from the previous lap (or the start of the frame) until now.
+        Args:
+        phase (str): The name of the phase.
+        """
+        if not self.recording:
+            return
+        column = self.phases.get(phase)
+        if column is None:
+            if len(self.phases) == self.MAX_PHASES:
+                raise ValueError(f"the profiler can track at most {self.MAX_PHASES} phases")
+            column = self.phases[phase] = len(self.phases)
+        self.phase_ends[self.row, column] = time.perf_counter() - self.frame_start
+
+    def end_frame(self, players: int = 0, platforms: int = 0, clouds: int = 0) -> None:
+        """
+        Finish recording a frame.
+        Args:
+        players (int): The number of players alive in the frame.
+        platforms (int): The number of platforms alive in the frame.
+        clouds (int): The number of clouds alive in the frame.
+        """
+        if not self.recording:
+            return
+        self.frame_times[self.row] = time.perf_counter() - self.frame_start
+        self.counts[self.row] = (players, platforms, clouds)
+        self.frames += 1
+        self.recording = False
+
+    def recorded(self) -> np.ndarray:
+        """
+        Get the rows of the recorded frames from oldest to newest.
+        Returns:
+        np.ndarray: The row indices into the ring buffer.
+        """
+        # The row after the newest frame may already hold the frame in progress.
+        count = min(self.frames, self.capacity - 1)
+        return (np.arange(count) + self.frames - count) % self.capacity
+
+    def phase_durations(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Get how long every phase took in the given frames.
+        Args:
+        rows (np.ndarray): The row indices of the frames.
+        Returns:
+        np.ndarray: The duration in seconds per frame and phase, NaN for phases that did not run.
+        """
+        ends = self.phase_ends[rows]
+        order = np.argsort(np.where(np.isnan(ends), np.inf, ends), axis=1)
+        sorted_ends = np.take_along_axis(ends, order, axis=1)
+        # Phases that did not run sort behind all others, so they never shift the phases that did.
+        previous = np.concatenate((np.zeros((len(rows), 1)), sorted_ends[:, :-1]), axis=1)
+        durations = np.empty_like(ends)
+        np.put_along_axis(durations, order, sorted_ends - previous, axis=1)
+        return durations
+
+    def summary(self) -> dict[str, float | dict[str, float]]:
+        """
+        Summarize the recorded frames.
+        Returns:
+        dict[str, float | dict[str, float]]: FPS, p50/p99 frame time in ms and the mean time per phase in ms.
+        """
+        rows = self.recorded()
+        if not len(rows):
+            return {'fps': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'phases_ms': {}}
+        frame_times = self.frame_times[rows]
+        durations = self.phase_durations(rows)
+        phases_ms = {}
+        for phase, column in self.phases.items():
+            if not np.isnan(durations[:, column]).all():
+                phases_ms[phase] = float(np.nanmean(durations[:, column]) * 1000)
+        return {'fps': float(len(rows) / frame_times.sum()) if frame_times.sum() else 0.0,
+                'p50_ms': float(np.percentile(frame_times, 50) * 1000),
+                'p99_ms': float(np.percentile(frame_times, 99) * 1000),
+                'phases_ms': phases_ms}
+
+    def render_overlay(self, surf: pg.Surface, pos: tuple[int]) -> None | pg.Rect:
+        """
+        Draw the profiler overlay. The text is only rendered again every OVERLAY_REFRESH seconds.
+        Args:
+        surf (pg.Surface): The surface to draw on.
+        pos (tuple[int]): The bottom left corner of the overlay.
+        Returns:
+        None | pg.Rect: The area drawn to, None while the overlay is hidden.
+        """
+        if not self.show_overlay:
+            return None
+        now = time.perf_counter()
+        if self.overlay is None or now - self.overlay_time > self.OVERLAY_REFRESH:
+            summary = self.summary()
+            lines = [f"{summary['fps']:.0f} FPS  p50 {summary['p50_ms']:.1f} ms  p99 {summary['p99_ms']:.1f} ms"]
+            lines += [f"{phase}: {duration:.2f} ms" for phase, duration in summary['phases_ms'].items()]
+            if self.frames:
+                counts = self.counts[(self.frames - 1) % self.capacity]
+                lines.append('  '.join(f"{name} {count}" for name, count in zip(self.COUNT_NAMES, counts)))
+            font = fonts.font('consolas', 14)
+            rendered = [font.render(line, True, 'white') for line in lines]
+            self.overlay = pg.Surface((max(line.get_width() for line in rendered) + 8, sum(line.get_height() for line in rendered) + 8))
+            self.overlay.fill(self.OVERLAY_COLOR)
+            y = 4
+            for line in rendered:
+                self.overlay.blit(line, (4, y))
+                y += line.get_height()
+            self.overlay_time = now
+        return surf.blit(self.overlay, self.overlay.get_rect(bottomleft=pos))
+
+    def export_csv(self, path: str) -> None:
+        """
+        Write the recorded frames to a CSV file, one row per frame with the phase durations in ms.
+        Args:
+        path (str): The path of the CSV file.
+        """
+        rows = self.recorded()
+        durations = self.phase_durations(rows) * 1000
+        screen_names = {index: name for name, index in self.screens.items()}
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['frame', 'screen', 'frame_ms', *self.phases, *self.COUNT_NAMES])
+            for frame, row, duration in zip(range(self.frames - len(rows), self.frames), rows, durations):
+                phase_values = ['' if np.isnan(duration[column]) else round(float(duration[column]), 4) for column in self.phases.values()]
+                writer.writerow([frame, screen_names[int(self.frame_screens[row])], round(float(self.frame_times[row] * 1000), 4), *phase_values, *self.counts[row].tolist()])
+
+    def export_chrome_trace(self, path: str) -> None:
+        """
+        Write the recorded frames as Chrome trace events, viewable in chrome://tracing or Perfetto.
+        Args:
+        path (str): The path of the JSON file.
+        """
+        rows = self.recorded()
+        durations = self.phase_durations(rows)
+        screen_names = {index: name for name, index in self.screens.items()}
+        origin = self.frame_starts[rows[0]] if len(rows) else 0.0
+        events = []
+        for row, duration in zip(rows, durations):
+            start_us = (self.frame_starts[row] - origin) * 1e6
+            events.append({'name': screen_names[int(self.frame_screens[row])], 'ph': 'X', 'pid': 1, 'tid': 1,
+                           'ts': round(start_us, 1), 'dur': round(float(self.frame_times[row]) * 1e6, 1)})
+            for phase, column in self.phases.items():
+                if np.isnan(duration[column]):
+                    continue
+                end_us = start_us + self.phase_ends[row, column] * 1e6
+                events.append({'name': phase, 'ph': 'X', 'pid': 1, 'tid': 1,
+                               'ts': round(end_us - duration[column] * 1e6, 1), 'dur': round(float(duration[column]) * 1e6, 1)})
+            events.append({'name': 'entities', 'ph': 'C', 'pid': 1, 'tid': 1, 'ts': round(start_us, 1),
+                           'args': dict(zip(self.COUNT_NAMES, self.counts[row].tolist()))})
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
@@ -0,0 +1,181 @@
+import pygame as pg
+
+from typing import Any, Callable, Final, Hashable
+
+
+class DirtyRectTracker:
+    """
+    Collects the regions of a surface that changed since the last frame.
+    Every drawn object reports its rect (and anything else that changes its look, like a flipped image) under a
+    stable key once per frame. Objects that moved, changed or vanished mark their old and new rects as dirty, so
+    only those regions have to be redrawn and pushed to the display.
+    """
+    MAX_RECTS: Final[int] = 24
+    FULL_REDRAW_RATIO: Final[float] = 0.5
+
+    def __init__(self, bounds: pg.Rect) -> None:
+        """
+        Initialize the tracker.
+        Args:
+        bounds (pg.Rect): The area of the tracked surface. Dirty rects are clipped to it.
+        """
+        self.bounds: pg.Rect = pg.Rect(bounds)
+        self.previous: dict[Hashable, tuple[pg.Rect, Any]] = {}
+        self.current: dict[Hashable, tuple[pg.Rect, Any]] = {}
+        self.dirty: list[pg.Rect] = []
+        self.full_redraw: bool = True
+
+    def invalidate(self) -> None:
+        """ Force a full redraw of the tracked surface on this frame. """
+        self.full_redraw = True
+
+    def track(self, key: Hashable, rect: pg.Rect, state: Any = None) -> None:
+        """
+        Report where an object is drawn on this frame.
+        Args:
+        key (Hashable): A key that identifies the object across frames.
+        rect (pg.Rect): The area the object covers. The tracker keeps a copy, so the rect may be moved later.
+        state (Any): Anything besides the rect that changes how the object looks.
+        """
+        old = self.previous.get(key)
+        if old is not None and old[0] == rect and old[1] == state:
+            # Unchanged, so the entry of the last frame is kept instead of copying the rect again.
+            self.current[key] = old
+            return
+        entry = (pg.Rect(rect), state)
+        self.current[key] = entry
+        self.dirty.append(entry[0])
+        if old is not None:
+            self.dirty.append(old[0])
+
+    def collect(self) -> list[pg.Rect]:
+        """
+        Finish the frame and get the regions to redraw.
+        Returns:
+        list[pg.Rect]: The dirty regions, clipped to the bounds. A single rect of the whole bounds on full redraws.
+        """
+        for key, (rect, _) in self.previous.items():
+            if key not in self.current:
+                self.dirty.append(rect)
+        self.previous, self.current = self.current, {}
+
+        dirty = [rect.clip(self.bounds) for rect in self.dirty]
+        dirty = [rect for rect in dirty if rect.width and rect.height]
+        self.dirty = []
+        if len(dirty) > self.MAX_RECTS:
+            dirty = [dirty[0].unionall(dirty[1:])]
+        area = sum(rect.width * rect.height for rect in dirty)
+        if self.full_redraw or area > self.bounds.width * self.bounds.height * self.FULL_REDRAW_RATIO:
+            self.full_redraw = False
+            return [pg.Rect(self.bounds)]
+        return dirty
+
+
+class MenuCompositor:
+    """
+    Composes a menu: a half transparent screen over a background color, with the buttons on top.
+    The blended screen is kept and only blended again when its content changed. Otherwise only the buttons that
+    changed are copied from the button surface, and only their areas have to be pushed to the display.
+    """
+    SCREEN_ALPHA: Final[int] = 125
+
+    def __init__(self, target: pg.Surface, color: tuple[int], buttons: pg.Surface) -> None:
+        """
+        Initialize the compositor.
+        Args:
+        target (pg.Surface): The surface the menu is composed on.
+        color (tuple[int]): The color behind the screen.
+        buttons (pg.Surface): The surface the buttons are drawn on, with a colorkey.
+        """
+        self.target: pg.Surface = target
+        self.color: tuple[int] = color
+        self.buttons: pg.Surface = buttons
+        self.background: pg.Surface = pg.Surface(target.get_size()).convert(target)
+        self.screen_key: None | Hashable = None
+
+    def invalidate(self) -> None:
+        """ Force the screen to be blended again on the next frame. """
+        self.screen_key = None
+
+    def needs_screen(self, screen_key: Hashable) -> bool:
+        """
+        Check whether the screen has to be drawn for this frame.
+        Args:
+        screen_key (Hashable): Anything that changes when the content of the screen changes.
+        Returns:
+        bool: Whether the screen changed since it was last blended.
+        """
+        return screen_key != self.screen_key
+
+    def compose(self, screen: pg.Surface, screen_key: Hashable, button_rects: list[pg.Rect], changed: list[pg.Rect]) -> list[pg.Rect]:
+        """
+        Compose a frame of the menu.
+        Args:
+        screen (pg.Surface): The menu screen, already drawn if needs_screen said so.
+        screen_key (Hashable): Anything that changes when the content of the screen changes.
+        button_rects (list[pg.Rect]): The areas of all buttons.
+        changed (list[pg.Rect]): The areas that were drawn over since the last frame, like changed buttons.
+        Returns:
+        list[pg.Rect]: The areas of the target that changed.
+        """
+        if self.needs_screen(screen_key):
+            self.background.fill(self.color)
+            screen.set_alpha(self.SCREEN_ALPHA)
+            self.background.blit(screen, (0, 0))
+            self.target.blit(self.background, (0, 0))
+            self.target.blits([(self.buttons, rect, rect) for rect in button_rects], doreturn=False)
+            self.screen_key = screen_key
+            return [self.target.get_rect()]
+
+        for rect in changed:
+            self.target.blit(self.background, rect, rect)
+        # A changed area can reach into a neighboring button, so every button over one is copied again.
+        self.target.blits([(self.buttons, rect, rect) for rect in button_rects if rect.collidelist(changed) != -1], doreturn=False)
+        return changed
+
+
+class ScreenTransition:
+    """
+    Slides the last frame of a screen down out of the window, paced by time instead of by frames.
+    The next screen is prepared on the first frame of the transition while the old frame still shows, and the
+    slide only starts after it, so a slow preparation neither skips the animation nor freezes the window.
+    """
+    DURATION: Final[float] = 0.6
+    MAX_STEP: Final[float] = 0.1
+
+    def __init__(self, target: pg.Surface, prepare: Callable[[], None], color: tuple[int], duration: float = DURATION) -> None:
+        """
+        Initialize the transition with a copy of the current content of the target.
+        Args:
+        target (pg.Surface): The surface to animate on.
+        prepare (Callable[[], None]): Prepares the next screen.
+        color (tuple[int]): The color uncovered by the sliding frame.
+        duration (float): The length of the slide in seconds.
+        """
+        self.target: pg.Surface = target
+        self.snapshot: pg.Surface = target.copy()
+        self.prepare: None | Callable[[], None] = prepare
+        self.color: tuple[int] = color
+        self.duration: float = duration
+        self.elapsed: float = 0.0
+
+    @property
+    def done(self) -> bool:
+        """ Whether the next screen is prepared and the old frame slid out of the window. """
+        return self.prepare is None and self.elapsed >= self.duration
+
+    def update(self, frame_time: float) -> None:
+        """
+        Advance the transition by a frame and draw it.
+        Args:
+        frame_time (float): The time since the last frame in seconds.
+        """
+        if self.prepare is not None:
+            self.prepare()
+            self.prepare = None
+            return
+        # A single long frame only moves the slide by a bit, so hitches do not make it jump.
+        self.elapsed = min(self.elapsed + min(frame_time, self.MAX_STEP), self.duration)
+        offset = int(self.target.get_height() * self.elapsed / self.duration)
+        self.target.fill(self.color, (0, 0, self.target.get_width(), offset))
+        self.target.blit(self.snapshot, (0, offset))
@@ -0,0 +1,214 @@
+"""
+Compact recordings of games and their headless replay.
+A recording holds the seed and settings of a game and one input byte per player and simulation tick. Replays
+run the simulation without a display as fast as the CPU allows and check that the final scores match.
+    python replay.py recordings/*.jrec
+"""
+import numpy as np
+
+from simulation import Simulation
+
+import argparse
+import struct
+import sys
+import time
+import zlib
+from typing import Final, Sequence
+
+Movement = Sequence[bool]
+
+INPUT_LEFT: Final[int] = 1
+INPUT_RIGHT: Final[int] = 2
+INPUT_FLIP: Final[int] = 4
+NOT_MOVED: Final[int] = 0xFFFFFFFF
+
+
+class Recording:
+    """
+    The inputs of one game, stored as a (ticks, players) array of input bytes.
+    Every byte combines INPUT_LEFT, INPUT_RIGHT and INPUT_FLIP. Saved recordings are zlib compressed, so the long
+    runs of held keys of a real game shrink to a few bytes.
+    """
+    MAGIC: Final[bytes] = b'JUMPYREC'
+    VERSION: Final[int] = 3
+    HEADER: Final[struct.Struct] = struct.Struct('<8sHQ8sHBHII')
+
+    def __init__(self, seed: int, difficulty: str, player_count: int, shared_course: bool, step_rate: int, moved_tick: None | int, inputs: np.ndarray, scores: Sequence[int]) -> None:
+        """
+        Initialize a recording.
+        Args:
+        seed (int): The seed of the simulation.
+        difficulty (str): The name of the difficulty preset.
+        player_count (int): The number of players.
+        shared_course (bool): Whether the players shared one course.
+        step_rate (int): The simulation steps per second.
+        moved_tick (None | int): The first tick the course scrolled on. None if it never did.
+        inputs (np.ndarray): The input bytes, one row per tick and one column per player.
+        scores (Sequence[int]): The final scores.
+        """
+        self.seed: int = seed
+        self.difficulty: str = difficulty
+        self.player_count: int = player_count
+        self.shared_course: bool = shared_course
+        self.step_rate: int = step_rate
+        self.moved_tick: None | int = moved_tick
+        self.inputs: np.ndarray = inputs
+        self.scores: list[int] = list(scores)
+
+    @property
+    def ticks(self) -> int:
+        """ The number of recorded ticks. """
+        return len(self.inputs)
+
+    def movements(self) -> np.ndarray:
+        """
+        Decode the inputs into movements.
+        Returns:
+        np.ndarray: A (ticks, players, 2) bool array of the [left, right] keys.
+        """
+        return np.stack(((self.inputs & INPUT_LEFT) != 0, (self.inputs & INPUT_RIGHT) != 0), axis=-1)
+
+    def flips(self) -> np.ndarray:
+        """
+        Decode whether the players were drawn flipped.
+        Returns:
+        np.ndarray: A (ticks, players) bool array.
+        """
+        return (self.inputs & INPUT_FLIP) != 0
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the recording.
+        Returns:
+        bytes: The header, the final scores and the compressed inputs.
+        """
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, self.seed, self.difficulty.encode(), self.player_count, self.shared_course,
+                                  self.step_rate, NOT_MOVED if self.moved_tick is None else self.moved_tick, self.ticks)
+        scores = np.array(self.scores, dtype='<i8').tobytes()
+        return header + scores + zlib.compress(np.ascontiguousarray(self.inputs, dtype=np.uint8).tobytes(), 9)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Recording':
+        """
+        Deserialize a recording.
+        Args:
+        data (bytes): The serialized recording.
+        Returns:
+        Recording: The recording.
+        """
+        magic, version, seed, difficulty, player_count, shared_course, step_rate, moved_tick, ticks = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("not a JumPy recording of a supported version")
+        offset = cls.HEADER.size
+        scores = np.frombuffer(data, dtype='<i8', count=player_count, offset=offset).tolist()
+        offset += 8 * player_count
+        inputs = np.frombuffer(zlib.decompress(data[offset:]), dtype=np.uint8).reshape(ticks, player_count)
+        return cls(seed, difficulty.rstrip(b'\0').decode(), player_count, bool(shared_course), step_rate,
+                   None if moved_tick == NOT_MOVED else moved_tick, inputs, scores)
+
+    def save(self, path: str) -> None:
+        """
+        Write the recording to a file.
+        Args:
+        path (str): The path of the file.
+        """
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> 'Recording':
+        """
+        Read a recording from a file.
+        Args:
+        path (str): The path of the file.
+        Returns:
+        Recording: The recording.
+        """
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+
+class Recorder:
+    """ Collects the inputs of a simulation tick by tick into a growing byte array. """
+    INITIAL_CAPACITY: Final[int] = 4096
+
+    def __init__(self, simulation: Simulation) -> None:
+        """
+        Initialize the recorder and attach it to a simulation, which then reports every step to it.
+        Args:
+        simulation (Simulation): The simulation to record.
+        """
+        self.simulation: Simulation = simulation
+        self.inputs: np.ndarray = np.zeros((self.INITIAL_CAPACITY, simulation.player_count), dtype=np.uint8)
+        self.ticks: int = 0
+        self.moved_tick: None | int = None
+        self.weights: np.ndarray = np.array((INPUT_LEFT, INPUT_RIGHT), dtype=np.uint8)
+        simulation.recorder = self
+
+    def record(self, movements: Sequence[Movement], moved: bool, flips: None | Sequence[bool] = None) -> None:
+        """
+        Record the inputs of one tick.
+        Args:
+        movements (Sequence[Movement]): One [left, right] pair per player.
+        moved (bool): Whether the course scrolls on this tick.
+        flips (None | Sequence[bool]): Whether every player is drawn flipped. None if not known.
+        """
+        if self.ticks == len(self.inputs):
+            self.inputs = np.concatenate((self.inputs, np.zeros_like(self.inputs)))
+        row = np.asarray(movements, dtype=np.uint8).reshape(-1, 2) @ self.weights
+        if flips is not None:
+            row |= np.asarray(flips[:len(row)], dtype=np.uint8) * INPUT_FLIP
+        self.inputs[self.ticks] = row
+        if moved and self.moved_tick is None:
+            self.moved_tick = self.ticks
+        self.ticks += 1
+
+    def recording(self) -> Recording:
+        """
+        Get the recording of the ticks so far, with the current scores as the final scores.
+        Returns:
+        Recording: The recording.
+        """
+        simulation = self.simulation
+        return Recording(simulation.seed, simulation.difficulty, simulation.player_count, simulation.shared_course, simulation.step_rate,
+                         self.moved_tick, self.inputs[:self.ticks].copy(), simulation.scores)
+
+
+def replay(recording: Recording) -> Simulation:
+    """
+    Run a recording in a new headless simulation.
+    Args:
+    recording (Recording): The recording.
+    Returns:
+    Simulation: The simulation after the last recorded tick.
+    """
+    simulation = Simulation(recording.player_count, recording.difficulty, seed=recording.seed, step_rate=recording.step_rate, shared_course=recording.shared_course)
+    moved_tick = recording.ticks if recording.moved_tick is None else recording.moved_tick
+    for tick, movements in enumerate(recording.movements()):
+        simulation.step(movements, moved=tick >= moved_tick)
+    return simulation
+
+
+def main() -> None:
+    """ Replay recordings, report their speed and fail if a final score does not match. """
+    parser = argparse.ArgumentParser(description="Replay JumPy recordings headless and verify their scores.")
+    parser.add_argument('paths', nargs='+', help="The recording files.")
+    args = parser.parse_args()
+
+    mismatches = 0
+    for path in args.paths:
+        recording = Recording.load(path)
+        start = time.perf_counter()
+        scores = replay(recording).scores
+        elapsed = time.perf_counter() - start
+        ok = scores == recording.scores
+        mismatches += not ok
+        speed = recording.ticks / recording.step_rate / elapsed if elapsed else float('inf')
+        print(f"{'OK' if ok else 'MISMATCH':<9}{path}: {recording.ticks} ticks in {elapsed:.3f}s ({speed:.0f}x real time), "
+              f"scores {scores}{'' if ok else f' != recorded {recording.scores}'}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ GAME_WINDOW_RESOLUTION: Final[tuple[int]] = (700, 850)
 FRAME_THICKNESS: Final[int] = 5
 WINDOW_FRAME_POSITION: Final[tuple[int]] = (int(MAIN_WINDOW_RESOLUTION[0] // 2 - GAME_WINDOW_RESOLUTION[0] // 2 - FRAME_THICKNESS),
                                             int(MAIN_WINDOW_RESOLUTION[1] // 2 - GAME_WINDOW_RESOLUTION[1] // 2 - FRAME_THICKNESS))
+GAME_WINDOW_POSITION: Final[tuple[int]] = (WINDOW_FRAME_POSITION[0] + FRAME_THICKNESS, WINDOW_FRAME_POSITION[1] + FRAME_THICKNESS)
 WINDOW_FRAME_SIZE: Final[tuple[int]] = (GAME_WINDOW_RESOLUTION[0] + 2 * FRAME_THICKNESS, GAME_WINDOW_RESOLUTION[1] + 2 * FRAME_THICKNESS)
 
 BLACK: Final[tuple[int]] = (1, 1, 1)
@@ -13,4 +14,26 @@ BUTTON_COLORS: Final[dict[dict[tuple[int]]]] = {
     'green': {'color': (56, 155, 60), 'hover_color': (76, 175, 80), 'shadow_color': (16, 115, 20), 'frame_color': (6, 95, 20)},
     'yellow': {'color': (235, 235, 0), 'hover_color': (255, 255, 50), 'shadow_color': (195, 195, 0), 'frame_color': (125, 125, 0)},
     'red': {'color': (235, 0, 0), 'hover_color': (255, 50, 50), 'shadow_color': (175, 0, 0), 'frame_color': (100, 0, 0)}
-    }
\ No newline at end of file
+    }
+
+GAME_BACKGROUND_COLOR: Final[tuple[int]] = (23, 123, 223)
+
+DIFFICULTIES: Final[dict[str, dict[str, tuple[int]]]] = {
+    'easy': {'platform_size': (150, 15), 'platform_distances': (40, 80), 'angle_limit': (10, 170)},
+    'normal': {'platform_size': (100, 10), 'platform_distances': (50, 100), 'angle_limit': (30, 150)},
+    'hard': {'platform_size': (50, 5), 'platform_distances': (90, 100), 'angle_limit': (50, 130)}
+    }
+
+
+# The physics were tuned per frame at 60 FPS, the constants below are the same values per second.
+BASE_FRAME_RATE: Final[int] = 60
+SIMULATION_RATE: Final[int] = 120
+# The courses scroll by at most this many pixels per second, the original pixel per frame at BASE_FRAME_RATE.
+MAX_SCROLL_SPEED: Final[float] = BASE_FRAME_RATE
+MAX_FRAME_TIME: Final[float] = 0.25
+# The rest of a step split at scrolls that is left over from rounding, not time to move through.
+STEP_EPSILON: Final[float] = 1e-9
+GRAVITY: Final[float] = 0.1 * BASE_FRAME_RATE ** 2
+MAX_FALL_SPEED: Final[float] = 8 * BASE_FRAME_RATE
+JUMP_SPEED: Final[float] = -4.5 * BASE_FRAME_RATE
+MOVE_SPEED: Final[float] = 5 * BASE_FRAME_RATE
@@ -0,0 +1,239 @@
+from entities import Player, Platform
+from platform_store import PlatformStore
+from player_batch import PlayerBatch
+import settings as sett
+
+import numpy as np
+
+import argparse
+import struct
+import time
+from random import Random
+from typing import Callable, Final, Sequence, TypeVar
+
+Game = TypeVar("Game")
+Recorder = TypeVar("Recorder")
+Movement = Sequence[bool]
+Controller = Callable[["Simulation"], Sequence[Movement]]
+
+
+class Simulation:
+    """
+    The display-free core of JumPy.
+    Steps the players, their platforms and the scrolling without touching the screen, so it can run as fast as
+    the CPU allows. The pygame window in jum.py is only an optional renderer on top of it.
+    Any number of players is supported. They either run on lanes, one course per player, or all share one course
+    and compete for its points. All players are stepped together in one PlayerBatch. Every lane is generated from
+    the same course seed, so all players face the same sequence of jumps.
+    """
+    PLAYER_COLORS: Final[tuple[str]] = ('red', 'green')
+    STATE_HEADER: Final[struct.Struct] = struct.Struct('<I?')
+    PART_LENGTH: Final[struct.Struct] = struct.Struct('<I')
+
+    def __init__(self, player_count: int = 1, difficulty: str = 'normal', seed: None | int = None, game: None | Game = None, step_rate: int = sett.SIMULATION_RATE, shared_course: bool = False) -> None:
+        """
+        Initialize the simulation.
+        Args:
+        player_count (int): The number of players.
+        difficulty (str): The name of the difficulty preset in settings.DIFFICULTIES.
+        seed (None | int): The seed the course seed is derived from. None picks a random seed.
+        game (None | Game): The game object rendering this simulation. None for headless runs.
+        step_rate (int): The number of fixed simulation steps per simulated second.
+        shared_course (bool): Whether all players share one course instead of getting a lane each.
+        """
+        if player_count < 1:
+            raise ValueError(f"player_count must be at least 1, got {player_count}")
+        self.game: None | Game = game
+        self.player_count: int = player_count
+        self.shared_course: bool = shared_course
+        self.difficulty: str = difficulty
+        self.seed: int = seed if seed is not None else Random().getrandbits(32)
+        preset = sett.DIFFICULTIES[difficulty]
+        self.platform_size: tuple[int] = preset['platform_size']
+        self.platform_distances: tuple[int] = preset['platform_distances']
+        self.angle_limit: tuple[int] = preset['angle_limit']
+
+        self.step_rate: int = step_rate
+        self.dt: float = 1 / step_rate
+        self.accumulator: float = 0.0
+        self.tick: int = 0
+        self.moved: bool = False
+        self.recorder: None | Recorder = None
+
+        surf = game.GAME_WINDOW_SURF if game is not None else None
+        self.course_seed: int = Random(self.seed).getrandbits(32)
+        self.platforms: list[Platform] = []
+        for course_start in self.course_starts():
+            self.platforms.append(Platform(game, surf, sett.GAME_WINDOW_RESOLUTION, course_start, self.platform_size, self.platform_distances, self.angle_limit, seed=self.course_seed))
+        self.courses: list[PlatformStore] = [platforms.platforms for platforms in self.platforms]
+        lanes = [0] * player_count if shared_course else range(player_count)
+        self.batch: PlayerBatch = PlayerBatch(self.start_positions(), lanes)
+        self.players: list[Player] = [Player(game, self.PLAYER_COLORS[i % len(self.PLAYER_COLORS)], batch=self.batch, index=i) for i in range(player_count)]
+
+    def course_starts(self) -> list[list[int]]:
+        """
+        Get the start positions of the courses, the first platform of a course is placed right below it.
+        Returns:
+        list[list[int]]: One [x, y] position per course, spread evenly over the width of the game window.
+        """
+        width, height = sett.GAME_WINDOW_RESOLUTION
+        course_count = 1 if self.shared_course else self.player_count
+        return [[width * (2 * i + 1) // (2 * course_count), height - 100] for i in range(course_count)]
+
+    def start_positions(self) -> list[list[int]]:
+        """
+        Get the start positions of the players.
+        Returns:
+        list[list[int]]: One [x, y] position per player. Players on a shared course are spread over its first platform.
+        """
+        if not self.shared_course:
+            return self.course_starts()
+        (x, y), = self.course_starts()
+        width = self.platform_size[0]
+        return [[x - width // 2 + width * (2 * i + 1) // (2 * self.player_count), y] for i in range(self.player_count)]
+
+    @property
+    def scores(self) -> list[int]:
+        """ The scores of all players. """
+        return self.batch.scores.tolist()
+
+    @property
+    def finished(self) -> bool:
+        """ Whether every player has fallen out of the game window. """
+        return bool(self.batch.fallen().all())
+
+    @property
+    def time(self) -> float:
+        """ The simulated time in seconds. """
+        return self.tick * self.dt
+
+    def get_state(self) -> bytes:
+        """
+        Serialize everything a step depends on, so the simulation can be rewound or synced to another machine.
+        Returns:
+        bytes: The state, to be restored with set_state.
+        """
+        parts = [self.batch.get_state()] + [platforms.get_state() for platforms in self.platforms]
+        return self.STATE_HEADER.pack(self.tick, self.moved) + b''.join(self.PART_LENGTH.pack(len(part)) + part for part in parts)
+
+    def set_state(self, state: bytes) -> None:
+        """
+        Restore the state of a simulation with the same seed, settings and players from get_state.
+        Args:
+        state (bytes): The serialized state.
+        """
+        self.tick, self.moved = self.STATE_HEADER.unpack_from(state)
+        offset = self.STATE_HEADER.size
+        for target in [self.batch] + self.platforms:
+            length, = self.PART_LENGTH.unpack_from(state, offset)
+            offset += self.PART_LENGTH.size
+            target.set_state(state[offset:offset + length])
+            offset += length
+
+    def step(self, movements: None | Sequence[Movement] = None, moved: None | bool = None, flips: None | Sequence[bool] = None) -> None:
+        """
+        Advance the simulation by one fixed step of self.dt seconds.
+        Args:
+        movements (None | Sequence[Movement]): One [left, right] pair per player. None for no input.
+        moved (None | bool): Whether the game has started scrolling. None to start as soon as any input is given.
+        flips (None | Sequence[bool]): Whether every player is drawn flipped. Only passed on to the recorder.
+        """
+        if movements is None:
+            movements = np.zeros((self.player_count, 2), dtype=np.int8)
+        if moved is None:
+            moved = self.moved or bool(np.any(movements))
+        self.moved = moved
+        if self.recorder is not None:
+            self.recorder.record(movements, moved, flips)
+
+        # The courses scroll at exact times, and a step that reaches one is split there. The players then always
+        # move against the platforms as they are at that moment, so longer steps play out the same.
+        self.batch.start_tick()
+        step_time = self.dt
+        while step_time > sett.STEP_EPSILON:
+            part = min([step_time] + [platforms.time_to_scroll(self.moved) for platforms in self.platforms])
+            self.batch.update(self.courses, movements, part)
+            for platforms in self.platforms:
+                platforms.update(self.moved, part)
+            step_time -= part
+        self.tick += 1
+
+    def advance(self, frame_time: float, movements: None | Sequence[Movement] = None, moved: None | bool = None, flips: None | Sequence[bool] = None) -> float:
+        """
+        Run as many fixed steps as fit into the time that passed since the last frame.
+        Left over time is kept for the next frame, so the simulation speed does not depend on the frame rate.
+        Args:
+        frame_time (float): The seconds since the last frame. Capped at settings.MAX_FRAME_TIME after long stalls.
+        movements (None | Sequence[Movement]): One [left, right] pair per player, held for all steps.
+        moved (None | bool): Whether the game has started scrolling. None to start as soon as any input is given.
+        flips (None | Sequence[bool]): Whether every player is drawn flipped. Only passed on to the recorder.
+        Returns:
+        float: How far the display time is between the previous and the current step (0 to 1), for interpolation.
+        """
+        self.accumulator += min(frame_time, sett.MAX_FRAME_TIME)
+        while self.accumulator >= self.dt:
+            self.step(movements, moved, flips)
+            self.accumulator -= self.dt
+        return self.accumulator / self.dt
+
+    def run(self, max_ticks: int, controller: None | Controller = None) -> list[int]:
+        """
+        Run the simulation until every player has fallen or max_ticks is reached.
+        Args:
+        max_ticks (int): The maximum number of ticks to simulate.
+        controller (None | Controller): Called every tick with the simulation, returns the movements of the players.
+        Returns:
+        list[int]: The final scores.
+        """
+        while self.tick < max_ticks and not self.finished:
+            self.step(controller(self) if controller is not None else None)
+        return self.scores
+
+
+def random_controller(seed: None | int = None, hold_ticks: int = 30) -> Controller:
+    """
+    Create a controller that holds a random direction per player for a few ticks.
+    Args:
+    seed (None | int): The seed of the controller.
+    hold_ticks (int): How many ticks a direction is held.
+    Returns:
+    Controller: The controller.
+    """
+    rng = Random(seed)
+    held: list[np.ndarray] = []
+
+    def controller(simulation: Simulation) -> np.ndarray:
+        if simulation.tick % hold_ticks == 0 or not held:
+            held[:] = [np.array([rng.choice(((True, False), (False, True), (False, False))) for _ in range(simulation.player_count)])]
+        return held[0]
+
+    return controller
+
+
+def main() -> None:
+    """ Run a batch of headless games and print their throughput. """
+    parser = argparse.ArgumentParser(description="Run headless JumPy simulations.")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=60.0, help="Maximum simulated seconds per game.")
+    parser.add_argument('--step-rate', type=int, default=sett.SIMULATION_RATE, help="Simulation steps per second.")
+    parser.add_argument('--players', type=int, default=1)
+    parser.add_argument('--shared', action='store_true', help="Put all players on one course instead of a lane each.")
+    parser.add_argument('--difficulty', default='normal', choices=tuple(sett.DIFFICULTIES))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    total_ticks = 0
+    scores: list[int] = []
+    for game_number in range(args.games):
+        simulation = Simulation(args.players, args.difficulty, seed=args.seed + game_number, step_rate=args.step_rate, shared_course=args.shared)
+        hold_ticks = max(1, args.step_rate // 4)
+        scores.extend(simulation.run(int(args.seconds * args.step_rate), random_controller(args.seed + game_number, hold_ticks)))
+        total_ticks += simulation.tick
+    elapsed = time.perf_counter() - start
+    print(f"{args.games} games, {total_ticks} ticks in {elapsed:.2f}s ({total_ticks / elapsed:.0f} ticks/s, {args.games / elapsed * 60:.0f} games/min)")
+    print(f"mean score {sum(scores) / len(scores):.1f}, max score {max(scores)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Soak test of long play sessions, run under SDL's dummy video driver.
+Runs the real frame loop of Game for hours of game time with scripted players. The test stands in for the clock
+of the game and reports exactly one frame at Game.FPS per frame, so the game plays as on a display but as fast as
+the CPU allows. Every interval of game time it samples the traced memory, the heap blocks, the objects tracked by
+the garbage collector, the live platforms and clouds and the real frame times. Growth that does not level off is
+reported, and the report is written as JSON that later runs compare with.
+    python soak.py --hours 2 --output soak.json
+    python soak.py --hours 2 --baseline soak.json
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+import pygame as pg
+
+from benchmark import create_game
+import settings as sett
+
+import argparse
+import gc
+import json
+import platform as host
+import sys
+import time
+import tracemalloc
+from random import Random
+from typing import Final
+
+Report = dict[str, object]
+
+INPUT_HOLD: Final[int] = 30
+RESTART: Final[tuple[int]] = (sett.GAME_WINDOW_RESOLUTION[0] // 2, sett.GAME_WINDOW_RESOLUTION[1] // 2)
+FRAME_METRICS: Final[tuple[str]] = ('frame_p50_ms', 'frame_p95_ms', 'frame_p99_ms', 'frame_max_ms')
+# The allowed growth per hour of game time of everything that has to stay bounded during a game, in the second
+# half of the run, after the caches had the first half to fill up.
+LEAK_LIMITS: Final[dict[str, float]] = {
+    'traced_bytes': 64 * 1024,
+    'heap_blocks': 2000,
+    'gc_objects': 100,
+    'platforms': 256,
+    'platform_slots': 256,
+    'clouds': 16,
+    'cloud_objects': 16,
+    'timer_unit': 1
+    }
+MEMORY_METRICS: Final[tuple[str]] = ('traced_bytes', 'heap_blocks', 'gc_objects')
+METRICS: Final[tuple[str]] = ('game_s', 'wall_s') + tuple(LEAK_LIMITS) + FRAME_METRICS
+# Growth that is this much faster in the second half of the run than in the first half is superlinear.
+SUPERLINEAR_FACTOR: Final[float] = 2.0
+# Frame times are kept in a histogram of this resolution, so hours of frames take no more memory than one.
+HISTOGRAM_STEP_MS: Final[float] = 0.01
+HISTOGRAM_MAX_MS: Final[float] = 100.0
+# The soak test itself and the tracing are not part of the game.
+TRACE_FILTERS: Final[tuple[tracemalloc.Filter]] = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+
+
+class SoakRun:
+    """
+    Plays a game through the frame loop of Game and samples it.
+    Every tick of the clock ends the frame before: its real time is recorded, the samples that are due are taken
+    and the inputs of the next frame are posted as key events, so the game reads them like those of a keyboard.
+    All storage of the run is allocated up front, so the run does not show up in its own samples.
+    """
+
+    def __init__(self, game: 'Game', hours: float, interval: float, warmup: int = 0, seed: int = 0, trace: bool = True) -> None:
+        """
+        Initialize the run.
+        Args:
+        game (Game): The game, with its gameplay data created.
+        hours (float): The game time to play in hours.
+        interval (float): The game time between two samples in seconds.
+        warmup (int): The sample at which the first memory snapshot is taken, the last one is compared with it.
+        seed (int): The seed of the scripted inputs.
+        trace (bool): Whether the memory allocated by Python is traced. Tracing slows every frame down.
+        """
+        self.game: 'Game' = game
+        self.trace: bool = trace
+        self.interval_frames: int = max(round(interval * game.FPS), 1)
+        self.samples: np.ndarray = np.full((max(round(hours * 3600 / interval), 1), len(METRICS)), np.nan)
+        self.frames: int = len(self.samples) * self.interval_frames
+        self.frame: int = 0
+        self.rng: Random = Random(seed)
+        self.interval_times: np.ndarray = np.zeros(self.interval_frames)
+        self.histogram: np.ndarray = np.zeros(int(HISTOGRAM_MAX_MS / HISTOGRAM_STEP_MS) + 1, dtype=np.int64)
+        self.warmup: int = min(warmup, len(self.samples) - 1)
+        self.snapshots: list[tracemalloc.Snapshot] = []
+        self.start: float = 0.0
+        self.frame_end: float = 0.0
+
+    def run(self) -> None:
+        """ Play the game until the game time is over. """
+        self.game.CLOCK = self
+        if self.trace:
+            tracemalloc.start()
+        self.start = self.frame_end = time.perf_counter()
+        try:
+            self.game.run()
+        finally:
+            if self.trace:
+                tracemalloc.stop()
+
+    def tick(self, framerate: int = 0) -> float:
+        """
+        End a frame and prepare the next one, in place of pg.time.Clock.tick.
+        Args:
+        framerate (int): The frame rate cap of the game, ignored.
+        Returns:
+        float: The game time of a frame in milliseconds.
+        """
+        if self.frame:
+            frame_time = time.perf_counter() - self.frame_end
+            self.interval_times[(self.frame - 1) % self.interval_frames] = frame_time
+            self.histogram[min(int(frame_time * 1000 / HISTOGRAM_STEP_MS), len(self.histogram) - 1)] += 1
+            if self.frame % self.interval_frames == 0:
+                self.sample(self.frame // self.interval_frames - 1)
+        if self.frame == self.frames:
+            self.game.running = False
+        self.script()
+        self.frame += 1
+        self.frame_end = time.perf_counter()
+        return 1000 / self.game.FPS
+
+    def script(self) -> None:
+        """ Put fallen players back into the middle of the window and pick new inputs every INPUT_HOLD frames. """
+        simulation = self.game.simulation
+        fallen = simulation.batch.fallen()
+        if fallen.any():
+            simulation.batch.reset_rows(fallen.nonzero()[0], [RESTART])
+        if self.frame % INPUT_HOLD:
+            return
+        for keys in self.game.PLAYER_KEYS[:simulation.player_count]:
+            for key in keys:
+                pg.event.post(pg.event.Event(pg.KEYUP, key=key))
+            # Left, right or no input.
+            direction = self.rng.randrange(3)
+            if direction < 2:
+                pg.event.post(pg.event.Event(pg.KEYDOWN, key=keys[direction]))
+
+    def sample(self, index: int) -> None:
+        """
+        Sample the game at the end of an interval.
+        Args:
+        index (int): The row of the sample.
+        """
+        courses = self.game.simulation.platforms
+        clouds = self.game.clouds
+        # Only what is still alive counts, not the garbage waiting for the next collection.
+        gc.collect()
+        traced = 0
+        if self.trace:
+            snapshot = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+            traced = sum(stat.size for stat in snapshot.statistics('filename'))
+            if index == self.warmup or index == len(self.samples) - 1:
+                self.snapshots.append(snapshot)
+        frame_ms = 1000 * self.interval_times
+        values = {'game_s': self.frame / self.game.FPS,
+                  'wall_s': time.perf_counter() - self.start,
+                  'traced_bytes': traced,
+                  'heap_blocks': sys.getallocatedblocks(),
+                  'gc_objects': len(gc.get_objects()),
+                  'platforms': sum(len(course.platforms) for course in courses),
+                  'platform_slots': sum(course.platforms.capacity for course in courses),
+                  'clouds': clouds.count,
+                  'cloud_objects': clouds.count + len(clouds.pool),
+                  'timer_unit': max(course.timer_unit for course in courses),
+                  'frame_p50_ms': np.percentile(frame_ms, 50),
+                  'frame_p95_ms': np.percentile(frame_ms, 95),
+                  'frame_p99_ms': np.percentile(frame_ms, 99),
+                  'frame_max_ms': frame_ms.max()}
+        self.samples[index] = [values[metric] for metric in METRICS]
+        print(f"{values['game_s'] / 60:>7.1f} min  {values['traced_bytes'] / 1024:>9.0f} KiB traced  {values['heap_blocks']:>8} blocks  "
+              f"{values['gc_objects']:>6} objects  {values['platforms']:>3} platforms  {values['clouds']:>3} clouds  "
+              f"frames p50 {values['frame_p50_ms']:.2f} ms p99 {values['frame_p99_ms']:.2f} ms", flush=True)
+
+    def frame_percentiles(self) -> dict[str, float]:
+        """
+        Get the percentiles of the time of all frames from the histogram.
+        Returns:
+        dict[str, float]: The p50, p95 and p99 frame time in ms, to the resolution of the histogram.
+        """
+        counts = np.cumsum(self.histogram)
+        return {f'p{percentile}_ms': float(np.searchsorted(counts, counts[-1] * percentile / 100) * HISTOGRAM_STEP_MS)
+                for percentile in (50, 95, 99)}
+
+
+def growth(samples: np.ndarray, metric: str) -> dict[str, float]:
+    """
+    Fit the growth of a metric over the samples.
+    Args:
+    samples (np.ndarray): The samples, one row per sample in the columns of METRICS.
+    metric (str): The name of the metric.
+    Returns:
+    dict[str, float]: The growth per hour of game time over all samples and over their first and second half.
+    """
+    hours = samples[:, METRICS.index('game_s')] / 3600
+    values = samples[:, METRICS.index(metric)]
+    half = len(samples) // 2
+    return {'per_hour': float(np.polyfit(hours, values, 1)[0]),
+            'early_per_hour': float(np.polyfit(hours[:half + 1], values[:half + 1], 1)[0]),
+            'late_per_hour': float(np.polyfit(hours[half:], values[half:], 1)[0])}
+
+
+def find_issues(samples: np.ndarray, frame_tolerance: float) -> tuple[dict[str, dict[str, float]], list[str]]:
+    """
+    Check the samples after the warmup for leaks, superlinear growth and frames getting slower.
+    Args:
+    samples (np.ndarray): The samples after the warmup.
+    frame_tolerance (float): The allowed slowdown of the frames from the first to the last third of the run.
+    Returns:
+    tuple[dict[str, dict[str, float]], list[str]]: The growth of every bounded metric and one message per issue.
+    """
+    if len(samples) < 4:
+        return {}, ["too few samples after the warmup to judge growth, play longer or sample more often"]
+    growths = {metric: growth(samples, metric) for metric in LEAK_LIMITS}
+    issues = []
+    for metric, allowed in LEAK_LIMITS.items():
+        rates = growths[metric]
+        if rates['late_per_hour'] > allowed:
+            issues.append(f"LEAK {metric} still grows by {rates['late_per_hour']:.0f} per hour in the second half (allowed {allowed:g})")
+        if rates['late_per_hour'] > allowed and rates['late_per_hour'] > SUPERLINEAR_FACTOR * max(rates['early_per_hour'], 0.0):
+            issues.append(f"SUPERLINEAR {metric} grows by {rates['early_per_hour']:.0f} per hour in the first half "
+                          f"and by {rates['late_per_hour']:.0f} per hour in the second")
+    third = len(samples) // 3
+    for metric in FRAME_METRICS[:-1]:
+        values = samples[:, METRICS.index(metric)]
+        early, late = float(np.median(values[:third])), float(np.median(values[-third:]))
+        if late > early * (1 + frame_tolerance):
+            issues.append(f"DRIFT {metric} went from {early:.2f} ms to {late:.2f} ms")
+    return growths, issues
+
+
+def compare(report: Report, baseline: Report, threshold: float, min_delta_ms: float = 0.05) -> list[str]:
+    """
+    Find what got slower or bigger than in the report of an earlier run.
+    Args:
+    report (Report): The current report.
+    baseline (Report): The report to compare with.
+    threshold (float): The allowed increase, 0.25 allows values up to 25% higher.
+    min_delta_ms (float): Slowdowns below this many milliseconds are timer noise and never count.
+    Returns:
+    list[str]: One message per regressed value.
+    """
+    regressions = []
+    for name, value in report['frame_ms'].items():
+        old = baseline['frame_ms'].get(name)
+        if old and value > old * (1 + threshold) and value - old > min_delta_ms:
+            regressions.append(f"frame {name}: {old:.2f} ms -> {value:.2f} ms (+{value / old - 1:.0%})")
+    for metric in LEAK_LIMITS:
+        # The last sample holds the memory the game needs after hours of play, the live entities come and go, so
+        # the most of them at once counts.
+        if metric in MEMORY_METRICS:
+            value, old = report['samples'][-1][metric], baseline['samples'][-1].get(metric)
+        else:
+            value, old = max(sample[metric] for sample in report['samples']), max(sample.get(metric, 0) for sample in baseline['samples'])
+        if old and value > old * (1 + threshold):
+            regressions.append(f"{metric}: {old:.0f} -> {value:.0f} (+{value / old - 1:.0%})")
+    return regressions
+
+
+def main() -> None:
+    """ Play a long session, print the samples and the issues found, write the report and compare it with a baseline. """
+    parser = argparse.ArgumentParser(description="Soak test a long JumPy session for leaks and slowdowns.")
+    parser.add_argument('--hours', type=float, default=1.0, help="Game time to play.")
+    parser.add_argument('--interval', type=float, default=60.0, help="Game time between samples in seconds.")
+    parser.add_argument('--warmup', type=float, default=5.0, help="Game time in minutes before growth counts.")
+    parser.add_argument('--difficulty', default='normal', choices=tuple(sett.DIFFICULTIES))
+    parser.add_argument('--single-player', action='store_true')
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the scripted inputs.")
+    parser.add_argument('--no-trace', action='store_true', help="Do not trace memory, for frame times without its overhead.")
+    parser.add_argument('--record', action='store_true', help="Keep recording the inputs, which grows by design.")
+    parser.add_argument('--top', type=int, default=5, help="Places with the most memory growth to list.")
+    parser.add_argument('--frame-tolerance', type=float, default=0.25, help="Allowed frame time drift within the run.")
+    parser.add_argument('--output', help="Write the report as JSON to this file.")
+    parser.add_argument('--baseline', help="Fail if frames are slower or memory is bigger than in this report.")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed increase against the baseline.")
+    args = parser.parse_args()
+
+    pg.init()
+    # Images are converted to the display format on load, so the display has to exist before anything is loaded.
+    pg.display.set_mode(sett.MAIN_WINDOW_RESOLUTION)
+    game = create_game(args.difficulty, dirty_rendering=True, single_player=args.single_player)
+    game.show_start_screen = game.show_difficulty_screen = False
+    if not args.record:
+        game.simulation.recorder = game.recorder = None
+    # The game freezes its heap once its gameplay data exists, create_game leaves that to the tools.
+    gc.collect()
+    gc.freeze()
+    soak = SoakRun(game, args.hours, args.interval, int(args.warmup * 60 / args.interval), args.seed, trace=not args.no_trace)
+    soak.run()
+
+    samples = soak.samples[soak.warmup:]
+    growths, issues = find_issues(samples, args.frame_tolerance)
+    report = {'python': sys.version.split()[0], 'pygame': pg.version.ver, 'machine': host.machine(),
+              'settings': {'hours': args.hours, 'interval': args.interval, 'warmup': args.warmup, 'difficulty': args.difficulty,
+                           'players': game.simulation.player_count, 'seed': args.seed, 'traced': not args.no_trace, 'recorded': args.record},
+              'frame_ms': soak.frame_percentiles(),
+              'growth': growths,
+              'issues': issues,
+              'samples': [dict(zip(METRICS, row)) for row in soak.samples.tolist()]}
+    print("frames: " + ", ".join(f"{name} {value:.2f} ms" for name, value in report['frame_ms'].items()))
+    for metric, rates in growths.items():
+        print(f"{metric:<16}{rates['per_hour']:>+12.1f} per hour, {rates['late_per_hour']:>+12.1f} in the second half")
+    if len(soak.snapshots) == 2:
+        first, last = soak.snapshots
+        print("memory growth after the warmup:")
+        for stat in [stat for stat in last.compare_to(first, 'lineno') if stat.size_diff > 0][:args.top]:
+            print(f"  {stat.size_diff:>+9} B {stat.count_diff:>+6} blocks  {stat.traceback[0].filename}:{stat.traceback[0].lineno}")
+    for issue in issues:
+        print(issue)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline['settings'] != report['settings']:
+            print("the baseline ran with other settings:", baseline['settings'])
+        regressions = compare(report, baseline, args.threshold)
+        for regression in regressions:
+            print("REGRESSION", regression)
+    if issues or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
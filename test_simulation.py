@@ -0,0 +1,88 @@
+from random import Random
+
+import numpy as np
+import pytest
+
+from player_batch import PlayerBatch
+from replay import Recorder, Recording, replay
+from simulation import Controller, Simulation, random_controller
+
+
+def timed_controller(seed: int, window: float = 0.5) -> Controller:
+    """
+    Create a controller that holds a random direction per player for windows of game time, so simulations at
+    different step rates get the same inputs.
+    Args:
+    seed (int): The seed of the controller.
+    window (float): How many seconds a direction is held.
+    Returns:
+    Controller: The controller.
+    """
+    def controller(simulation: Simulation) -> list[tuple[bool, bool]]:
+        window_index = int(simulation.time / window + 1e-9)
+        return [Random(seed * 1000003 + window_index * 31 + player).choice(((True, False), (False, True), (False, False)))
+                for player in range(simulation.player_count)]
+
+    return controller
+
+
+@pytest.mark.parametrize('player_count', [1, 6])
+def test_previous_pos_is_start_of_tick(player_count: int) -> None:
+    """ Ticks split at scrolls still interpolate from where the players were when the tick started. """
+    simulation = Simulation(player_count, 'hard', seed=3)
+    controller = random_controller(3, 20)
+    for _ in range(3000):
+        start = simulation.batch.pos.copy()
+        simulation.step(controller(simulation))
+        np.testing.assert_array_equal(simulation.batch.previous_pos, start)
+
+
+@pytest.mark.parametrize('shared_course', [False, True])
+@pytest.mark.parametrize('difficulty', ['easy', 'hard'])
+def test_scalar_and_array_paths_match(monkeypatch: pytest.MonkeyPatch, difficulty: str, shared_course: bool) -> None:
+    """ Stepping the players row by row and with array operations gives bit-identical states. """
+    states = []
+    for limit in (8, 0):
+        monkeypatch.setattr(PlayerBatch, 'SCALAR_LIMIT', limit)
+        simulation = Simulation(8, difficulty, seed=5, shared_course=shared_course)
+        controller = timed_controller(5)
+        run = []
+        for _ in range(2000):
+            simulation.step(controller(simulation))
+            run.append(simulation.get_state())
+        states.append(run)
+    assert states[0] == states[1]
+
+
+@pytest.mark.parametrize('player_count, seed', [(1, 25), (2, 40)])
+def test_replay_round_trip(tmp_path, player_count: int, seed: int) -> None:
+    """ A saved and loaded recording replays to the same state and scores as the recorded game. """
+    simulation = Simulation(player_count, 'easy', seed=seed)
+    recorder = Recorder(simulation)
+    simulation.run(6000, timed_controller(seed))
+    recording = recorder.recording()
+    path = tmp_path / 'game.jrec'
+    recording.save(str(path))
+
+    loaded = Recording.load(str(path))
+    np.testing.assert_array_equal(loaded.inputs, recording.inputs)
+    assert loaded.moved_tick == recording.moved_tick
+    replayed = replay(loaded)
+    assert replayed.get_state() == simulation.get_state()
+    assert replayed.scores == loaded.scores == simulation.scores
+
+
+# The seeds give games that last a while with the timed controller.
+@pytest.mark.parametrize('difficulty, seed', [('easy', 25), ('easy', 52), ('normal', 25), ('hard', 23)])
+def test_step_rate_invariance(difficulty: str, seed: int) -> None:
+    """ The same inputs played at different step rates land on the same platforms, scroll as far and fall together. """
+    results = []
+    for rate in (120, 60, 30):
+        simulation = Simulation(1, difficulty, seed=seed, step_rate=rate)
+        course = simulation.platforms[0].platforms
+        start = course.camera_y
+        simulation.run(20 * rate, timed_controller(seed))
+        results.append((simulation.scores, course.camera_y - start, simulation.time))
+    for scores, scrolled, time in results[1:]:
+        assert (scores, scrolled) == results[0][:2]
+        assert time == pytest.approx(results[0][2], abs=1 / 30)
@@ -0,0 +1,186 @@
+import pygame as pg
+
+import os
+from collections import OrderedDict
+from functools import partial
+from typing import Callable, Final
+
+Color = str | tuple[int]
+
+
+class DigitStrip:
+    def __init__(self, font: pg.font.Font, color: Color, antialias: bool = True) -> None:
+        """
+        Initialize a strip holding the glyphs 0-9 of one font and color, so numbers are composed from cached glyphs
+        instead of being rasterized again whenever they change.
+        Args:
+        font (pg.font.Font): The font of the digits.
+        color (Color): The color of the digits.
+        antialias (bool): Whether the digits are antialiased.
+        """
+        glyphs = [font.render(str(digit), antialias, color) for digit in range(10)]
+        self.height: int = max(glyph.get_height() for glyph in glyphs)
+        self.strip: pg.Surface = pg.Surface((sum(glyph.get_width() for glyph in glyphs), self.height), pg.SRCALPHA)
+        self.glyph_rects: list[pg.Rect] = []
+        x = 0
+        for glyph in glyphs:
+            # Blending onto the transparent strip would darken the antialiased edges, so the pixels are copied as is.
+            self.glyph_rects.append(self.strip.blit(glyph, (x, 0), special_flags=pg.BLEND_RGBA_MAX))
+            x += glyph.get_width()
+
+    def width(self, number: int) -> int:
+        """
+        Get the width of a number drawn with this strip.
+        Args:
+        number (int): The non-negative number.
+        Returns:
+        int: The width in pixels.
+        """
+        return sum(self.glyph_rects[int(digit)].width for digit in str(number))
+
+    def blit(self, surf: pg.Surface, number: int, pos: tuple[int]) -> pg.Rect:
+        """
+        Draw a number.
+        Args:
+        surf (pg.Surface): The surface to draw on.
+        number (int): The non-negative number.
+        pos (tuple[int]): The top left corner of the number.
+        Returns:
+        pg.Rect: The area that was drawn to.
+        """
+        x, y = pos
+        blits = []
+        for digit in str(number):
+            rect = self.glyph_rects[int(digit)]
+            blits.append((self.strip, (x, y), rect))
+            x += rect.width
+        surf.blits(blits, doreturn=False)
+        return pg.Rect(pos[0], y, x - pos[0], self.height)
+
+
+class FontRegistry:
+    """
+    Looks up every system font once and hands out the same Font object and digit strips to every user.
+    The file paths of the fonts can be handed over from an earlier run, because the first lookup of a system font
+    scans all fonts installed on the system.
+    """
+
+    def __init__(self) -> None:
+        self.paths: dict[str, None | str] = {}
+        self.fonts: dict[tuple[str, int], pg.font.Font] = {}
+        self.digit_strips: dict[tuple[str, int, Color, bool], DigitStrip] = {}
+
+    def path(self, name: str) -> None | str:
+        """
+        Get the file of a system font.
+        Args:
+        name (str): The name of the system font.
+        Returns:
+        None | str: The path of the font file, None if the system has no such font and the default font is used.
+        """
+        if name not in self.paths or (self.paths[name] is not None and not os.path.exists(self.paths[name])):
+            self.paths[name] = pg.font.match_font(name)
+        return self.paths[name]
+
+    def font(self, name: str, size: int) -> pg.font.Font:
+        """
+        Get a system font.
+        Args:
+        name (str): The name of the system font.
+        size (int): The size of the font.
+        Returns:
+        pg.font.Font: The font.
+        """
+        key = (name, size)
+        if key not in self.fonts:
+            if not pg.font.get_init():
+                pg.font.init()
+            # The same as pg.font.SysFont, without scanning the system fonts for a known path.
+            self.fonts[key] = pg.font.Font(self.path(name), size)
+        return self.fonts[key]
+
+    def digits(self, name: str, size: int, color: Color, antialias: bool = True) -> DigitStrip:
+        """
+        Get the digit strip of a font and color.
+        Args:
+        name (str): The name of the system font.
+        size (int): The size of the font.
+        color (Color): The color of the digits.
+        antialias (bool): Whether the digits are antialiased.
+        Returns:
+        DigitStrip: The digit strip.
+        """
+        key = (name, size, color, antialias)
+        if key not in self.digit_strips:
+            self.digit_strips[key] = DigitStrip(self.font(name, size), color, antialias)
+        return self.digit_strips[key]
+
+    def manifest(self) -> dict[str, list]:
+        """
+        Describe the fonts and digit strips created so far, to create them again in a later run.
+        Returns:
+        dict[str, list]: The font paths, the (name, size) of every font and the key of every digit strip.
+        """
+        return {'paths': sorted(self.paths.items()), 'fonts': sorted(self.fonts), 'digits': [list(key) for key in self.digit_strips]}
+
+    def restore(self, manifest: dict[str, list]) -> list[Callable[[], object]]:
+        """
+        Take over the font paths of a manifest and list the work to create its fonts and digit strips again.
+        Args:
+        manifest (dict[str, list]): A manifest of an earlier run.
+        Returns:
+        list[Callable[[], object]]: One function per font and digit strip, to be called when there is time.
+        """
+        self.paths.update({name: path for name, path in manifest.get('paths', ()) if name not in self.paths})
+        tasks = [partial(self.font, name, size) for name, size in manifest.get('fonts', ())]
+        # JSON turns color tuples into lists, which are no dictionary keys.
+        tasks.extend(partial(self.digits, name, size, color if isinstance(color, str) else tuple(color), antialias)
+                     for name, size, color, antialias in manifest.get('digits', ()))
+        return tasks
+
+
+class TextCache:
+    """ Least recently used cache of rendered text surfaces. """
+    MAX_SIZE: Final[int] = 256
+
+    def __init__(self, font_registry: FontRegistry, max_size: int = MAX_SIZE) -> None:
+        """
+        Initialize the text cache.
+        Args:
+        font_registry (FontRegistry): The registry providing the fonts.
+        max_size (int): The number of text surfaces to keep.
+        """
+        self.font_registry: FontRegistry = font_registry
+        self.max_size: int = max_size
+        self.surfaces: OrderedDict[tuple, pg.Surface] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def render(self, name: str, size: int, text: str, color: Color, antialias: bool = True) -> pg.Surface:
+        """
+        Get a rendered text, rasterizing it only if it is not cached.
+        Args:
+        name (str): The name of the system font.
+        size (int): The size of the font.
+        text (str): The text to render.
+        color (Color): The color of the text.
+        antialias (bool): Whether the text is antialiased.
+        Returns:
+        pg.Surface: The rendered text. It is shared and must not be drawn on.
+        """
+        key = (name, size, text, color, antialias)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = self.font_registry.font(name, size).render(text, antialias, color)
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surf
+
+
+fonts: Final[FontRegistry] = FontRegistry()
+texts: Final[TextCache] = TextCache(fonts)